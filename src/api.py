@@ -0,0 +1,119 @@
+import json
+from flask import Blueprint, current_app, request, url_for
+from sqlalchemy import and_, or_, select
+from events import filter_events, get_event_filters, get_per_page
+from extensions import db
+from models import User, Events
+from profiles import profile_picture_url
+from utils import encode_cursor, decode_cursor, format_time
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; without it responses are encoded with the json module
+    orjson = None
+
+##====================================================================================================================================================================================
+## JSON API
+##====================================================================================================================================================================================
+
+# Read-only JSON for the mobile client and partners. Rows are selected as plain column tuples,
+# never as ORM objects, so a response costs one query and no per-row identity-map bookkeeping
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Fields a client can ask for with ?fields=a,b,c; all of them by default
+EVENT_FIELDS = {
+    name: getattr(Events, name) for name in (
+        'event_id', 'event_title', 'sport_type', 'num_players', 'playing_level', 'event_date', 'start_time', 'end_time',
+        'location', 'description', 'gender_preference', 'contact_information', 'username', 'seats_taken'
+    )
+}
+
+# Public profile fields: never the email address, age or password
+PROFILE_FIELDS = {
+    'username': User.username,
+    'fullname': User.fullname,
+    'preferred_location': User.preferred_location,
+    'profile_picture': User.profile_picture
+}
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+@bp.errorhandler(ApiError)
+def handle_api_error(error):
+    return json_response({'error': error.message}, error.status)
+
+def json_response(payload, status=200):
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(',', ':'), default=str)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+def selected_fields(available):
+    # Field names from ?fields=, in the order asked for, or every available field
+    requested = request.args.get('fields', '')
+    names = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(f"Unknown field: {', '.join(unknown)}. Available fields: {', '.join(available)}")
+    return list(dict.fromkeys(names))
+
+def event_rows(query, names):
+    # Plain dicts for event rows selected as (requested fields..., event_date, event_id)
+    time_fields = [name for name in ('start_time', 'end_time') if name in names]
+    results = []
+    for row in query:
+        values = dict(zip(names, row))
+        for name in time_fields:
+            values[name] = format_time(values[name])
+        results.append(values)
+    return results
+
+# List events, with the browse page's filters plus ?organiser=, in (event_date, event_id) order
+@bp.route('/events')
+def list_events():
+    names = selected_fields(EVENT_FIELDS)
+    per_page = get_per_page()
+    # The sort key is always selected last, for the next page's cursor
+    query = filter_events(select(*(EVENT_FIELDS[name] for name in names), Events.event_date, Events.event_id), get_event_filters())
+    if request.args.get('organiser'):
+        query = query.where(Events.username == request.args['organiser'])
+    after = decode_cursor(request.args.get('after'))
+    if after:
+        after_date, after_id = after
+        query = query.where(or_(Events.event_date > after_date, and_(Events.event_date == after_date, Events.event_id > after_id)))
+    rows = db.session.execute(query.order_by(Events.event_date, Events.event_id).limit(per_page + 1)).all()
+
+    next_cursor = encode_cursor(*rows[per_page - 1][-2:]) if len(rows) > per_page else None
+    rows = rows[:per_page]
+    return json_response({
+        'events': event_rows(rows, names),
+        'next_cursor': next_cursor,
+        'next_url': url_for('api.list_events', **{**request.args.to_dict(), 'after': next_cursor}) if next_cursor else None
+    })
+
+# One event
+@bp.route('/events/<int:event_id>')
+def get_event(event_id):
+    names = selected_fields(EVENT_FIELDS)
+    rows = db.session.execute(select(*(EVENT_FIELDS[name] for name in names)).where(Events.event_id == event_id)).all()
+    if not rows:
+        raise ApiError('Event not found', 404)
+    return json_response(event_rows(rows, names)[0])
+
+# A user's public profile, with a link to the events they organise
+@bp.route('/profiles/<username>')
+def get_profile(username):
+    names = selected_fields(PROFILE_FIELDS)
+    row = db.session.execute(select(*(PROFILE_FIELDS[name] for name in names)).where(User.username == username)).first()
+    if row is None:
+        raise ApiError('Profile not found', 404)
+    profile = dict(zip(names, row))
+    if profile.get('profile_picture'):
+        profile['profile_picture'] = profile_picture_url(profile['profile_picture'])
+    profile['events_url'] = url_for('api.list_events', organiser=username)
+    return json_response(profile)
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip variants are written
+    brotli = None
+
+
+# Stylesheets and scripts in the static folder that get fingerprinted copies
+ASSET_EXTENSIONS = ('.css', '.js')
+
+# Precompressed siblings, in order of preference, as (Content-Encoding, file suffix)
+ASSET_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def build_assets(static_folder, output_folder):
+    """Write a content-hashed copy of every static stylesheet and script, plus .gz/.br siblings.
+
+    Returns the manifest mapping each source filename to its fingerprinted name, which is
+    also saved as manifest.json in output_folder. Files from earlier builds are removed.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = {}
+    for filename in sorted(os.listdir(static_folder)):
+        if not filename.endswith(ASSET_EXTENSIONS):
+            continue
+        with open(os.path.join(static_folder, filename), 'rb') as file:
+            content = file.read()
+
+        stem, extension = os.path.splitext(filename)
+        fingerprinted = f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+        manifest[filename] = fingerprinted
+
+        output_path = os.path.join(output_folder, fingerprinted)
+        _write(output_path, content)
+        _write(output_path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(output_path + '.br', brotli.compress(content, quality=11))
+
+    current = set(manifest.values())
+    for filename in os.listdir(output_folder):
+        if not os.path.isfile(os.path.join(output_folder, filename)):
+            continue
+        if filename != MANIFEST_NAME and filename.removesuffix('.gz').removesuffix('.br') not in current:
+            os.remove(os.path.join(output_folder, filename))
+
+    _write(os.path.join(output_folder, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def _write(path, content):
+    # Write through a temporary file so a running server never serves a half-written asset
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+class AssetManifest:
+    """Lazily loaded view of a build manifest; a missing manifest means assets are served unversioned."""
+
+    def __init__(self, output_folder, manifest_name=MANIFEST_NAME):
+        self.output_folder = output_folder
+        self.manifest_name = manifest_name
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def get(self, filename):
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            return self._entries.get(filename)
+
+    def reload(self):
+        with self._lock:
+            self._entries = None
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.output_folder, self.manifest_name)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+
+def choose_encoding(output_folder, filename, accept_encodings):
+    # Best precompressed variant of filename the client accepts, as (path, encoding); (filename, None) if none
+    for encoding, suffix in ASSET_ENCODINGS:
+        if accept_encodings.quality(encoding) > 0 and os.path.exists(os.path.join(output_folder, filename + suffix)):
+            return filename + suffix, encoding
+    return filename, None
@@ -0,0 +1,83 @@
+from flask import Blueprint, redirect, url_for, session, flash
+from sqlalchemy.exc import IntegrityError
+from extensions import db, password_hasher
+from feed import queue_feed_update
+from forms import LoginForm, RegistrationForm
+from models import User
+from pages import render_page
+from profiles import queue_profile_picture
+
+##====================================================================================================================================================================================
+## Routes and Logic
+##====================================================================================================================================================================================
+
+# Account creation, login and logout
+bp = Blueprint('auth', __name__)
+
+# Login
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+        valid, upgraded_hash = password_hasher.check(user.password, form.password.data) if user else (False, None)
+        if valid:
+            # Move the stored hash onto the current scheme and cost
+            if upgraded_hash:
+                user.password = upgraded_hash
+                db.session.commit()
+            session['logged_in'] = True
+            session['username'] = user.username
+            session['email'] = user.email
+            if form.remember.data:
+                session.permanent = True
+            flash('Login successful!', 'success')
+            return redirect(url_for('main.dashboard'))
+        else:
+            flash('Login Unsuccessful. Please check username and password', 'error')
+    return render_page('login.html', form=form)
+
+# Register
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        username = form.username.data
+        password = password_hasher.hash(form.password.data)
+        email = form.email.data
+        fullname = form.fullname.data
+        age = form.age.data
+        preferred_location = form.preferred_location.data
+
+        new_user = User(
+            username=username,
+            password=password,
+            email=email,
+            fullname=fullname,
+            age=age,
+            preferred_location=preferred_location,
+            profile_picture='images/default-profile-pic.png' # replaced once an uploaded picture is processed
+        )
+
+        try:
+            db.session.add(new_user)
+            db.session.commit()
+            queue_feed_update(username=username)
+
+            # Process the uploaded file in the background
+            file = form.profile_picture.data
+            if file and file.filename != '':
+                queue_profile_picture(username, file)
+
+            flash('Registration Successful!', 'success')
+            return redirect(url_for('auth.login'))
+        except IntegrityError:
+            db.session.rollback()
+            flash('Username already in use, please choose a different name.', 'error')
+    return render_page('register.html', form=form)
+
+# Logout
+@bp.route('/logout', methods=['POST'])
+def logout():
+    session.clear()
+    return redirect(url_for('main.dashboard'))
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from flask import current_app
+
+##====================================================================================================================================================================================
+## Background Jobs
+##====================================================================================================================================================================================
+
+class BackgroundWorkers:
+    """Runs jobs on a small thread pool so requests return without waiting for them.
+
+    The pool size is read from the app config setting named `workers_setting`; set it
+    to 0 to run jobs inline (useful in tests and scripts).
+    """
+
+    def __init__(self, workers_setting, default_workers, name, app=None):
+        self.workers_setting = workers_setting
+        self.default_workers = default_workers
+        self.name = name
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(self.workers_setting, self.default_workers)
+        app.extensions[self.name] = self
+
+    def submit(self, func, *args):
+        workers = current_app.config[self.workers_setting]
+        if not workers:
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        return self._get_executor(workers).submit(func, *args)
+
+    def _get_executor(self, workers):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self.name.replace('_', '-'))
+            return self._executor
@@ -0,0 +1,460 @@
+"""Load and latency benchmark for every route, against a seeded database.
+
+Seeds a scratch SQLite database with the requested number of users and events, then drives
+each route concurrently through the WSGI app (no network in between) and reports throughput
+and p50/p95/p99 latency per route. Results are written as JSON so runs can be compared:
+
+    python benchmark.py --scale 100k --output before.json
+    python benchmark.py --scale 100k --output after.json --compare before.json
+
+With --startup, it instead measures cold start: each sample is a fresh interpreter that imports
+the app, calls create_app() and serves its first request, as a newly spawned worker would.
+
+    python benchmark.py --startup 20 --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+
+
+# Preset volumes as (users, events)
+SCALES = {
+    '1k': (100, 1_000),
+    '10k': (1_000, 10_000),
+    '100k': (10_000, 100_000),
+    '1M': (100_000, 1_000_000),
+}
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# One benchmarked request shape. build(rng, run) returns (path, form data or None)
+Scenario = namedtuple('Scenario', ['name', 'method', 'authenticated', 'build'])
+
+
+def event_form_data(title, event_date):
+    return {
+        'event_title': title,
+        'sport_type': 'Soccer',
+        'num_players': 5,
+        'playing_level': 'Intermediate',
+        'event_date': event_date.isoformat(),
+        'start_time': '18:00',
+        'end_time': '19:30',
+        'location': f'{title} Court',  # a venue of its own, so posts never clash with each other
+        'description': 'Benchmark game',
+        'gender_preference': 'Mixed',
+        'contact_information': 'bench@example.com'
+    }
+
+
+def random_event_id(rng, run):
+    return rng.randint(1, run.live_events)
+
+
+def registration_form_data():
+    name = f'bench{uuid.uuid4().hex[:16]}'
+    return {
+        'username': name,
+        'password': BENCHMARK_PASSWORD,
+        'confirm_password': BENCHMARK_PASSWORD,
+        'email': f'{name}@example.com',
+        'fullname': 'Benchmark User',
+        'age': 30,
+        'preferred_location': 'crawley'  # stored as the venue's name, as typed input usually is
+    }
+
+
+def profile_form_data(rng):
+    return {
+        'email': f'bench{uuid.uuid4().hex[:16]}@example.com',  # unique, so updates never clash
+        'fullname': 'Benchmark User',
+        'age': rng.randint(18, 60),
+        'preferred_location': rng.choice(['Crawley', 'nedlands', 'Subiaco', 'Fremantle'])
+    }
+
+
+def picture_upload(rng):
+    # A photo-sized JPEG in a random colour, so each upload is new content and goes through decoding
+    import io
+    from PIL import Image
+    photo = io.BytesIO()
+    Image.new('RGB', (1600, 1200), tuple(rng.randrange(256) for _ in range(3))).save(photo, 'JPEG')
+    photo.seek(0)
+    return {'profile_picture': (photo, 'photo.jpg')}
+
+
+SCENARIOS = [
+    Scenario('dashboard', 'GET', False, lambda rng, run: ('/dashboard', None)),
+    Scenario('dashboard_logged_in', 'GET', True, lambda rng, run: ('/dashboard', None)),
+    Scenario('how_it_works', 'GET', False, lambda rng, run: ('/how-it-works', None)),
+    Scenario('login_page', 'GET', False, lambda rng, run: ('/login', None)),
+    Scenario('browse_events', 'GET', False, lambda rng, run: ('/browse-events', None)),
+    Scenario('browse_events_filtered', 'GET', False,
+             lambda rng, run: (f'/browse-events?sport={rng.choice(["Basketball", "Soccer", "Tennis"])}&level=Beginner', None)),
+    Scenario('browse_events_search', 'GET', False,
+             lambda rng, run: (f'/browse-events/search?q={rng.choice(["social", "weekly", "training", "competitive"])}', None)),
+    Scenario('ranked_search', 'GET', False,
+             lambda rng, run: (f'/search-events?q={rng.choice(["crawley", "nedlands", "fremantle", "subiaco"])}', None)),
+    Scenario('browse_single_event', 'GET', False, lambda rng, run: (f'/browse-single-event/{random_event_id(rng, run)}', None)),
+    Scenario('browse_events_logged_in', 'GET', True, lambda rng, run: ('/browse-events', None)),
+    Scenario('browse_single_event_logged_in', 'GET', True,
+             lambda rng, run: (f'/browse-single-event/{random_event_id(rng, run)}', None)),
+    Scenario('browse_events_near_me', 'GET', True,
+             lambda rng, run: (f'/browse-events/search?near=me&within={rng.choice([2, 5, 10])}', None)),
+    Scenario('api_events', 'GET', False, lambda rng, run: ('/api/v1/events', None)),
+    Scenario('api_events_filtered', 'GET', False,
+             lambda rng, run: (f'/api/v1/events?sport={rng.choice(["Basketball", "Soccer", "Tennis"])}&level=Beginner', None)),
+    Scenario('api_single_event', 'GET', False, lambda rng, run: (f'/api/v1/events/{random_event_id(rng, run)}', None)),
+    Scenario('api_profile', 'GET', False, lambda rng, run: (f'/api/v1/profiles/{run.random_username(rng)}', None)),
+    Scenario('profile', 'GET', True, lambda rng, run: ('/profile', None)),
+    Scenario('post_an_event_form', 'GET', True, lambda rng, run: ('/post-an-event', None)),
+    Scenario('post_an_event', 'POST', True,
+             lambda rng, run: ('/post-an-event', event_form_data(f'Benchmark {uuid.uuid4().hex}', run.today))),
+    Scenario('edit_event_form', 'GET', True, lambda rng, run: (f'/edit_event/{random_event_id(rng, run)}', None)),
+    Scenario('edit_event', 'POST', True, lambda rng, run: (
+        lambda event_id: (f'/edit_event/{event_id}', event_form_data(f'Edited {event_id} {uuid.uuid4().hex[:8]}', run.today))
+    )(random_event_id(rng, run))),
+    Scenario('edit_profile', 'POST', True, lambda rng, run: ('/edit_profile', profile_form_data(rng))),
+    # Form data is built before the clock starts, so only the upload and its processing are timed
+    Scenario('edit_profile_picture', 'POST', True, lambda rng, run: ('/edit_profile_picture', picture_upload(rng))),
+    Scenario('register', 'POST', False, lambda rng, run: ('/register', registration_form_data())),
+    # Every client joins and leaves the same event, like the sign-up burst when a popular game is posted
+    Scenario('join_popular_event', 'POST', True,
+             lambda rng, run: (f'/{rng.choice(["join", "leave"])}_event/{run.live_events}', None)),
+    Scenario('login', 'POST', False, lambda rng, run: (
+        '/login', {'username': run.random_username(rng), 'password': BENCHMARK_PASSWORD}
+    )),
+    # Runs last: each request removes a different seeded event
+    Scenario('delete_event', 'POST', True, lambda rng, run: (f'/delete_event/{run.next_deletable_event()}', None)),
+]
+
+
+class BenchmarkRun:
+    # Shared state for one run: the seeded volumes and the clients each concurrent worker uses
+
+    def __init__(self, app, users, events, deletable):
+        self.app = app
+        self.users = users
+        self.events = events
+        self.live_events = events - deletable
+        self.today = date.today()
+        self._deletable = iter(range(events, self.live_events, -1))
+        self._deletable_lock = threading.Lock()
+        self._authenticated_clients = []
+        self._clients_lock = threading.Lock()
+
+    def random_username(self, rng):
+        from seed import username_for
+        return username_for(rng.randrange(self.users))
+
+    def next_deletable_event(self):
+        with self._deletable_lock:
+            return next(self._deletable)
+
+    def client(self, worker_index, authenticated):
+        # Worker n signs in as seeded user n once and keeps that client for every scenario, so a run needs
+        # only as many users as workers, and they are the users whose feeds were built. Anonymous clients
+        # are new for each scenario, as the login scenario signs them in
+        if not authenticated:
+            return self.app.test_client()
+        with self._clients_lock:
+            while len(self._authenticated_clients) <= worker_index:
+                self._authenticated_clients.append(None)
+            client = self._authenticated_clients[worker_index]
+        if client is None:
+            from seed import username_for
+            client = self.app.test_client()
+            response = client.post('/login', data={'username': username_for(worker_index), 'password': BENCHMARK_PASSWORD})
+            if response.status_code != 302:
+                raise RuntimeError(f'Benchmark login failed with status {response.status_code}')
+            with self._clients_lock:
+                self._authenticated_clients[worker_index] = client
+        return client
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(run, scenario, requests, concurrency, seed):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(worker_index, client):
+        rng = random.Random(seed * 1000 + worker_index)
+        worker_requests = requests // concurrency + (1 if worker_index < requests % concurrency else 0)
+        for _ in range(worker_requests):
+            path, data = scenario.build(rng, run)
+            started = time.perf_counter()
+            response = client.open(path, method=scenario.method, data=data)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Log every worker in before the clock starts so login cost is not charged to the route
+        clients = list(executor.map(lambda worker_index: run.client(worker_index, scenario.authenticated), range(concurrency)))
+        started = time.perf_counter()
+        list(executor.map(worker, range(concurrency), clients))
+        wall_time = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'method': scenario.method,
+        'authenticated': scenario.authenticated,
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'wall_time_s': round(wall_time, 4),
+        'throughput_rps': round(len(latencies) / wall_time, 2) if wall_time else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        },
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def seed_database(app, db, users, events, batch_size, feeds=0):
+    from seed import generate_users, generate_events, bulk_load, insert_in_batches, link_events_to_venues, username_for
+    from search import events_fts_bulk_load
+    from extensions import password_hasher
+    from feed import rebuild_feed
+    from models import User, Events
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # Hash once: every seeded user shares the password, which keeps seeding fast at any volume
+        password_hash = password_hasher.hash(BENCHMARK_PASSWORD)
+        started = time.perf_counter()
+        usernames = [username_for(index) for index in range(users)]
+        with events_fts_bulk_load(db.engine), bulk_load(db.engine, defer_indexes_for=[Events.__table__]) as connection:
+            insert_in_batches(connection, User.__table__, generate_users(users, [password_hash]), batch_size)
+            insert_in_batches(connection, Events.__table__, generate_events(events, usernames), batch_size)
+            link_events_to_venues(connection)
+        # Logged-in clients sign in as the first users, so only their "for you" feeds are needed
+        for username in usernames[:feeds]:
+            rebuild_feed(username)
+        db.session.commit()
+        return time.perf_counter() - started
+
+
+# Runs in a fresh interpreter and prints the time taken by each startup phase, in seconds
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/how-it-works')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import': imported - started, 'create_app': created - imported, 'first_request': served - created}))
+"""
+
+STARTUP_PHASES = ['import', 'create_app', 'first_request', 'total']
+
+
+def create_schema(database):
+    # A new worker starts against a migrated database; an empty file would fail its first request
+    from app import create_app
+    from extensions import db
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+
+def measure_startup(runs, database):
+    create_schema(database)
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}')
+    samples = {phase: [] for phase in STARTUP_PHASES}
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], capture_output=True, text=True, env=env,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+        total = time.perf_counter() - started
+        if process.returncode != 0:
+            raise RuntimeError(f'Startup run failed:\n{process.stderr}')
+        for phase, seconds in json.loads(process.stdout.splitlines()[-1]).items():
+            samples[phase].append(seconds)
+        samples['total'].append(total)
+
+    results = {}
+    for phase, values in samples.items():
+        values.sort()
+        results[phase] = {
+            'p50': round(percentile(values, 0.50) * 1000, 3),
+            'p95': round(percentile(values, 0.95) * 1000, 3),
+            'min': round(values[0] * 1000, 3),
+        }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    header = f'{"route":<32}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}  status'
+    if baseline:
+        header += '  p95 vs baseline'
+    print(header)
+    for name, result in results['routes'].items():
+        latency = result['latency_ms']
+        line = (f'{name:<32}{result["throughput_rps"]:>10}{latency["p50"]:>10}{latency["p95"]:>10}{latency["p99"]:>10}  '
+                f'{",".join(f"{code}x{count}" for code, count in result["status_codes"].items())}')
+        previous = baseline['routes'].get(name) if baseline else None
+        if previous:
+            change = (latency['p95'] - previous['latency_ms']['p95']) / previous['latency_ms']['p95'] * 100
+            line += f'  {change:+.1f}%'
+        print(line)
+
+
+def print_startup(startup, baseline=None):
+    header = f'{"phase":<32}{"p50 ms":>10}{"p95 ms":>10}{"min ms":>10}'
+    if baseline:
+        header += '  p50 vs baseline'
+    print(header)
+    for phase, result in startup.items():
+        line = f'{phase:<32}{result["p50"]:>10}{result["p95"]:>10}{result["min"]:>10}'
+        previous = baseline.get(phase) if baseline else None
+        if previous:
+            change = (result['p50'] - previous['p50']) / previous['p50'] * 100
+            line += f'  {change:+.1f}%'
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='1k', help='Preset data volume (users, events).')
+    parser.add_argument('--users', type=int, help='Number of users to seed (overrides --scale).')
+    parser.add_argument('--events', type=int, help='Number of events to seed (overrides --scale).')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients per route.')
+    parser.add_argument('--routes', help='Comma-separated subset of routes to run.')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert batch while seeding.')
+    parser.add_argument('--database', help='SQLite file to seed (default: a temporary file).')
+    parser.add_argument('--no-page-cache', action='store_true', help='Disable the anonymous page cache.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for request parameters.')
+    parser.add_argument('--output', help='Write results to this JSON file.')
+    parser.add_argument('--compare', help='Earlier results JSON to compare p95 latency against.')
+    parser.add_argument('--startup', type=int, metavar='RUNS', help='Measure cold start over this many fresh interpreters instead.')
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.TemporaryDirectory(prefix='sportsync-bench-')
+    database = os.path.abspath(args.database or os.path.join(scratch.name, 'benchmark.db'))
+
+    if args.startup:
+        print(f'Starting the app {args.startup} times', file=sys.stderr)
+        results = {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'startup_runs': args.startup,
+            'startup_ms': measure_startup(args.startup, database),
+        }
+        baseline = None
+        if args.compare:
+            with open(args.compare) as file:
+                baseline = json.load(file).get('startup_ms')
+        print_startup(results['startup_ms'], baseline)
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(results, file, indent=2)
+            print(f'Results written to {args.output}', file=sys.stderr)
+        scratch.cleanup()
+        return
+
+    users, events = SCALES[args.scale]
+    users = args.users or users
+    events = args.events or events
+    scenarios = SCENARIOS
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        unknown = wanted - {scenario.name for scenario in SCENARIOS}
+        if unknown:
+            parser.error(f'unknown routes: {", ".join(sorted(unknown))}')
+        scenarios = [scenario for scenario in SCENARIOS if scenario.name in wanted]
+    deletable = args.requests if any(scenario.name == 'delete_event' for scenario in scenarios) else 0
+    if args.concurrency > users or deletable >= events:
+        parser.error('need more seeded users than --concurrency and more events than --requests')
+
+    from app import create_app
+    from extensions import db, password_hasher
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'WTF_CSRF_ENABLED': False,
+        'PAGE_CACHE_ENABLED': not args.no_page_cache,
+        'IMAGE_PROCESSING_WORKERS': 0,  # uploads are processed inside the timed request
+        'UPLOAD_FOLDER': os.path.join(scratch.name, 'uploads'),
+        'INCOMING_FOLDER': os.path.join(scratch.name, 'incoming'),
+    })
+
+    print(f'Seeding {users} users and {events} events into {database}', file=sys.stderr)
+    seed_time = seed_database(app, db, users, events, args.batch_size, feeds=args.concurrency)
+    print(f'Seeded in {seed_time:.1f}s', file=sys.stderr)
+
+    run = BenchmarkRun(app, users, events, deletable)
+    results = {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'users': users,
+        'events': events,
+        'requests_per_route': args.requests,
+        'concurrency': args.concurrency,
+        'page_cache': not args.no_page_cache,
+        'seed_time_s': round(seed_time, 3),
+        'routes': {},
+    }
+    for scenario in scenarios:
+        print(f'Running {scenario.name}', file=sys.stderr)
+        results['routes'][scenario.name] = run_scenario(run, scenario, args.requests, args.concurrency, args.seed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'Results written to {args.output}', file=sys.stderr)
+
+    password_hasher.shutdown()
+    scratch.cleanup()
+
+
+if __name__ == '__main__':
+    main()
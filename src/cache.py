@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedValue:
+    """Thread-safe, in-process holder for a value that is expensive to compute and rarely changes.
+
+    The value is computed on first use and kept until invalidate() is called, until it is
+    `ttl` seconds old, or until `version()` (a SharedVersion's get, say) returns something
+    other than it did before the computation. invalidate() only reaches this process;
+    the version is how writes made by other processes are noticed. A computation that
+    overlaps an invalidation is returned to its caller but not stored, so a stale result
+    can never outlive the write that made it stale.
+    """
+
+    def __init__(self, compute, ttl=None, version=None):
+        self._compute = compute
+        self._ttl = ttl
+        self._version = version
+        self._lock = threading.Lock()
+        self._value = None
+        self._valid = False
+        self._stamp = None
+        self._expires_at = None
+        self._generation = 0
+
+    def get(self):
+        # Read the version before computing, so a write that lands during the computation is noticed next time
+        stamp = self._version() if self._version else None
+        with self._lock:
+            if self._valid and stamp == self._stamp and (self._expires_at is None or time.monotonic() < self._expires_at):
+                return self._value
+            generation = self._generation
+
+        value = self._compute()
+
+        with self._lock:
+            if generation == self._generation:
+                self._value = value
+                self._valid = True
+                self._stamp = stamp
+                self._expires_at = time.monotonic() + self._ttl if self._ttl else None
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._valid = False
+            self._value = None
+
+
+class SharedVersion:
+    """Process-local view of a version number that every process can bump, e.g. a database row.
+
+    `read` returns the current version and is called at most once every `check_interval`
+    seconds, so caches keyed on it notice writes made by other processes within that
+    interval without adding a query to every cache hit. expire() forces the next get()
+    to read, e.g. right after this process bumped the version itself.
+    """
+
+    def __init__(self, read, check_interval=1.0):
+        self._read = read
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._read_at = None
+
+    def get(self):
+        with self._lock:
+            if self._read_at is not None and time.monotonic() - self._read_at < self._check_interval:
+                return self._value
+        read_at = time.monotonic()
+        value = self._read()
+        with self._lock:
+            self._value, self._read_at = value, read_at
+        return value
+
+    def expire(self):
+        with self._lock:
+            self._read_at = None
+
+
+class LRUCache:
+    """Bounded, thread-safe mapping with least-recently-used eviction and an optional time-to-live.
+
+    Entries older than `ttl` seconds are treated as missing; once `maxsize` entries are
+    held, storing a new one evicts the entry that was used longest ago. Every removal
+    through pop_matching() or clear() starts a new generation: pass the generation read
+    before computing a value to set(), and the value is dropped if entries were removed
+    meanwhile, as it may have been computed from data that has since changed.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation=None):
+        # Returns False, storing nothing, if `generation` is given and no longer current
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return True
+
+    def pop_matching(self, predicate):
+        # Remove every entry whose key satisfies predicate; returns how many were removed
+        with self._lock:
+            self._generation += 1
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
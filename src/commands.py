@@ -0,0 +1,209 @@
+import os
+import time
+import click
+from datetime import date
+from flask import current_app, render_template
+from flask.cli import with_appcontext
+from assets import build_assets
+from event_io import EVENT_FILE_COLUMNS, IMPORT_BATCH_SIZE, import_events, export_events
+from extensions import db, password_hasher
+from feed import rebuild_feed
+from forms import LoginForm, RegistrationForm, EditProfileForm, EditProfilePictureForm, RemoveProfilePictureForm, EventForm, ImportEventsForm, TIME_CHOICES
+from images import build_responsive_images
+from models import CacheVersion, User, Events
+from pages import save_snapshot
+from search import events_fts_bulk_load
+from seed import generate_users, generate_events, read_rows, parse_rows, row_format, coerce_row, bulk_load, insert_in_batches, link_events_to_venues
+from utils import set_session
+
+##====================================================================================================================================================================================
+## CLI Commands
+##====================================================================================================================================================================================
+
+def init_app(app):
+    for command in (snapshot_html, build_assets_command, build_images_command, seed_command, rebuild_feeds_command,
+                    import_events_command, export_events_command):
+        app.cli.add_command(command)
+
+# Render every page against fixture data for HTML validation, without touching the database
+@click.command('snapshot-html')
+@with_appcontext
+@click.option('--output-dir', default=None, help='Directory to write the rendered pages to.')
+def snapshot_html(output_dir):
+    if output_dir:
+        current_app.config['SNAPSHOT_FOLDER'] = output_dir
+
+    user = User(
+        username='sampleuser',
+        email='sample@example.com',
+        fullname='Sample User',
+        age=21,
+        preferred_location='Crawley',
+        profile_picture='images/default-profile-pic.png'
+    )
+    event = Events(
+        event_id=1,
+        event_title='Sample Soccer Game',
+        sport_type='Soccer',
+        num_players=5,
+        playing_level='Intermediate',
+        event_date=date(2024, 5, 30),
+        start_time=10 * 60,
+        end_time=12 * 60,
+        location='UWA Oval',
+        description='Friendly social game, all welcome',
+        gender_preference='Mixed',
+        contact_information='sample@example.com',
+        username=user.username,
+        seats_taken=3
+    )
+    facets = {
+        'sport_types': [(event.sport_type, 1)],
+        'num_players': [(event.num_players, 1)],
+        'playing_levels': [(event.playing_level, 1)],
+        'locations': [(event.location, 1)]
+    }
+
+    pages = [
+        (False, 'dashboard.html', lambda: {}),
+        (False, 'how_it_works.html', lambda: {}),
+        (False, 'login.html', lambda: {'form': LoginForm()}),
+        (False, 'register.html', lambda: {'form': RegistrationForm()}),
+        (False, 'browse_events.html', lambda: {'events': [event], 'filters': {}, 'prev_cursor': None, 'next_cursor': None, 'time_choices': TIME_CHOICES[1:], **facets}),
+        (False, 'browse_single_event.html', lambda: {'event': event}),
+        (True, 'post_an_event.html', lambda: {'form': EventForm()}),
+        (True, 'event_posted_successfully.html', lambda: {'event': event}),
+        (True, 'profile.html', lambda: {'user': user, 'events': [event], 'rsvps': [(event, 'joined')]}),
+        (True, 'edit_profile.html', lambda: {'form': EditProfileForm(obj=user)}),
+        (True, 'edit_profile_picture.html', lambda: {'form': EditProfilePictureForm(), 'remove_form': RemoveProfilePictureForm()}),
+        (True, 'edit_event.html', lambda: {'form': EventForm(obj=event), 'event': event}),
+        (True, 'import_events.html', lambda: {'form': ImportEventsForm(), 'report': None, 'columns': EVENT_FILE_COLUMNS})
+    ]
+    for logged_in, template_name, context in pages:
+        with current_app.test_request_context():
+            if logged_in:
+                set_session(user.username, user.email)
+            save_snapshot(template_name, render_template(template_name, **context()))
+        click.echo(f'Saved {template_name}')
+
+# Fingerprint and precompress the static CSS and JS, and write the manifest used by asset_url()
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    manifest = build_assets(current_app.static_folder, current_app.config['ASSETS_FOLDER'])
+    current_app.extensions['asset_manifest'].reload()
+    for filename, fingerprinted in manifest.items():
+        click.echo(f'{filename} -> {fingerprinted}')
+
+# Resize the photos in static/images into the widths and formats used by responsive_image()
+@click.command('build-images')
+@with_appcontext
+def build_images_command():
+    responsive_images = current_app.extensions['responsive_images']
+    manifest = build_responsive_images(os.path.join(current_app.static_folder, 'images'), responsive_images.output_folder)
+    responsive_images.reload()
+    for filename, entry in manifest.items():
+        click.echo(f"{filename}: {', '.join(str(width) for width, _ in entry['variants']['jpg'])}")
+
+# Bulk-load generated or imported users and events with batched inserts, e.g. to reproduce a production-size database
+@click.command('seed')
+@with_appcontext
+@click.option('--users', 'user_count', default=0, help='Number of users to generate.')
+@click.option('--events', 'event_count', default=0, help='Number of events to generate.')
+@click.option('--users-file', type=click.Path(exists=True, dir_okay=False), help='CSV or NDJSON file of users to import.')
+@click.option('--events-file', type=click.Path(exists=True, dir_okay=False), help='CSV or NDJSON file of events to import.')
+@click.option('--password', default='password', help='Password for generated users and imported users without one.')
+@click.option('--password-pool', default=4, help='Number of password hashes to compute and share between users.')
+@click.option('--batch-size', default=5000, help='Rows per insert statement and transaction.')
+@click.option('--seed', 'random_seed', default=0, help='Random seed for generated rows.')
+def seed_command(user_count, event_count, users_file, events_file, password, password_pool, batch_size, random_seed):
+    db.create_all()
+
+    # Hashing is deliberately slow, so hash a handful of times and share the results
+    password_hashes = [password_hasher.hash(password) for _ in range(max(1, password_pool))] if user_count or users_file else []
+
+    def load(connection, label, table, rows):
+        started = time.perf_counter()
+        count = insert_in_batches(connection, table, rows, batch_size)
+        elapsed = time.perf_counter() - started
+        click.echo(f'{label}: {count:,} rows in {elapsed:.2f}s ({count / elapsed if elapsed else 0:,.0f} rows/s)')
+
+    existing_users = db.session.query(db.func.count(User.username)).scalar()
+    with bulk_load(db.engine) as connection:
+        if user_count:
+            load(connection, 'Generated users', User.__table__,
+                 generate_users(user_count, password_hashes, start=existing_users, seed=random_seed))
+        if users_file:
+            load(connection, 'Imported users', User.__table__, (
+                coerce_row(User.__table__, row, defaults={'password': password_hashes[index % len(password_hashes)],
+                                                          'profile_picture': 'images/default-profile-pic.png'})
+                for index, row in enumerate(read_rows(users_file))
+            ))
+
+    if event_count or events_file:
+        usernames = db.session.scalars(db.select(User.username).order_by(User.username).limit(10000)).all()
+        if event_count and not usernames:
+            raise click.UsageError('Events need owners: add users first, e.g. with --users.')
+        existing_events = db.session.query(db.func.count(Events.event_id)).scalar()
+        start = db.session.query(db.func.max(Events.event_id)).scalar() or 0
+        db.session.close()
+
+        # Rebuilding the indexes only pays off when the load at least doubles the table
+        deferred = [Events.__table__] if event_count >= existing_events else []
+        started = time.perf_counter()
+        with events_fts_bulk_load(db.engine), bulk_load(db.engine, defer_indexes_for=deferred) as connection:
+            if event_count:
+                load(connection, 'Generated events', Events.__table__,
+                     generate_events(event_count, usernames, start=start, seed=random_seed))
+            if events_file:
+                load(connection, 'Imported events', Events.__table__,
+                     (coerce_row(Events.__table__, row) for row in read_rows(events_file)))
+            click.echo(f'Linked {link_events_to_venues(connection):,} events to venues')
+            # Bulk inserts bypass the session, so announce them to running servers' caches here
+            CacheVersion.bump(connection, CacheVersion.EVENTS)
+            connection.commit()
+        click.echo(f'Events loaded and indexed in {time.perf_counter() - started:.2f}s')
+
+# Recompute every user's "for you" feed, e.g. after a bulk load or migration; day to day, feeds are updated as events change
+@click.command('rebuild-feeds')
+@with_appcontext
+@click.option('--batch-size', default=500, help='Users per transaction.')
+def rebuild_feeds_command(batch_size):
+    started = time.perf_counter()
+    usernames = db.session.scalars(db.select(User.username).order_by(User.username)).all()
+    entries = 0
+    for index, username in enumerate(usernames, 1):
+        entries += rebuild_feed(username)
+        if index % batch_size == 0:
+            db.session.commit()
+    db.session.commit()
+    click.echo(f'Rebuilt {len(usernames):,} feeds with {entries:,} entries in {time.perf_counter() - started:.2f}s')
+
+# Post events from a CSV or NDJSON file on behalf of a user, with the same checks as the event form; invalid rows are reported and skipped
+@click.command('import-events')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username that will own the imported events.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, help='Rows per insert statement and transaction.')
+def import_events_command(path, username, batch_size):
+    if db.session.get(User, username) is None:
+        raise click.BadParameter(f'No user named {username!r}.', param_hint='--user')
+
+    started = time.perf_counter()
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        report = import_events(parse_rows(file, row_format(path)), username, batch_size)
+    for line_number, messages in report.errors:
+        click.echo(f"Line {line_number}: {' '.join(messages)}", err=True)
+    if report.rejected > len(report.errors):
+        click.echo(f'... and {report.rejected - len(report.errors):,} more rejected rows', err=True)
+    click.echo(f'Imported {report.imported:,} events, rejected {report.rejected:,}, in {time.perf_counter() - started:.2f}s')
+
+# Write every event as CSV or NDJSON, in the format accepted by import-events
+@click.command('export-events')
+@with_appcontext
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), default='csv', help='Output format.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True, allow_dash=True), default='-', help='File to write to; standard output by default.')
+def export_events_command(file_format, output):
+    with click.open_file(output, 'w', encoding='utf-8') as file:
+        for chunk in export_events(Events.query.order_by(Events.event_date, Events.event_id), file_format):
+            file.write(chunk)
@@ -0,0 +1,50 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def normalize_database_uri(uri):
+    # Some hosts still hand out postgres:// URLs, which SQLAlchemy 1.4+ no longer accepts
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def configure_engine(app):
+    """Derive SQLALCHEMY_ENGINE_OPTIONS from the DATABASE_POOL_* settings.
+
+    Must run before the SQLAlchemy extension is initialised. Options already present in
+    SQLALCHEMY_ENGINE_OPTIONS win, and in-memory SQLite keeps Flask-SQLAlchemy's own pool.
+    """
+    config = app.config
+    config['SQLALCHEMY_DATABASE_URI'] = normalize_database_uri(config['SQLALCHEMY_DATABASE_URI'])
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return
+    options.setdefault('pool_size', config['DATABASE_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DATABASE_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DATABASE_POOL_TIMEOUT'])
+    if url.get_backend_name() != 'sqlite':
+        # Server connections can be dropped by the server or a proxy while idle in the pool
+        options.setdefault('pool_recycle', config['DATABASE_POOL_RECYCLE'])
+        options.setdefault('pool_pre_ping', True)
+
+
+def install_sqlite_pragmas(engine, config):
+    # Run the SQLITE_* pragmas on every connection the engine opens; no-op for other databases
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+from extensions import db
+from feed import queue_feed_fan_out, queue_feed_update
+from forms import EventForm
+from models import Events, record_event_changes
+from utils import format_time
+
+##====================================================================================================================================================================================
+## Bulk Import and Export of Events
+##====================================================================================================================================================================================
+
+# Columns of an import or export file, in export order. Times are 'HH:MM' and dates YYYY-MM-DD, as in the event form
+EVENT_FILE_COLUMNS = [
+    'event_title', 'sport_type', 'num_players', 'playing_level', 'event_date', 'start_time', 'end_time',
+    'location', 'description', 'gender_preference', 'contact_information'
+]
+
+# Rows validated before each insert and commit
+IMPORT_BATCH_SIZE = 500
+
+# Rejected rows reported individually; beyond this only the count grows, so memory use stays flat
+MAX_REPORTED_ERRORS = 1000
+
+class ImportReport:
+    """Outcome of an import: how many rows were saved, and why the others were rejected."""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []  # (line number, [messages]) for the first MAX_REPORTED_ERRORS rejected rows
+
+    def reject(self, line_number, messages):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, messages))
+
+def import_events(rows, username, batch_size=IMPORT_BATCH_SIZE):
+    """Validate and save (line number, row) pairs as events owned by `username`.
+
+    Each row is checked with the same rules as the event form, including venue
+    double-bookings against saved events and earlier rows of the same file. Valid
+    rows are inserted in batches, one transaction per batch, so a file is never
+    held in memory and a bad row only rejects itself.
+    """
+    report = ImportReport()
+    batch = []
+    line_number = 0
+    try:
+        for line_number, row in rows:
+            if row is None:
+                report.reject(line_number, ['Not a JSON object.'])
+                continue
+            values, messages = validate_event_row(row, batch)
+            if messages:
+                report.reject(line_number, messages)
+                continue
+            values['username'] = username
+            batch.append((line_number, values))
+            if len(batch) == batch_size:
+                insert_event_batch(batch, report)
+                batch = []
+    except UnicodeDecodeError:
+        # Rows before the undecodable line are still saved
+        report.reject(line_number + 1, ['Not UTF-8 text; the rest of the file was skipped.'])
+    if batch:
+        insert_event_batch(batch, report)
+    if report.imported:
+        queue_feed_update(username=username)
+    return report
+
+def validate_event_row(row, pending):
+    # Column values for a valid row, or the reasons it is invalid. `pending` holds this batch's rows not yet saved
+    form = EventForm(formdata=MultiDict({name: '' if row.get(name) is None else str(row[name]).strip() for name in EVENT_FILE_COLUMNS}), meta={'csrf': False})
+    if form.validate_event():
+        values = {name: form[name].data for name in EVENT_FILE_COLUMNS}
+        values['venue_id'] = form.venue.venue_id if form.venue else None
+        if any(other['event_title'] == values['event_title'] for _, other in pending):
+            return None, ['Event Title: Already used by an earlier row.']
+        if any(overlaps(other, values) for _, other in pending):
+            return None, ['Event Location: This location is already booked at that time by an earlier row.']
+        return values, []
+    return None, [f'{form[name].label.text}: {error}' for name, errors in form.errors.items() for error in errors]
+
+def overlaps(event, other):
+    same_place = event['venue_id'] == other['venue_id'] if event['venue_id'] is not None else event['location'] == other['location']
+    return (same_place and event['event_date'] == other['event_date']
+            and event['start_time'] < other['end_time'] and other['start_time'] < event['end_time'])
+
+def insert_event_batch(batch, report):
+    # Titles must be unique: rows whose title is already taken are rejected before the insert
+    taken = set(db.session.scalars(select(Events.event_title).where(Events.event_title.in_([values['event_title'] for _, values in batch]))))
+    valid = []
+    for line_number, values in batch:
+        if values['event_title'] in taken:
+            report.reject(line_number, ['Event Title: Event title is already in use.'])
+        else:
+            valid.append((line_number, values))
+    if not valid:
+        db.session.rollback()
+        return
+
+    # Another request may have taken a title or a slot meanwhile: then save the rows one at a time to find which
+    event_ids, problem = save_events([values for _, values in valid])
+    if problem:
+        event_ids = []
+        for line_number, values in valid:
+            saved, problem = save_events([values])
+            if problem:
+                report.reject(line_number, [problem])
+            else:
+                event_ids.extend(saved)
+    report.imported += len(event_ids)
+    if event_ids:
+        queue_feed_fan_out(event_ids)
+
+def save_events(rows):
+    """Insert and commit event rows together; returns (event_ids, None), or (None, problem) after rolling back.
+
+    Rows were checked against saved events without a lock, so their venue-days are locked, the rows
+    written and checked once more before committing (see EventForm.hold_venue).
+    """
+    try:
+        Events.lock_schedule([(values['venue_id'], values['location'], values['event_date']) for values in rows])
+        event_ids = db.session.scalars(insert(Events).returning(Events.event_id), rows).all()
+    except IntegrityError:
+        db.session.rollback()
+        return None, 'Event Title: Event title is already in use.'
+    if Events.clashing(event_ids):
+        db.session.rollback()
+        return None, 'Event Location: This location is already booked at that time.'
+    # Bulk inserts bypass the session's change tracking, so each transaction records its events itself
+    record_event_changes(db.session, event_ids)
+    db.session.commit()
+    return event_ids, None
+
+def export_events(query, file_format, batch_size=1000):
+    """Yield the events selected by `query` as CSV or NDJSON text, a batch of rows at a time.
+
+    Rows are fetched from the database in batches as the output is consumed, so exports
+    of any size run in constant memory and can be streamed into a response or a file.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if file_format == 'csv' else None
+    if writer:
+        writer.writerow(EVENT_FILE_COLUMNS)
+
+    rows = query.with_entities(*(getattr(Events, name) for name in EVENT_FILE_COLUMNS)).yield_per(batch_size)
+    for count, row in enumerate(rows, 1):
+        values = row._asdict()
+        values['event_date'] = values['event_date'].isoformat()
+        values['start_time'] = format_time(values['start_time'])
+        values['end_time'] = format_time(values['end_time'])
+        if writer:
+            writer.writerow([values[name] for name in EVENT_FILE_COLUMNS])
+        else:
+            buffer.write(json.dumps(values) + '\n')
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
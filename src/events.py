@@ -0,0 +1,512 @@
+import io
+from collections import Counter
+from datetime import date
+from itertools import chain
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify, stream_with_context
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from event_io import EVENT_FILE_COLUMNS, import_events, export_events
+from extensions import db
+from feed import queue_feed_update
+from forms import EventForm, ImportEventsForm, RsvpForm, TIME_CHOICES
+from models import CacheVersion, Events, EventRsvp, Venue, record_event_changes
+from pages import cached_page, page_cache, render_page
+from search import EVENTS_FTS_RANK, build_fts_query
+from seed import parse_rows, row_format
+from utils import login_required, load_current_user, encode_cursor, decode_cursor, parse_time, format_time
+
+##====================================================================================================================================================================================
+## Routes and Logic
+##====================================================================================================================================================================================
+
+# Posting, browsing, searching and editing events
+bp = Blueprint('events', __name__)
+
+# Track which events a transaction touched so caches can be invalidated once it commits
+@db.event.listens_for(db.session, 'after_flush')
+def track_event_changes(session, flush_context):
+    changed = {obj.event_id for obj in chain(session.new, session.dirty, session.deleted) if isinstance(obj, Events)}
+    if changed:
+        record_event_changes(session, changed)
+
+@db.event.listens_for(db.session, 'after_commit')
+def invalidate_event_caches(session):
+    changed = session.info.pop('changed_events', None)
+    versions = session.info.pop('changed_versions', set())
+    if versions:
+        # Bumped once the session hands its connection back, so a request never holds two
+        session.info['versions_to_bump'] = versions
+    if CacheVersion.EVENTS in versions:
+        event_facets().invalidate()
+    if changed:
+        invalidate_event_pages(changed)
+
+@db.event.listens_for(db.session, 'after_transaction_end')
+def bump_committed_versions(session, transaction):
+    if transaction.parent is None and 'versions_to_bump' in session.info:
+        bump_cache_versions(session.info.pop('versions_to_bump'))
+
+def bump_cache_versions(names):
+    # Tell other processes, then have this one read the new numbers. If the bump fails, other processes
+    # catch up when their cached copies expire
+    try:
+        with db.engine.begin() as connection:
+            for name in sorted(names):
+                CacheVersion.bump(connection, name)
+    except SQLAlchemyError:
+        current_app.logger.warning('Could not bump cache versions %s', ', '.join(sorted(names)), exc_info=True)
+    for name in names:
+        cache_version(name).expire()
+
+def invalidate_event_pages(event_ids):
+    page_cache().pop_matching(lambda key: key[0] == 'events.browse_single_event' and dict(key[1]).get('event_id') in event_ids)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_event_changes(session):
+    session.info.pop('changed_events', None)
+    # Reads made inside the transaction may have cached its uncommitted changes
+    if session.info.pop('changed_versions', None):
+        event_facets().invalidate()
+        page_cache().clear()
+
+def read_cache_version(name):
+    return CacheVersion.read(db.session.connection(), name)
+
+def cache_version(name):
+    # This process's view of a CacheVersion row (see cache.SharedVersion)
+    return current_app.extensions['cache_versions'][name]
+
+# Create Post
+@bp.route('/post-an-event', methods=['GET', 'POST'])
+@login_required
+def post_an_event():
+    form = EventForm()
+    username = session.get('username')
+
+    if form.validate_on_submit():
+        try:
+            event_title = form.event_title.data
+            sport_type = form.sport_type.data
+            num_players = form.num_players.data
+            playing_level = form.playing_level.data
+            event_date = form.event_date.data
+            start_time = form.start_time.data
+            end_time = form.end_time.data 
+            location = form.location.data
+            description = form.description.data
+            gender_preference = form.gender_preference.data
+            contact_information = form.contact_information.data
+                
+            event = Events(
+                event_title=event_title,
+                sport_type=sport_type,
+                num_players=num_players,
+                playing_level=playing_level,
+                event_date=event_date,
+                start_time=start_time,
+                end_time=end_time,
+                location=location,
+                description=description,
+                gender_preference=gender_preference,
+                contact_information=contact_information,
+                username=username,
+                venue=form.venue
+            )
+            
+            db.session.add(event)
+            if not form.hold_venue(event):
+                db.session.rollback()
+                return render_page('post_an_event.html', form=form)
+            db.session.commit()
+            # The new event joins nearby users' feeds, and the poster's own feed follows their posting history
+            queue_feed_update(event.event_id, username)
+            flash('Event successfully created', 'success')
+            return render_page('event_posted_successfully.html', event=event)
+        except IntegrityError:
+            db.session.rollback()
+            flash('Event title is already in use. Please choose a different title.', 'danger')
+    return render_page('post_an_event.html', form=form)
+
+# Post a whole season at once from a CSV or NDJSON file, streamed and saved in batches
+@bp.route('/import-events', methods=['GET', 'POST'])
+@login_required
+def upload_events():
+    form = ImportEventsForm()
+    report = None
+
+    if form.validate_on_submit():
+        upload = form.events_file.data
+        rows = parse_rows(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''), row_format(upload.filename))
+        report = import_events(rows, session.get('username'))
+        flash(f'Imported {report.imported} events.' + (f' {report.rejected} rows were rejected.' if report.rejected else ''),
+              'warning' if report.rejected else 'success')
+
+    return render_page('import_events.html', form=form, report=report, columns=EVENT_FILE_COLUMNS)
+
+# Download events, optionally filtered like the browse page, as CSV (the default) or NDJSON
+@bp.route('/export-events')
+def download_events():
+    file_format = 'ndjson' if request.args.get('format') == 'ndjson' else 'csv'
+    query = filter_events(Events.query, get_event_filters()).order_by(Events.event_date, Events.event_id)
+    response = current_app.response_class(
+        stream_with_context(export_events(query, file_format)),
+        mimetype='text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=events.{file_format}'
+    return response
+
+# Keyset pagination over events ordered by (event_date, event_id)
+def paginate_events(query, after=None, before=None, per_page=20):
+    """Return one page of events plus the cursors for the previous and next pages.
+
+    Cursors encode the (event_date, event_id) of the boundary row, so each page is
+    a bounded range scan instead of an OFFSET that grows with the table.
+    """
+    if before:
+        before_date, before_id = before
+        query = query.filter(or_(Events.event_date < before_date,
+                                 and_(Events.event_date == before_date, Events.event_id < before_id)))
+        rows = query.order_by(Events.event_date.desc(), Events.event_id.desc()).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        events = list(reversed(rows[:per_page]))
+        prev_cursor = encode_cursor(events[0].event_date, events[0].event_id) if has_more else None
+        next_cursor = encode_cursor(events[-1].event_date, events[-1].event_id) if events else None
+        return events, prev_cursor, next_cursor
+
+    if after:
+        after_date, after_id = after
+        query = query.filter(or_(Events.event_date > after_date,
+                                 and_(Events.event_date == after_date, Events.event_id > after_id)))
+    rows = query.order_by(Events.event_date, Events.event_id).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    events = rows[:per_page]
+    prev_cursor = encode_cursor(events[0].event_date, events[0].event_id) if after and events else None
+    next_cursor = encode_cursor(events[-1].event_date, events[-1].event_id) if has_more else None
+    return events, prev_cursor, next_cursor
+
+def get_per_page():
+    per_page = request.args.get('per_page', type=int) or current_app.config['EVENTS_PER_PAGE']
+    return max(1, min(per_page, current_app.config['EVENTS_MAX_PER_PAGE']))
+
+# Browse page dropdown options (facets)
+PLAYING_LEVEL_ORDER = {'Beginner': 0, 'Intermediate': 1, 'Advanced': 2}
+
+def compute_event_facets():
+    # Count events per sport type, player count, playing level and location in one grouped scan
+    rows = db.session.query(
+        Events.sport_type, Events.num_players, Events.playing_level, Events.location, db.func.count()
+    ).group_by(Events.sport_type, Events.num_players, Events.playing_level, Events.location).all()
+
+    sport_types, num_players, playing_levels, locations = Counter(), Counter(), Counter(), Counter()
+    for sport_type, num_player, playing_level, location, count in rows:
+        sport_types[sport_type] += count
+        num_players[num_player] += count
+        playing_levels[playing_level] += count
+        locations[location] += count
+
+    return {
+        'sport_types': sorted(sport_types.items()),
+        'num_players': sorted(num_players.items()),
+        'playing_levels': sorted(playing_levels.items(), key=lambda item: PLAYING_LEVEL_ORDER.get(item[0], len(PLAYING_LEVEL_ORDER))),
+        'locations': sorted(locations.items())
+    }
+
+def event_facets():
+    return current_app.extensions['event_facets']
+
+# Event times are stored as minutes after midnight and shown as 'HH:MM'
+bp.add_app_template_filter(format_time)
+
+def events_in_window(query, first_date=None, last_date=None, earliest_start=None, latest_start=None):
+    # Events dated first_date..last_date that start between the given minutes after midnight
+    # (all bounds inclusive and optional), e.g. evening games this week. Both ranges are
+    # answered from ix_events_event_date_start_time without visiting non-matching rows
+    if first_date is not None:
+        query = query.filter(Events.event_date >= first_date)
+    if last_date is not None:
+        query = query.filter(Events.event_date <= last_date)
+    if earliest_start is not None:
+        query = query.filter(Events.start_time >= earliest_start)
+    if latest_start is not None:
+        query = query.filter(Events.start_time <= latest_start)
+    return query
+
+def events_near(query, origin, radius_km):
+    # Events at venues within radius_km of the origin venue. Venues are found through their grid
+    # index and events through ix_events_venue_id_event_date, so no event is examined for its distance
+    venue_ids = [venue.venue_id for venue, distance in Venue.within(origin.latitude, origin.longitude, radius_km)]
+    return query.filter(Events.venue_id.in_(venue_ids))
+
+def resolve_origin(near):
+    # The venue to measure distances from: one named in the query string, or 'me' for the
+    # signed-in user's preferred location
+    if near == 'me':
+        user = load_current_user()
+        near = user.preferred_location if user else None
+    return Venue.find(near)
+
+# Largest radius accepted by the "within" filter
+MAX_NEAR_RADIUS_KM = 50
+
+# Browse page filters, keyed by query parameter name
+EVENT_FILTER_PARAMS = ('q', 'sport', 'players', 'level', 'location', 'from', 'to', 'starts_after', 'starts_before', 'near', 'within')
+
+def get_event_filters():
+    # Active filters from the query string; empty values and 'all' mean no filter
+    filters = {}
+    for param in EVENT_FILTER_PARAMS:
+        value = request.args.get(param, '').strip()
+        if value and value.lower() != 'all':
+            filters[param] = value
+    return filters
+
+def filter_events(query, filters):
+    # Apply the browse filters in SQL so only matching rows are loaded
+    if 'sport' in filters:
+        query = query.filter(Events.sport_type == filters['sport'])
+    if 'players' in filters:
+        try:
+            query = query.filter(Events.num_players == int(filters['players']))
+        except ValueError:
+            pass
+    if 'level' in filters:
+        query = query.filter(Events.playing_level == filters['level'])
+    if 'location' in filters:
+        query = query.filter(Events.location == filters['location'])
+    query = events_in_window(
+        query,
+        first_date=parse_filter(date.fromisoformat, filters.get('from')),
+        last_date=parse_filter(date.fromisoformat, filters.get('to')),
+        earliest_start=parse_filter(parse_time, filters.get('starts_after')),
+        latest_start=parse_filter(parse_time, filters.get('starts_before'))
+    )
+    if 'within' in filters:
+        origin = resolve_origin(filters.get('near', 'me'))
+        radius_km = parse_filter(float, filters['within'])
+        if origin is not None and radius_km is not None and radius_km > 0:
+            query = events_near(query, origin, min(radius_km, MAX_NEAR_RADIUS_KM))
+    if 'q' in filters:
+        query = search_filter(query, filters['q'])
+    return query
+
+def parse_filter(parse, value):
+    # Malformed date, time and distance filters are ignored, like a non-numeric player count
+    if value is None:
+        return None
+    try:
+        return parse(value)
+    except ValueError:
+        return None
+
+def search_filter(query, text):
+    # Restrict events to those matching the search text, through the FTS index where available
+    if db.engine.dialect.name != 'sqlite':
+        return query.filter(or_(
+            Events.event_title.icontains(text, autoescape=True),
+            Events.description.icontains(text, autoescape=True),
+            Events.location.icontains(text, autoescape=True)
+        ))
+    match = build_fts_query(text)
+    if match is None:
+        return query
+    matching_ids = db.text('SELECT rowid FROM events_fts WHERE events_fts MATCH :match').bindparams(match=match)
+    return query.filter(Events.event_id.in_(matching_ids.columns(db.column('rowid'))))
+
+# Link to another page of browse results, keeping the filters and any non-default page size
+@bp.app_template_global()
+def events_page_url(filters, **cursor):
+    per_page = get_per_page()
+    if per_page != current_app.config['EVENTS_PER_PAGE']:
+        cursor['per_page'] = per_page
+    return url_for('events.browse_events', **cursor, **filters)
+
+def get_events_page(filters):
+    # Filtered page of events for the current request's cursor and page size
+    return paginate_events(
+        filter_events(Events.query, filters),
+        after=decode_cursor(request.args.get('after')),
+        before=decode_cursor(request.args.get('before')),
+        per_page=get_per_page()
+    )
+
+# Browse all events
+@bp.route('/browse-events')
+def browse_events():
+    try:
+        filters = get_event_filters()
+        events, prev_cursor, next_cursor = get_events_page(filters)
+
+        # Filter dropdown options with per-value counts, served from the in-process cache
+        facets = event_facets().get()
+
+        return render_page('browse_events.html', events=events, filters=filters, prev_cursor=prev_cursor, next_cursor=next_cursor, **facets, time_choices=TIME_CHOICES[1:], username=session.get('username'))
+    except Exception as e:
+        flash("Error occurred while fetching events")
+        return render_page('browse_events.html', filters={}, time_choices=TIME_CHOICES[1:])
+
+# Filtered browse results as JSON, used by the search box and filter dropdowns
+@bp.route('/browse-events/search')
+def search_events():
+    filters = get_event_filters()
+    events, prev_cursor, next_cursor = get_events_page(filters)
+    return jsonify(
+        events=[{
+            'event_id': event.event_id,
+            'event_title': event.event_title,
+            'sport_type': event.sport_type,
+            'num_players': event.num_players,
+            'playing_level': event.playing_level,
+            'location': event.location,
+            'url': url_for('events.browse_single_event', event_id=event.event_id)
+        } for event in events],
+        prev_url=events_page_url(filters, before=prev_cursor) if prev_cursor else None,
+        next_url=events_page_url(filters, after=next_cursor) if next_cursor else None
+    )
+
+# Ranked full-text search over event title, description and location
+@bp.route('/search-events')
+def ranked_search():
+    text = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 20, type=int), current_app.config['EVENTS_MAX_PER_PAGE']))
+    match = build_fts_query(text)
+    if match is None:
+        return jsonify(events=[])
+
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(db.text(f'''
+            SELECT events.event_id, events.event_title, events.sport_type, events.location, events.event_date
+            FROM events_fts JOIN events ON events.event_id = events_fts.rowid
+            WHERE events_fts MATCH :match
+            ORDER BY {EVENTS_FTS_RANK}
+            LIMIT :limit
+        '''), {'match': match, 'limit': limit}).all()
+    else:
+        rows = search_filter(db.session.query(Events.event_id, Events.event_title, Events.sport_type, Events.location, Events.event_date), text) \
+            .order_by(Events.event_date, Events.event_id).limit(limit).all()
+
+    return jsonify(events=[{
+        'event_id': row.event_id,
+        'event_title': row.event_title,
+        'sport_type': row.sport_type,
+        'location': row.location,
+        'event_date': str(row.event_date),
+        'url': url_for('events.browse_single_event', event_id=row.event_id)
+    } for row in rows])
+
+# Browse single event
+@bp.route('/browse-single-event/<int:event_id>')
+@cached_page(versions=(CacheVersion.EVENTS, CacheVersion.SEATS))
+def browse_single_event(event_id):
+    try:
+        event = db.session.get(Events, event_id)
+        if event:
+            waitlisted = EventRsvp.query.filter_by(event_id=event_id, status=EventRsvp.WAITLISTED).count()
+            if 'username' not in session:
+                # Anonymous visitors share one cached copy, without a form (and so without a CSRF token)
+                return render_page('browse_single_event.html', event=event, waitlisted=waitlisted)
+            rsvp = EventRsvp.query.filter_by(event_id=event_id, username=session['username']).first()
+            return render_page('browse_single_event.html', event=event, waitlisted=waitlisted, rsvp=rsvp, rsvp_form=RsvpForm())
+        else:
+            flash("Event not found")
+            return render_template('browse_single_event.html', event=None)
+    except Exception as e:
+        flash("Error occurred while fetching event details")
+        return render_template('browse_single_event.html', event=None)
+
+# Join an event, or its waitlist once every seat is taken
+@bp.route('/join_event/<int:event_id>', methods=['POST'])
+@login_required
+def join_event(event_id):
+    form = RsvpForm()
+    username = session.get('username')
+    event = db.session.get(Events, event_id)
+    if not event:
+        flash("Event not found", "danger")
+        return redirect(url_for('events.browse_events'))
+
+    if not form.validate_on_submit():
+        flash('Failed to join the event.', 'error')
+    elif event.username == username:
+        flash('You are organising this event.', 'info')
+    else:
+        try:
+            status = EventRsvp.join(event_id, username)
+            record_event_changes(db.session, {event_id}, CacheVersion.SEATS)
+            db.session.commit()
+            if status == EventRsvp.JOINED:
+                flash('You have joined the event. See you there!', 'success')
+            else:
+                flash('This event is full, so you have been added to the waitlist.', 'info')
+        except IntegrityError:
+            db.session.rollback()
+            flash('You have already joined this event.', 'info')
+    return redirect(url_for('events.browse_single_event', event_id=event_id))
+
+# Leave an event or its waitlist; a freed seat goes to the first player waiting
+@bp.route('/leave_event/<int:event_id>', methods=['POST'])
+@login_required
+def leave_event(event_id):
+    form = RsvpForm()
+    if form.validate_on_submit():
+        status = EventRsvp.leave(event_id, session.get('username'))
+        if status:
+            record_event_changes(db.session, {event_id}, CacheVersion.SEATS)
+        db.session.commit()
+        if status:
+            flash('You have left the event.' if status == EventRsvp.JOINED else 'You have left the waitlist.', 'success')
+    else:
+        flash('Failed to leave the event.', 'error')
+    return redirect(url_for('events.browse_single_event', event_id=event_id))
+
+# Edit event
+@bp.route('/edit_event/<int:event_id>', methods=['GET', 'POST'])
+@login_required
+def edit_event(event_id):
+    event = db.session.get(Events, event_id)
+    if not event:
+        flash("Event not found", "danger")
+        return redirect(url_for('profiles.profile'))
+
+    form = EventForm(obj=event, event_id=event.event_id)
+
+    if form.validate_on_submit():
+        event.event_title = form.event_title.data
+        event.sport_type = form.sport_type.data
+        event.num_players = form.num_players.data
+        event.playing_level = form.playing_level.data
+        event.event_date = form.event_date.data
+        event.start_time = form.start_time.data
+        event.end_time = form.end_time.data
+        event.location = form.location.data
+        event.venue = form.venue
+        event.description = form.description.data
+        event.gender_preference = form.gender_preference.data
+        event.contact_information = form.contact_information.data
+        if not form.hold_venue(event):
+            db.session.rollback()
+            return render_page('edit_event.html', form=form, event=event)
+        # Raising the number of players frees seats for anyone on the waitlist
+        EventRsvp.fill_from_waitlist(event.event_id)
+        organiser = event.username  # read before the commit expires the event, to save reloading it
+        db.session.commit()
+        queue_feed_update(event_id, organiser)
+        flash('Event updated successfully!', 'success')
+        return redirect(url_for('profiles.profile'))
+
+    return render_page('edit_event.html', form=form, event=event)
+
+# Delete event
+@bp.route('/delete_event/<int:event_id>', methods=['POST'])
+@login_required
+def delete_event(event_id):
+    event = db.session.get(Events, event_id)
+    if not event:
+        flash("Event not found", "danger")
+        return redirect(url_for('profiles.profile'))
+
+    EventRsvp.query.filter_by(event_id=event_id).delete()
+    db.session.delete(event)
+    db.session.commit()
+    queue_feed_update(event_id, event.username)
+    flash('Event deleted successfully!', 'success')
+    return redirect(url_for('profiles.profile'))
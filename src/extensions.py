@@ -0,0 +1,18 @@
+from flask_sqlalchemy import SQLAlchemy
+from background import BackgroundWorkers
+from hashing import PasswordHashingService
+from images import ImageProcessor
+from metrics import Metrics
+
+##====================================================================================================================================================================================
+## Extensions
+##====================================================================================================================================================================================
+
+# Extensions are created unbound here and attached to each app in create_app(), so importing
+# this module has no side effects and several apps can share one process (as the tests do)
+db = SQLAlchemy()
+metrics = Metrics()
+password_hasher = PasswordHashingService()
+image_processor = ImageProcessor()
+# Feed updates run on a single worker, so they never contend with each other for the database
+feed_updater = BackgroundWorkers('FEED_UPDATE_WORKERS', 1, 'feed_updater')
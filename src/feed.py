@@ -0,0 +1,261 @@
+import heapq
+from collections import Counter, namedtuple
+from itertools import islice
+from datetime import date
+from sqlalchemy import case, delete, func, insert, select, tuple_
+from flask import current_app
+from extensions import db, feed_updater
+from geo import haversine_km
+from models import User, Events, Venue, FeedEntry
+
+##====================================================================================================================================================================================
+## "For You" Feed
+##====================================================================================================================================================================================
+
+# Each user's feed is materialized in feed_entries and kept current as events are posted, edited and deleted,
+# so showing it is one range scan of ix_feed_entries_username_score rather than a pass over every event.
+#
+# An event is scored for a user by:
+#   - how close its venue is to the user's preferred location (events further than FEED_RADIUS_KM are left out)
+#   - how often the user has posted events of the same sport, and at the same playing level
+#   - whether the organiser is about the same age as the user
+
+# Entries kept per user, and how many upcoming events are considered when a feed is rebuilt from scratch
+FEED_SIZE = 50
+FEED_CANDIDATES = 500
+
+FEED_RADIUS_KM = 10
+AGE_BAND_YEARS = 5
+
+LOCATION_WEIGHT = 3.0
+SPORT_WEIGHT = 2.0
+LEVEL_WEIGHT = 1.0
+AGE_WEIGHT = 1.0
+
+# Users fanned out to per batch of queries and inserts
+FAN_OUT_BATCH_SIZE = 500
+
+# What scoring needs to know about a user: where they play and what they have posted
+FeedProfile = namedtuple('FeedProfile', ['username', 'age', 'venue', 'posted', 'sports', 'levels'])
+
+def load_profiles(usernames, for_event=None):
+    """Feed profiles for the given users, keyed by username, in three queries whatever their number.
+
+    Given a (sport_type, playing_level) pair, only the posting counts needed to score such an event are
+    loaded, which is all a fan-out needs and far fewer rows when it reaches thousands of users.
+    """
+    users = db.session.execute(select(User.username, User.age, User.preferred_location).where(User.username.in_(usernames))).all()
+
+    # Preferred locations that name a venue are stored under its exact name, as are events' locations
+    place_names = {user.preferred_location for user in users if user.preferred_location}
+    venues = {venue.name: venue for venue in Venue.query.filter(Venue.name.in_(list(place_names)))} if place_names else {}
+
+    sports, levels, posted = {}, {}, Counter()
+    if for_event is None:
+        history = db.session.execute(
+            select(Events.username, Events.sport_type, Events.playing_level, func.count())
+            .where(Events.username.in_(usernames))
+            .group_by(Events.username, Events.sport_type, Events.playing_level)
+        )
+        for username, sport_type, playing_level, count in history:
+            sports.setdefault(username, Counter())[sport_type] += count
+            levels.setdefault(username, Counter())[playing_level] += count
+            posted[username] += count
+    else:
+        sport_type, playing_level = for_event
+        history = db.session.execute(
+            select(
+                Events.username, func.count(),
+                func.sum(case((Events.sport_type == sport_type, 1), else_=0)),
+                func.sum(case((Events.playing_level == playing_level, 1), else_=0))
+            ).where(Events.username.in_(usernames)).group_by(Events.username)
+        )
+        for username, count, same_sport, same_level in history:
+            sports[username] = Counter({sport_type: same_sport})
+            levels[username] = Counter({playing_level: same_level})
+            posted[username] = count
+
+    return {
+        user.username: FeedProfile(
+            username=user.username,
+            age=user.age,
+            venue=venues.get(user.preferred_location),
+            posted=posted[user.username],
+            sports=sports.get(user.username, Counter()),
+            levels=levels.get(user.username, Counter())
+        )
+        for user in users
+    }
+
+def score_event(profile, venue, sport_type, playing_level, organiser_age):
+    """How well an event suits a user, or None if it is too far from where they play."""
+    if profile.venue is None or venue is None:
+        return None
+    distance = haversine_km(profile.venue.latitude, profile.venue.longitude, venue.latitude, venue.longitude)
+    if distance > FEED_RADIUS_KM:
+        return None
+
+    score = LOCATION_WEIGHT * (1 - distance / FEED_RADIUS_KM)
+    if profile.posted:
+        score += SPORT_WEIGHT * profile.sports[sport_type] / profile.posted
+        score += LEVEL_WEIGHT * profile.levels[playing_level] / profile.posted
+    if profile.age is not None and organiser_age is not None and abs(profile.age - organiser_age) <= AGE_BAND_YEARS:
+        score += AGE_WEIGHT
+    return round(score, 4)
+
+def fan_out_event(event):
+    # (Re)score an event for the users who play near it. Commits after each batch of users, so on SQLite
+    # the write lock is only held while a batch's entries are written
+    remove_event_from_feeds(event.event_id)
+    db.session.commit()
+    if event.venue is None or event.event_date < date.today():
+        return 0
+
+    usernames = [username for username in users_near(event.venue) if username != event.username]
+    organiser_age = db.session.scalar(select(User.age).where(User.username == event.username))
+
+    added = 0
+    for start in range(0, len(usernames), FAN_OUT_BATCH_SIZE):
+        batch = usernames[start:start + FAN_OUT_BATCH_SIZE]
+        entries = []
+        for profile in load_profiles(batch, for_event=(event.sport_type, event.playing_level)).values():
+            score = score_event(profile, event.venue, event.sport_type, event.playing_level, organiser_age)
+            if score is not None:
+                entries.append({'username': profile.username, 'event_id': event.event_id, 'score': score, 'event_date': event.event_date})
+        if entries:
+            db.session.execute(insert(FeedEntry), entries)
+            trim_feeds(batch)
+            db.session.commit()
+            added += len(entries)
+    return added
+
+def fan_out_events(events):
+    """Score newly saved events, e.g. a batch of imported ones, for the users who play near them.
+
+    Events at the same venue share one lookup of nearby users and one load of their profiles, so a
+    season of events at a handful of venues costs a handful of fan-outs rather than one per event.
+    """
+    by_venue = {}
+    for event in events:
+        if event.venue is not None and event.event_date >= date.today():
+            by_venue.setdefault(event.venue_id, []).append(event)
+    organisers = {event.username for venue_events in by_venue.values() for event in venue_events}
+    organiser_ages = dict(db.session.execute(select(User.username, User.age).where(User.username.in_(organisers))).all()) if organisers else {}
+
+    added = 0
+    for venue_events in by_venue.values():
+        venue = venue_events[0].venue
+        usernames = users_near(venue)
+        for start in range(0, len(usernames), FAN_OUT_BATCH_SIZE):
+            batch = usernames[start:start + FAN_OUT_BATCH_SIZE]
+            entries = []
+            for profile in load_profiles(batch).values():
+                for event in venue_events:
+                    if profile.username == event.username:
+                        continue
+                    score = score_event(profile, venue, event.sport_type, event.playing_level, organiser_ages.get(event.username))
+                    if score is not None:
+                        entries.append({'username': profile.username, 'event_id': event.event_id, 'score': score, 'event_date': event.event_date})
+            if entries:
+                db.session.execute(insert(FeedEntry), entries)
+                trim_feeds(batch)
+                db.session.commit()
+                added += len(entries)
+    return added
+
+def users_near(venue):
+    # Usernames of everyone whose preferred location is within FEED_RADIUS_KM of the venue
+    nearby = [other.name for other, distance in Venue.within(venue.latitude, venue.longitude, FEED_RADIUS_KM)]
+    return db.session.scalars(select(User.username).where(User.preferred_location.in_(nearby))).all()
+
+def remove_event_from_feeds(event_id):
+    db.session.execute(delete(FeedEntry).where(FeedEntry.event_id == event_id))
+
+def trim_feeds(usernames):
+    # Drop past events, then everything below each user's FEED_SIZE best entries
+    db.session.execute(delete(FeedEntry).where(FeedEntry.username.in_(usernames), FeedEntry.event_date < date.today()))
+    ranked = select(
+        FeedEntry.username, FeedEntry.event_id,
+        func.row_number().over(partition_by=FeedEntry.username, order_by=(FeedEntry.score.desc(), FeedEntry.event_id.desc())).label('rank')
+    ).where(FeedEntry.username.in_(usernames)).subquery()
+    overflow = select(ranked.c.username, ranked.c.event_id).where(ranked.c.rank > FEED_SIZE)
+    db.session.execute(delete(FeedEntry).where(tuple_(FeedEntry.username, FeedEntry.event_id).in_(overflow)))
+
+def rebuild_feed(username):
+    """Recompute one user's feed from the upcoming events near them, e.g. after their profile or posting history changes."""
+    profile = load_profiles([username]).get(username)
+    candidates = upcoming_events_near(profile.venue, exclude_username=username) if profile and profile.venue else []
+    organiser_ages = dict(db.session.execute(
+        select(User.username, User.age).where(User.username.in_({event.username for venue, event in candidates}))
+    ).all()) if candidates else {}
+
+    entries = []
+    for venue, event in candidates:
+        score = score_event(profile, venue, event.sport_type, event.playing_level, organiser_ages.get(event.username))
+        if score is not None:
+            entries.append({'username': username, 'event_id': event.event_id, 'score': score, 'event_date': event.event_date})
+    entries = heapq.nlargest(FEED_SIZE, entries, key=lambda entry: (entry['score'], entry['event_id']))
+
+    # Reads come first so that, on SQLite, the write lock is held only for the rewrite itself
+    db.session.execute(delete(FeedEntry).where(FeedEntry.username == username))
+    if entries:
+        db.session.execute(insert(FeedEntry), entries)
+    return len(entries)
+
+def upcoming_events_near(origin, exclude_username=None):
+    # The FEED_CANDIDATES soonest upcoming events within FEED_RADIUS_KM of a venue, as (venue, event row) pairs.
+    # Each venue is a bounded range scan of ix_events_venue_id_event_date, merged in date order
+    today = date.today()
+    per_venue = []
+    for venue, distance in Venue.within(origin.latitude, origin.longitude, FEED_RADIUS_KM):
+        query = select(Events.event_id, Events.event_date, Events.sport_type, Events.playing_level, Events.username) \
+            .where(Events.venue_id == venue.venue_id, Events.event_date >= today)
+        if exclude_username is not None:
+            query = query.where(Events.username != exclude_username)
+        rows = db.session.execute(query.order_by(Events.event_date, Events.event_id).limit(FEED_CANDIDATES)).all()
+        per_venue.append([(venue, row) for row in rows])
+    merged = heapq.merge(*per_venue, key=lambda pair: (pair[1].event_date, pair[1].event_id))
+    return list(islice(merged, FEED_CANDIDATES))
+
+def read_feed(username, limit=10):
+    """A user's highest-scoring upcoming events, best first."""
+    return Events.query.join(FeedEntry, FeedEntry.event_id == Events.event_id).filter(
+        FeedEntry.username == username,
+        FeedEntry.event_date >= date.today()
+    ).order_by(FeedEntry.score.desc(), FeedEntry.event_id.desc()).limit(limit).all()
+
+def queue_feed_update(event_id=None, username=None):
+    """Bring feeds up to date with an event that was saved or deleted, and with a user's profile and posting history."""
+    return feed_updater.submit(update_feeds, current_app._get_current_object(), event_id, username)
+
+def queue_feed_fan_out(event_ids):
+    """Add a batch of newly saved events to nearby users' feeds, as one background job."""
+    return feed_updater.submit(fan_out_new_events, current_app._get_current_object(), list(event_ids))
+
+# Runs on the feed updater, after the events have been committed
+def fan_out_new_events(app, event_ids):
+    with app.app_context():
+        try:
+            fan_out_events(Events.query.filter(Events.event_id.in_(event_ids)).all())
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Failed to add %d new events to feeds', len(event_ids))
+
+# Runs on the feed updater, after the change has been committed
+def update_feeds(app, event_id, username):
+    with app.app_context():
+        try:
+            if event_id is not None:
+                event = db.session.get(Events, event_id)
+                if event is not None:
+                    fan_out_event(event)
+                else:
+                    remove_event_from_feeds(event_id)
+            if username is not None:
+                rebuild_feed(username)
+            db.session.commit()
+        except Exception:
+            # Feeds are derived data: a missed update is repaired by the next one, or by `flask rebuild-feeds`
+            db.session.rollback()
+            app.logger.exception('Failed to update feeds for event %s and user %s', event_id, username)
@@ -0,0 +1,151 @@
+from datetime import datetime
+from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed, FileRequired
+from wtforms import StringField, PasswordField, SubmitField, BooleanField, IntegerField, SelectField, validators
+from wtforms.validators import DataRequired, InputRequired, EqualTo, Optional, ValidationError
+from extensions import db
+from images import InvalidImageError, check_image
+from models import User, Events, Venue
+from utils import parse_time, format_time
+
+##====================================================================================================================================================================================
+## Form Definition
+##====================================================================================================================================================================================
+
+def validate_image_upload(field):
+    # Reject uploads whose header is not a supported image before they are queued for processing
+    if field.data and field.data.filename:
+        try:
+            check_image(field.data.stream)
+        except InvalidImageError as error:
+            raise ValidationError(str(error))
+
+def canonical_place_name(field):
+    # Store a known place under its venue name, so feeds can match users to the events around them
+    venue = Venue.find(field.data)
+    if venue:
+        field.data = venue.name
+
+class LoginForm(FlaskForm):
+    username = StringField('Username', [validators.DataRequired()])
+    password = PasswordField('Password', [validators.DataRequired()])
+    remember = BooleanField('Remember Me')
+    submit = SubmitField('Login')
+
+class RegistrationForm(FlaskForm):
+    username = StringField('Username', [validators.Length(min=4, max=25), validators.DataRequired()])
+    password = PasswordField('Password', [validators.DataRequired(), validators.Length(min=8)])
+    confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password', message='Password entries do not match. Please try again')])
+    email = StringField('Email', [validators.DataRequired(), validators.Email()])
+    fullname = StringField('Full Name', [validators.DataRequired()])
+    age = IntegerField('Age', [validators.Optional()])
+    preferred_location = StringField('Preferred Location', [validators.Optional()])
+    profile_picture = FileField('Profile Picture', validators=[Optional(), FileAllowed(['jpg', 'jpeg', 'png'], 'Images only!')])
+    submit = SubmitField('Register')
+
+    def validate_email(self, email):
+        user = User.query.filter_by(email=email.data).first()
+        if user:
+            raise ValidationError('Email already in use, please choose a different email.')
+
+    def validate_preferred_location(self, preferred_location):
+        canonical_place_name(preferred_location)
+
+    def validate_profile_picture(self, profile_picture):
+        validate_image_upload(profile_picture)
+
+class EditProfileForm(FlaskForm):
+    email = StringField('Email', [validators.DataRequired(), validators.Email()])
+    fullname = StringField('Full Name', [validators.DataRequired()])
+    age = IntegerField('Age', [validators.Optional()])
+    preferred_location = StringField('Preferred Location', [validators.Optional()])
+    submit = SubmitField('Save Changes')
+
+    def validate_preferred_location(self, preferred_location):
+        canonical_place_name(preferred_location)
+
+class EditProfilePictureForm(FlaskForm):
+    profile_picture = FileField('Profile Picture', validators=[FileAllowed(['jpg', 'jpeg', 'png'], 'Images only!')])
+    submit = SubmitField('Upload Picture')
+
+    def validate_profile_picture(self, profile_picture):
+        validate_image_upload(profile_picture)
+
+class RemoveProfilePictureForm(FlaskForm):
+    submit = SubmitField('Remove Profile Picture')
+
+# Joining and leaving an event only needs the CSRF token
+class RsvpForm(FlaskForm):
+    submit = SubmitField('Join')
+
+# Half-hour slots for the event time dropdowns. Values are 'HH:MM' and coerce to minutes after midnight
+TIME_CHOICES = [('', 'Select Time')] + [(format_time(minutes), format_time(minutes)) for minutes in range(0, 24 * 60, 30)]
+
+class EventForm(FlaskForm):
+    event_title = StringField('Event Title', validators=[DataRequired()])
+    sport_type = SelectField('Sport Type', choices=[('', 'Select Sport Type'), ('Basketball', 'Basketball'), ('Soccer', 'Soccer'), ('Tennis', 'Tennis')], validators=[DataRequired()])
+    num_players = IntegerField('Number of Players Needed', validators=[DataRequired()])
+    playing_level = SelectField('Playing Level', choices=[('', 'Select Playing Level'), ('Beginner', 'Beginner'), ('Intermediate', 'Intermediate'), ('Advanced', 'Advanced')], validators=[DataRequired()])
+    event_date = StringField('Event Date', validators=[DataRequired()], render_kw={'type': 'date'})
+    start_time = SelectField('Event Start Time', choices=TIME_CHOICES, coerce=parse_time, validators=[InputRequired()])
+    end_time = SelectField('Event End Time', choices=TIME_CHOICES, coerce=parse_time, validators=[InputRequired()])
+    location = StringField('Event Location', validators=[DataRequired()])
+    description = StringField('Description of Event', validators=[DataRequired()])
+    gender_preference = SelectField('Gender Preference', choices=[('', 'Select Gender Preference'), ('Male', 'Male'), ('Female', 'Female'), ('Mixed', 'Mixed')], validators=[DataRequired()])
+    contact_information = StringField('Contact Information', validators=[DataRequired()])
+    submit = SubmitField('Post Event')
+
+    def __init__(self, *args, event_id=None, **kwargs):
+        super(EventForm, self).__init__(*args, **kwargs)
+        self.event_id = event_id # the event being edited, which cannot clash with itself
+        self.venue = None
+        self.conflicts = []
+
+    def validate_event_date(self, event_date):
+        try:
+            datetime.strptime(event_date.data, '%Y-%m-%d')
+        except ValueError:
+            raise ValidationError('Not a valid date (YYYY-MM-DD).')
+
+    def validate_end_time(self, end_time):
+        if self.start_time.data is not None and end_time.data is not None and end_time.data <= self.start_time.data:
+            raise ValidationError('The event must end after it starts.')
+
+    def validate_on_submit(self):
+        return self.is_submitted() and self.validate_event()
+
+    def validate_event(self):
+        # Field validation followed by the checks against saved events; imported rows go through this too
+        if self.validate():
+            self.event_date.data = datetime.strptime(self.event_date.data, '%Y-%m-%d').date()
+            # Known venues are saved under one spelling, so filters and clash checks match them
+            self.venue = Venue.find(self.location.data)
+            if self.venue:
+                self.location.data = self.venue.name
+            return self.check_venue_is_free()
+        return False
+
+    def check_venue_is_free(self, exclude_event_id=None):
+        # Refuse a booking that overlaps another event at the same venue, and list the clashes
+        self.conflicts = Events.venue_conflicts(self.location.data, self.event_date.data, self.start_time.data, self.end_time.data,
+                                                exclude_event_id=exclude_event_id or self.event_id, venue_id=self.venue.venue_id if self.venue else None)
+        if self.conflicts:
+            self.location.errors.append('This location is already booked at that time.')
+            return False
+        return True
+
+    def hold_venue(self, event):
+        """Check the venue again for `event`, the new or edited event about to be committed.
+
+        Validation answers from an unlocked read, so another booking may have taken the slot since.
+        This locks the venue-day, writes the event and checks once more, so the booking commits
+        only if it is still free. On False the caller must roll back.
+        """
+        Events.lock_schedule([(self.venue.venue_id if self.venue else None, self.location.data, self.event_date.data)])
+        db.session.flush()
+        return self.check_venue_is_free(exclude_event_id=event.event_id)
+
+# A season of events in one CSV or NDJSON file; each row is validated like EventForm
+class ImportEventsForm(FlaskForm):
+    events_file = FileField('Events File', validators=[FileRequired(), FileAllowed(['csv', 'ndjson', 'jsonl'], 'CSV or NDJSON files only!')])
+    submit = SubmitField('Import Events')
@@ -0,0 +1,81 @@
+import math
+
+
+# Local gazetteer of suburbs and sports venues around Perth, as (name, latitude, longitude).
+# Event and preferred locations are matched against these names, so no geocoding service is needed
+GAZETTEER = [
+    ('Crawley', -31.9810, 115.8190),
+    ('Nedlands', -31.9800, 115.8060),
+    ('Subiaco', -31.9490, 115.8270),
+    ('Claremont', -31.9800, 115.7800),
+    ('Perth', -31.9523, 115.8613),
+    ('Northbridge', -31.9460, 115.8560),
+    ('Leederville', -31.9360, 115.8420),
+    ('Mount Lawley', -31.9290, 115.8700),
+    ('Victoria Park', -31.9760, 115.8990),
+    ('South Perth', -31.9780, 115.8600),
+    ('Como', -32.0000, 115.8630),
+    ('Fremantle', -32.0569, 115.7439),
+    ('Cottesloe', -31.9950, 115.7580),
+    ('Scarborough', -31.8940, 115.7570),
+    ('Morley', -31.8880, 115.9060),
+    ('Joondalup', -31.7440, 115.7660),
+    ('Midland', -31.8880, 116.0100),
+    ('Cannington', -32.0170, 115.9350),
+    ('Rockingham', -32.2770, 115.7300),
+    ('Bentley', -32.0010, 115.9240),
+    ('UWA Oval', -31.9785, 115.8175),
+    ('UWA Tennis Club', -31.9797, 115.8152),
+    ('UWA Aquatic Centre', -31.9802, 115.8203),
+    ('UWA Recreation Centre', -31.9815, 115.8195),
+    ('UWA Sports Park', -31.9720, 115.7920),
+    ('Matilda Bay Reserve', -31.9770, 115.8230),
+    ('Kings Park', -31.9610, 115.8340),
+    ('Lake Monger', -31.9300, 115.8250),
+    ('Hyde Park', -31.9390, 115.8620),
+    ('Perth Arena', -31.9490, 115.8530),
+    ('HBF Park', -31.9440, 115.8690),
+    ('Optus Stadium', -31.9512, 115.8890),
+]
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Side of a spatial grid cell in degrees; about 1 km around Perth
+GRID_CELL_DEGREES = 0.01
+
+
+def normalize_place_name(name):
+    # Case- and whitespace-insensitive form of a place name, for matching free text against the gazetteer
+    return ' '.join(name.split()).lower()
+
+
+def grid_cell(latitude, longitude):
+    # (row, column) of the grid cell containing a point
+    return math.floor(latitude / GRID_CELL_DEGREES), math.floor(longitude / GRID_CELL_DEGREES)
+
+
+def grid_ranges(latitude, longitude, radius_km):
+    # Row and column ranges of the cells a circle of radius_km around the point can touch
+    latitude_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    longitude_delta = latitude_delta / max(math.cos(math.radians(latitude)), 1e-6)
+    min_row, min_col = grid_cell(latitude - latitude_delta, longitude - longitude_delta)
+    max_row, max_col = grid_cell(latitude + latitude_delta, longitude + longitude_delta)
+    return (min_row, max_row), (min_col, max_col)
+
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+    # Great-circle distance between two points
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def gazetteer_rows():
+    """Rows for the venues table, with their grid cells."""
+    rows = []
+    for name, latitude, longitude in GAZETTEER:
+        grid_row, grid_col = grid_cell(latitude, longitude)
+        rows.append({'name': name, 'latitude': latitude, 'longitude': longitude, 'grid_row': grid_row, 'grid_col': grid_col})
+    return rows
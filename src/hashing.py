@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+# Password hashing is deliberately slow, so it runs in a bounded pool of worker processes.
+# Request threads wait on the result without holding the GIL, and a login burst can only
+# keep PASSWORD_HASH_WORKERS cores busy instead of every worker in the server. Workers are
+# spawned rather than forked, so they never inherit the server's threads, locks or connections.
+
+@lru_cache(maxsize=8)
+def _argon2_hasher(time_cost, memory_cost, parallelism):
+    from argon2 import PasswordHasher  # imported on first use, mostly inside the pool's worker processes
+    return PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+def _hash_password(password, scheme, argon2_params):
+    if scheme == 'argon2':
+        return _argon2_hasher(*argon2_params).hash(password)
+    return generate_password_hash(password, method=scheme)
+
+
+def _check_password(stored_hash, password, scheme, argon2_params):
+    # Returns (valid, upgraded_hash); upgraded_hash is set when the stored hash is outdated
+    if stored_hash.startswith('$argon2'):
+        from argon2.exceptions import InvalidHashError, VerificationError
+        hasher = _argon2_hasher(*argon2_params)
+        try:
+            hasher.verify(stored_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False, None
+        outdated = scheme != 'argon2' or hasher.check_needs_rehash(stored_hash)
+    else:
+        if not check_password_hash(stored_hash, password):
+            return False, None
+        method = stored_hash.split('$', 1)[0]
+        outdated = method != scheme and not method.startswith(f'{scheme}:')
+
+    return True, _hash_password(password, scheme, argon2_params) if outdated else None
+
+
+class PasswordHashingService:
+    """Hashes and verifies passwords on a process pool, using Argon2 or werkzeug's pbkdf2 format.
+
+    Configured through the app config:
+        PASSWORD_HASH_SCHEME: 'argon2' (default) or a werkzeug method such as 'pbkdf2:sha256'
+        PASSWORD_HASH_WORKERS: size of the process pool; 0 hashes on the calling thread
+        ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB), ARGON2_PARALLELISM: Argon2 cost parameters
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_SCHEME', 'argon2')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))
+        app.config.setdefault('ARGON2_TIME_COST', 3)
+        app.config.setdefault('ARGON2_MEMORY_COST', 65536)
+        app.config.setdefault('ARGON2_PARALLELISM', 4)
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        scheme, argon2_params = self._settings()
+        return self._run(_hash_password, password, scheme, argon2_params)
+
+    def check(self, stored_hash, password):
+        """Verify a password against its stored hash.
+
+        Returns a (valid, upgraded_hash) pair. upgraded_hash is a fresh hash in the
+        configured scheme and cost when the stored one is older or weaker, so callers
+        can save it and move users onto the current settings as they log in.
+        """
+        scheme, argon2_params = self._settings()
+        return self._run(_check_password, stored_hash, password, scheme, argon2_params)
+
+    def _settings(self):
+        config = current_app.config
+        argon2_params = (config['ARGON2_TIME_COST'], config['ARGON2_MEMORY_COST'], config['ARGON2_PARALLELISM'])
+        return config['PASSWORD_HASH_SCHEME'], argon2_params
+
+    def _run(self, func, *args):
+        workers = current_app.config['PASSWORD_HASH_WORKERS']
+        if not workers:
+            return func(*args)
+        executor = self._get_executor(workers)
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            # A worker died (killed for memory, say) and took the pool with it; start a new one
+            self._discard_executor(executor)
+            return self._get_executor(workers).submit(func, *args).result()
+
+    def _get_executor(self, workers):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+from background import BackgroundWorkers
+
+# Pillow is imported inside the functions that decode images, so only processes that handle
+# uploads or build images pay for loading it
+
+
+# Square avatar variants written for every uploaded profile picture, by name and edge length in pixels
+PROFILE_PICTURE_SIZES = {'thumb': 96, 'medium': 400}
+
+# Output formats as (file extension, Pillow format, save options)
+PROFILE_PICTURE_FORMATS = [
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+]
+
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+# Widths generated for the site's own photos, so phones never download the desktop-sized file
+RESPONSIVE_WIDTHS = (480, 768, 1024, 1440)
+RESPONSIVE_EXTENSIONS = ('.jpg', '.jpeg')
+RESPONSIVE_MANIFEST_NAME = 'images.json'
+
+# Refuse to decode anything bigger than a 48 megapixel phone photo
+MAX_IMAGE_PIXELS = 48_000_000
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+def check_image(stream):
+    """Cheap validation on the request thread: reads only the image header, then rewinds the stream."""
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(stream) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidImageError('The uploaded file is not a valid image.')
+    finally:
+        stream.seek(0)
+
+    if image_format not in ACCEPTED_FORMATS:
+        raise InvalidImageError('Images only!')
+    if width * height > MAX_IMAGE_PIXELS:
+        raise InvalidImageError('The uploaded image is too large.')
+
+
+def variant_filename(stem, size, extension):
+    return f'{stem}-{size}.{extension}'
+
+
+def save_upload(stream, path):
+    # Copy an upload to disk in chunks, returning the SHA-256 hex digest of its contents
+    digest = hashlib.sha256()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            digest.update(chunk)
+            file.write(chunk)
+    return digest.hexdigest()
+
+
+def content_stem(digest):
+    # Content-addressed files are sharded two levels deep: ab/cd/abcd...
+    return f'{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+CONTENT_ADDRESSED_PATTERN = re.compile(r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})-[a-z]+\.[a-z]+$')
+
+
+def picture_digest(path):
+    # The content hash a picture path is stored under, or None for pictures named any other way
+    match = CONTENT_ADDRESSED_PATTERN.search(path)
+    return match.group(3) if match else None
+
+
+def write_profile_picture_variants(source_path, output_dir, stem):
+    """Decode an uploaded picture and write every size/format variant next to each other.
+
+    Returns the filenames written. Raises InvalidImageError if the file cannot be decoded.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    try:
+        with Image.open(source_path) as image:
+            if image.width * image.height > MAX_IMAGE_PIXELS:
+                raise InvalidImageError('The uploaded image is too large.')
+            image = ImageOps.exif_transpose(image).convert('RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidImageError('The uploaded file is not a valid image.')
+
+    filenames = []
+    for size, pixels in PROFILE_PICTURE_SIZES.items():
+        variant = ImageOps.fit(image, (pixels, pixels), Image.Resampling.LANCZOS)
+        for extension, image_format, options in PROFILE_PICTURE_FORMATS:
+            filename = variant_filename(stem, size, extension)
+            output_path = os.path.join(output_dir, filename)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            variant.save(output_path, image_format, **options)
+            filenames.append(filename)
+    return filenames
+
+
+def profile_picture_variant(path, size='medium', extension='jpg'):
+    """Map a stored profile picture path to one of its variants.
+
+    Pictures stored before the image pipeline existed (and the default picture) have no
+    variants, so their path is returned unchanged.
+    """
+    stem, _, suffix = path.rpartition('-')
+    if not stem or suffix != 'medium.jpg':
+        return path
+    return variant_filename(stem, size, extension)
+
+
+def profile_picture_files(path):
+    # Every file belonging to a stored profile picture: all variants, or the single legacy file
+    if profile_picture_variant(path, 'thumb') == path:
+        return [path]
+    return [profile_picture_variant(path, size, extension)
+            for size in PROFILE_PICTURE_SIZES for extension, _, _ in PROFILE_PICTURE_FORMATS]
+
+
+def build_responsive_images(source_folder, output_folder):
+    """Write resized JPEG and WebP copies of every photo in source_folder at the RESPONSIVE_WIDTHS.
+
+    Widths at or above the original are skipped in favour of one full-size copy. File names
+    carry a hash of the source so they can be cached forever. Returns the manifest, also saved
+    as images.json: for each source filename, its size and the (width, filename) of each variant.
+    """
+    from PIL import Image, ImageOps
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = {}
+    for filename in sorted(os.listdir(source_folder)):
+        if not filename.lower().endswith(RESPONSIVE_EXTENSIONS):
+            continue
+        source_path = os.path.join(source_folder, filename)
+        with open(source_path, 'rb') as file:
+            fingerprint = hashlib.sha256(file.read()).hexdigest()[:12]
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+
+        stem = os.path.splitext(filename)[0]
+        widths = [width for width in RESPONSIVE_WIDTHS if width < image.width] + [image.width]
+        variants = {extension: [] for extension, _, _ in PROFILE_PICTURE_FORMATS}
+        for width in widths:
+            resized = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+            for extension, image_format, options in PROFILE_PICTURE_FORMATS:
+                variant = f'{stem}.{fingerprint}-{width}w.{extension}'
+                resized.save(os.path.join(output_folder, variant), image_format, **options)
+                variants[extension].append((width, variant))
+        manifest[filename] = {'width': image.width, 'height': image.height, 'variants': variants}
+
+    current = {variant for entry in manifest.values() for files in entry['variants'].values() for _, variant in files}
+    for filename in os.listdir(output_folder):
+        if filename != RESPONSIVE_MANIFEST_NAME and filename not in current:
+            os.remove(os.path.join(output_folder, filename))
+
+    with open(os.path.join(output_folder, RESPONSIVE_MANIFEST_NAME), 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+class ImageProcessor(BackgroundWorkers):
+    """Runs image jobs on a small thread pool so uploads return without waiting for them.
+
+    Pillow releases the GIL while decoding and resampling, so threads are enough here.
+    Set IMAGE_PROCESSING_WORKERS to 0 to run jobs inline (useful in tests and scripts).
+    """
+
+    def __init__(self, app=None):
+        super().__init__('IMAGE_PROCESSING_WORKERS', 2, 'image_processor', app)
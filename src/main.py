@@ -0,0 +1,73 @@
+import mimetypes
+import os
+from flask import Blueprint, current_app, request, send_from_directory, session, url_for
+from assets import choose_encoding
+from extensions import metrics
+from feed import read_feed
+from metrics import PROMETHEUS_CONTENT_TYPE
+from pages import cached_page, render_page
+
+##====================================================================================================================================================================================
+## Routes and Logic
+##====================================================================================================================================================================================
+
+# Home and information pages, static assets and operational endpoints
+bp = Blueprint('main', __name__)
+
+# Home page
+@bp.route('/')
+@bp.route('/dashboard')
+@cached_page
+def dashboard():
+    # Signed-in users also get their "for you" feed; anonymous visitors are served the cached page
+    feed = read_feed(session['username']) if 'username' in session else None
+    return render_page('dashboard.html', feed=feed)
+
+# How it Works
+@bp.route('/how-it-works')
+@cached_page
+def how_it_works():
+    return render_page('how_it_works.html')
+
+# Prometheus scrape endpoint
+@bp.route('/metrics')
+def metrics_endpoint():
+    return current_app.response_class(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+# URL for a static stylesheet or script: the fingerprinted copy once built, the plain file otherwise
+@bp.app_template_global()
+def asset_url(filename):
+    fingerprinted = current_app.extensions['asset_manifest'].get(filename)
+    if fingerprinted:
+        return url_for('main.fingerprinted_asset', filename=fingerprinted)
+    return url_for('static', filename=filename)
+
+# srcset strings for a static photo's resized copies, or None until `flask build-images` has run
+@bp.app_template_global()
+def responsive_image_set(filename):
+    entry = current_app.extensions['responsive_images'].get(os.path.basename(filename))
+    if not entry:
+        return None
+
+    def srcset(variants):
+        return ', '.join(f"{url_for('main.fingerprinted_asset', filename='images/' + variant)} {width}w" for width, variant in variants)
+
+    jpegs = entry['variants']['jpg']
+    return {
+        'jpg': srcset(jpegs),
+        'webp': srcset(entry['variants']['webp']),
+        'src': url_for('main.fingerprinted_asset', filename='images/' + jpegs[len(jpegs) // 2][1])
+    }
+
+# Fingerprinted assets never change, and are served precompressed when the client accepts it
+@bp.route('/assets/<path:filename>')
+def fingerprinted_asset(filename):
+    assets_folder = current_app.config['ASSETS_FOLDER']
+    path, encoding = choose_encoding(assets_folder, filename, request.accept_encodings)
+    response = send_from_directory(assets_folder, path, mimetype=mimetypes.guess_type(filename)[0], max_age=current_app.config['ASSETS_MAX_AGE'])
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
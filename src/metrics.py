@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from flask import current_app, g, has_app_context, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+slow_query_logger = logging.getLogger('sportsync.slow_query')
+repeated_query_logger = logging.getLogger('sportsync.repeated_query')
+
+# Bucket upper bounds, Prometheus style
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name, self.help_text, self.label_names = name, help_text, label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(zip(self.label_names, label_values))} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name, self.help_text, self.label_names, self.buckets = name, help_text, label_names, buckets
+        self._values = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, state in sorted(self._values.items()):
+                labels = list(zip(self.label_names, label_values))
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), state):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(state[-1])}')
+                lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    # The metrics recorded for one app
+
+    def __init__(self):
+        self.requests = Counter('http_requests_total', 'Requests handled, by endpoint, method and status.',
+                                ('endpoint', 'method', 'status'))
+        self.request_duration = Histogram('http_request_duration_seconds', 'Time spent handling a request.',
+                                          ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.response_size = Histogram('http_response_size_bytes', 'Size of response bodies.',
+                                       ('endpoint',), SIZE_BUCKETS)
+        self.request_queries = Histogram('http_request_db_queries', 'SQL statements executed per request.',
+                                         ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.queries = Counter('db_queries_total', 'SQL statements executed, by endpoint.', ('endpoint',))
+        self.query_duration = Histogram('db_query_duration_seconds', 'Time spent executing SQL statements.',
+                                        ('endpoint',), LATENCY_BUCKETS)
+        self.slow_queries = Counter('db_slow_queries_total', 'SQL statements slower than the slow query threshold.',
+                                    ('endpoint',))
+        self.template_duration = Histogram('template_render_duration_seconds', 'Time spent rendering templates.',
+                                           ('template',), LATENCY_BUCKETS)
+        self._all = [self.requests, self.request_duration, self.response_size, self.request_queries,
+                     self.queries, self.query_duration, self.slow_queries, self.template_duration]
+
+    def reset(self):
+        for metric in self._all:
+            metric.reset()
+
+    def render(self):
+        return '\n'.join(line for metric in self._all for line in metric.render()) + '\n'
+
+
+class Metrics:
+    """Per-endpoint request, SQL and template timings, exported in the Prometheus text format.
+
+    SQL statements are timed through engine events and attributed to the endpoint that ran
+    them. Statements slower than SLOW_QUERY_THRESHOLD seconds are logged to the
+    'sportsync.slow_query' logger. Set METRICS_ENABLED to False to stop recording.
+    Each app records into its own MetricsRegistry.
+
+    In debug mode (or with DETECT_REPEATED_QUERIES on) each request's statements are also
+    kept, and the 'sportsync.repeated_query' logger warns about duplicate queries (same SQL
+    and parameters) and likely N+1 queries (same SQL run REPEATED_QUERY_THRESHOLD or more
+    times with different parameters).
+    """
+
+    def __init__(self, app=None):
+        self._templates = threading.local()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD', 0.1)  # seconds
+        app.config.setdefault('DETECT_REPEATED_QUERIES', None)  # None: only in debug mode
+        app.config.setdefault('REPEATED_QUERY_THRESHOLD', 5)
+        app.extensions['metrics'] = MetricsRegistry()
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render_template, app, weak=False)
+        template_rendered.connect(self._template_rendered, app, weak=False)
+        # Every engine, so the timings also cover engines created after this point
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    @property
+    def registry(self):
+        return current_app.extensions['metrics']
+
+    def render(self):
+        return self.registry.render()
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = 0
+        detect = current_app.config['DETECT_REPEATED_QUERIES']
+        # SQL statement -> parameters of each run, for the repeated query check after the request
+        g.metrics_statements = {} if (current_app.debug if detect is None else detect) else None
+
+    def _after_request(self, response):
+        if not current_app.config['METRICS_ENABLED'] or 'metrics_started' not in g:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        registry = self.registry
+        registry.request_duration.observe(time.perf_counter() - g.metrics_started, endpoint, request.method)
+        registry.requests.inc(endpoint, request.method, str(response.status_code))
+        registry.request_queries.observe(g.metrics_queries, endpoint)
+        if response.content_length is not None:
+            registry.response_size.observe(response.content_length, endpoint)
+        if g.get('metrics_statements'):
+            self._report_repeated_queries(endpoint, g.metrics_statements)
+        return response
+
+    def _report_repeated_queries(self, endpoint, statements):
+        threshold = current_app.config['REPEATED_QUERY_THRESHOLD']
+        for statement, runs in statements.items():
+            statement = ' '.join(statement.split())
+            distinct = set(runs)
+            if len(distinct) < len(runs):
+                repeated_query_logger.warning('Duplicate query in %s: ran %d times, %d with the same parameters as an earlier run: %s',
+                                              endpoint, len(runs), len(runs) - len(distinct), statement)
+            if len(distinct) >= threshold:
+                repeated_query_logger.warning('Possible N+1 query in %s: ran %d times, with %d different parameters: %s',
+                                              endpoint, len(runs), len(distinct), statement)
+
+    def _before_render_template(self, sender, template, context, **extra):
+        self._templates.__dict__.setdefault('started', []).append(time.perf_counter())
+
+    def _template_rendered(self, sender, template, context, **extra):
+        started = getattr(self._templates, 'started', None)
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if current_app.config['METRICS_ENABLED']:
+            self.registry.template_duration.observe(elapsed, template.name or 'string')
+
+    def _before_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        started = connection.info.get('metrics_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if not has_app_context() or 'metrics' not in current_app.extensions or not current_app.config['METRICS_ENABLED']:
+            return
+        endpoint = 'none'
+        if has_request_context():
+            endpoint = request.endpoint or 'unmatched'
+            g.metrics_queries = g.get('metrics_queries', 0) + 1
+            statements = g.get('metrics_statements')
+            if statements is not None:
+                statements.setdefault(statement, []).append(repr(parameters))
+        registry = self.registry
+        registry.queries.inc(endpoint)
+        registry.query_duration.observe(elapsed, endpoint)
+        threshold = current_app.config['SLOW_QUERY_THRESHOLD']
+        if threshold is not None and elapsed >= threshold:
+            registry.slow_queries.inc(endpoint)
+            slow_query_logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, endpoint, ' '.join(statement.split()))
@@ -0,0 +1,38 @@
+"""Add events_fts full-text index
+
+Revision ID: 3c1f8e2a7d40
+Revises: 9b5792595b54
+Create Date: 2026-10-18 14:55:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from search import EVENTS_FTS_TABLE, create_events_fts_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f8e2a7d40'
+down_revision = '9b5792595b54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(EVENTS_FTS_TABLE)
+    create_events_fts_triggers(op.execute)
+
+    # Backfill the index from the rows that already exist
+    op.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute('DROP TRIGGER IF EXISTS events_fts_au')
+    op.execute('DROP TRIGGER IF EXISTS events_fts_ad')
+    op.execute('DROP TRIGGER IF EXISTS events_fts_ai')
+    op.execute('DROP TABLE IF EXISTS events_fts')
@@ -0,0 +1,30 @@
+"""Match users' preferred locations to venues by exact name
+
+Revision ID: b8e3f6a2d915
+Revises: f1b7d4c9e263
+Create Date: 2026-10-19 15:27:44.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f6a2d915'
+down_revision = 'f1b7d4c9e263'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Preferred locations that name a venue are stored under its exact name (see c7d3e5a1b948),
+    # so feeds match them with plain equality
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_preferred_location_lower')
+        batch_op.create_index('ix_users_preferred_location', ['preferred_location'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_preferred_location')
+        batch_op.create_index('ix_users_preferred_location_lower', [sa.text('lower(preferred_location)')], unique=False)
@@ -0,0 +1,87 @@
+"""Add venues with a spatial grid index and link events to them
+
+Revision ID: c7d3e5a1b948
+Revises: a5f09c3e7b12
+Create Date: 2026-10-18 17:41:09.337120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from geo import gazetteer_rows, normalize_place_name
+from search import create_events_fts_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d3e5a1b948'
+down_revision = 'a5f09c3e7b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    venues = op.create_table('venues',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('grid_row', sa.Integer(), nullable=False),
+    sa.Column('grid_col', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('venue_id')
+    )
+    with op.batch_alter_table('venues', schema=None) as batch_op:
+        batch_op.create_index('ix_venues_grid_cell', ['grid_row', 'grid_col'], unique=False)
+        batch_op.create_index('ix_venues_name_lower', [sa.text('lower(name)')], unique=True)
+    op.bulk_insert(venues, gazetteer_rows())
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('venue_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_events_venue_id_venues', 'venues', ['venue_id'], ['venue_id'])
+        batch_op.create_index('ix_events_venue_id_event_date', ['venue_id', 'event_date'], unique=False)
+    if op.get_bind().dialect.name == 'sqlite':
+        create_events_fts_triggers(op.execute)
+
+    # Link existing events whose location names a known venue, and store known places (events' and
+    # users' preferred locations) under the venue's own name, as forms.canonical_place_name does for new ones
+    connection = op.get_bind()
+    venues_by_name = {normalize_place_name(name): (venue_id, name) for venue_id, name in connection.execute(sa.text('SELECT venue_id, name FROM venues'))}
+    events = sa.table('events', sa.column('event_id', sa.Integer), sa.column('location', sa.String), sa.column('venue_id', sa.Integer))
+    users = sa.table('users', sa.column('username', sa.String), sa.column('preferred_location', sa.String))
+
+    event_updates = []
+    for event_id, location in connection.execute(sa.select(events.c.event_id, events.c.location)):
+        venue = venues_by_name.get(normalize_place_name(location or ''))
+        if venue:
+            event_updates.append({'b_event_id': event_id, 'b_venue_id': venue[0], 'b_location': venue[1]})
+    if event_updates:
+        connection.execute(
+            events.update().where(events.c.event_id == sa.bindparam('b_event_id'))
+            .values(venue_id=sa.bindparam('b_venue_id'), location=sa.bindparam('b_location')),
+            event_updates
+        )
+
+    user_updates = []
+    for username, preferred_location in connection.execute(sa.select(users.c.username, users.c.preferred_location)):
+        venue = venues_by_name.get(normalize_place_name(preferred_location or ''))
+        if venue and venue[1] != preferred_location:
+            user_updates.append({'b_username': username, 'b_preferred_location': venue[1]})
+    if user_updates:
+        connection.execute(
+            users.update().where(users.c.username == sa.bindparam('b_username'))
+            .values(preferred_location=sa.bindparam('b_preferred_location')),
+            user_updates
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_venue_id_event_date')
+        batch_op.drop_constraint('fk_events_venue_id_venues', type_='foreignkey')
+        batch_op.drop_column('venue_id')
+    if op.get_bind().dialect.name == 'sqlite':
+        create_events_fts_triggers(op.execute)
+
+    with op.batch_alter_table('venues', schema=None) as batch_op:
+        batch_op.drop_index('ix_venues_name_lower')
+        batch_op.drop_index('ix_venues_grid_cell')
+
+    op.drop_table('venues')
@@ -0,0 +1,47 @@
+"""Add materialized "for you" feeds
+
+Existing users' feeds are filled by running `flask rebuild-feeds` after upgrading.
+
+Revision ID: d4a8b2e6f173
+Revises: c7d3e5a1b948
+Create Date: 2026-10-18 18:25:51.604218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8b2e6f173'
+down_revision = 'c7d3e5a1b948'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('feed_entries',
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('event_date', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.event_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['username'], ['users.username'], ),
+    sa.PrimaryKeyConstraint('username', 'event_id')
+    )
+    with op.batch_alter_table('feed_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_feed_entries_event_id', ['event_id'], unique=False)
+        batch_op.create_index('ix_feed_entries_username_score', ['username', 'score', 'event_id', 'event_date'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_preferred_location_lower', [sa.text('lower(preferred_location)')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_preferred_location_lower')
+
+    with op.batch_alter_table('feed_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_feed_entries_username_score')
+        batch_op.drop_index('ix_feed_entries_event_id')
+
+    op.drop_table('feed_entries')
@@ -0,0 +1,49 @@
+"""Add event RSVPs and a count of seats taken
+
+Revision ID: e5f2c9a7b318
+Revises: d4a8b2e6f173
+Create Date: 2026-10-18 19:02:37.815530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from search import create_events_fts_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f2c9a7b318'
+down_revision = 'd4a8b2e6f173'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A plain ADD COLUMN with a default, so SQLite does not rebuild the events table
+    op.add_column('events', sa.Column('seats_taken', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('event_rsvps',
+    sa.Column('rsvp_id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.event_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['username'], ['users.username'], ),
+    sa.PrimaryKeyConstraint('rsvp_id'),
+    sa.UniqueConstraint('event_id', 'username', name='uq_event_rsvps_event_id_username')
+    )
+    with op.batch_alter_table('event_rsvps', schema=None) as batch_op:
+        batch_op.create_index('ix_event_rsvps_event_id_status', ['event_id', 'status', 'rsvp_id'], unique=False)
+        batch_op.create_index('ix_event_rsvps_username', ['username'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_rsvps', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_rsvps_username')
+        batch_op.drop_index('ix_event_rsvps_event_id_status')
+
+    op.drop_table('event_rsvps')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('seats_taken')
+    if op.get_bind().dialect.name == 'sqlite':
+        create_events_fts_triggers(op.execute)
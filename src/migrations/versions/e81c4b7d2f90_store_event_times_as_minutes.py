@@ -0,0 +1,58 @@
+"""Store event start and end times as minutes after midnight
+
+Revision ID: e81c4b7d2f90
+Revises: 96adaac23450
+Create Date: 2026-10-18 16:12:44.208311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from search import create_events_fts_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81c4b7d2f90'
+down_revision = '96adaac23450'
+branch_labels = None
+depends_on = None
+
+# 'HH:MM' -> minutes after midnight, and back
+TO_MINUTES = "CAST(substr({0}, 1, 2) AS INTEGER) * 60 + CAST(substr({0}, 4, 2) AS INTEGER)"
+TO_TIME_STRING = {
+    'sqlite': "printf('%02d:%02d', {0} / 60, {0} % 60)",
+    'postgresql': "lpad(CAST({0} / 60 AS VARCHAR), 2, '0') || ':' || lpad(CAST({0} % 60 AS VARCHAR), 2, '0')",
+}
+
+
+def upgrade():
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        # SQLite rebuilds the table to change the column type and copies the converted values across
+        op.execute(f"UPDATE events SET start_time = {TO_MINUTES.format('start_time')}, end_time = {TO_MINUTES.format('end_time')}")
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.alter_column('start_time', existing_type=sa.String(), type_=sa.Integer(), existing_nullable=False,
+                              postgresql_using=TO_MINUTES.format('start_time'))
+        batch_op.alter_column('end_time', existing_type=sa.String(), type_=sa.Integer(), existing_nullable=False,
+                              postgresql_using=TO_MINUTES.format('end_time'))
+        batch_op.create_index('ix_events_event_date_start_time', ['event_date', 'start_time'], unique=False)
+
+    if sqlite:
+        create_events_fts_triggers(op.execute)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    to_time_string = TO_TIME_STRING.get(dialect, TO_TIME_STRING['postgresql'])
+    if dialect == 'sqlite':
+        op.execute(f"UPDATE events SET start_time = {to_time_string.format('start_time')}, end_time = {to_time_string.format('end_time')}")
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_event_date_start_time')
+        batch_op.alter_column('end_time', existing_type=sa.Integer(), type_=sa.String(), existing_nullable=False,
+                              postgresql_using=to_time_string.format('end_time'))
+        batch_op.alter_column('start_time', existing_type=sa.Integer(), type_=sa.String(), existing_nullable=False,
+                              postgresql_using=to_time_string.format('start_time'))
+
+    if dialect == 'sqlite':
+        create_events_fts_triggers(op.execute)
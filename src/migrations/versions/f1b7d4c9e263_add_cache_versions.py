@@ -0,0 +1,29 @@
+"""Add shared cache version numbers
+
+Revision ID: f1b7d4c9e263
+Revises: e5f2c9a7b318
+Create Date: 2026-10-19 09:14:02.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d4c9e263'
+down_revision = 'e5f2c9a7b318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table('cache_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(cache_versions, [{'name': 'events', 'version': 0}, {'name': 'event_seats', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,319 @@
+from extensions import db
+from geo import gazetteer_rows, grid_cell, grid_ranges, haversine_km, normalize_place_name
+from search import EVENTS_FTS_DDL, EVENTS_FTS_DROP
+
+##====================================================================================================================================================================================
+## Define DB Models
+##====================================================================================================================================================================================
+
+# Version numbers of cached data, shared by every process that serves the app. Once a transaction that
+# changed the data commits, its row is bumped, and processes compare the number with the one their cache was built at
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+
+    EVENTS = 'events'  # event details: browse facets and cached pages
+    SEATS = 'event_seats'  # seat counts only, which no facet depends on: cached pages
+
+    name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def bump(cls, connection, name):
+        connection.execute(db.update(cls.__table__).where(cls.__table__.c.name == name).values(version=cls.__table__.c.version + 1))
+
+    @classmethod
+    def read(cls, connection, name):
+        return connection.execute(db.select(cls.__table__.c.version).where(cls.__table__.c.name == name)).scalar() or 0
+
+    def __repr__(self):
+        return f"<CacheVersion(name='{self.name}', version={self.version})>"
+
+def record_event_changes(session, event_ids, name=CacheVersion.EVENTS):
+    """Note that the current transaction changed these events.
+
+    Once the transaction commits, this process drops its cached copies and the shared version
+    `name` is bumped, so other processes drop theirs when they next check it (see events.py).
+    The bump is a transaction of its own: a single row written inside every change would make
+    all of them wait on each other. Pass CacheVersion.SEATS for changes that only move seat counts.
+    """
+    session.info.setdefault('changed_events', set()).update(event_ids)
+    session.info.setdefault('changed_versions', set()).add(name)
+
+@db.event.listens_for(CacheVersion.__table__, 'after_create')
+def insert_cache_versions(target, connection, **kw):
+    connection.execute(target.insert(), [{'name': name, 'version': 0} for name in (CacheVersion.EVENTS, CacheVersion.SEATS)])
+
+# User Model Definition
+class User(db.Model):
+    __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_email', 'email', unique=True),
+        # Finds the users to fan a new event out to by their preferred location (see feed.py). Known
+        # places are stored under the venue's own name (see forms.canonical_place_name), so plain equality matches
+        db.Index('ix_users_preferred_location', 'preferred_location'),
+    )
+
+    username = db.Column(db.String, primary_key=True)
+    password = db.Column(db.String, nullable=False)
+    email = db.Column(db.String, nullable=False)
+    fullname = db.Column(db.String, nullable=False)
+    age = db.Column(db.Integer)
+    preferred_location = db.Column(db.String)
+    profile_picture = db.Column(db.String, default='images/default-profile-pic.png')
+
+    def __repr__(self):
+        return f"<User(username='{self.username}', email='{self.email}', fullname='{self.fullname}')>"
+
+
+# Venue Model Definition: named places with coordinates, indexed by grid cell for radius queries
+class Venue(db.Model):
+    __tablename__ = 'venues'
+    __table_args__ = (
+        db.Index('ix_venues_grid_cell', 'grid_row', 'grid_col'),
+    )
+
+    venue_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    grid_row = db.Column(db.Integer, nullable=False)
+    grid_col = db.Column(db.Integer, nullable=False)
+
+    def __init__(self, **kwargs):
+        super(Venue, self).__init__(**kwargs)
+        self.grid_row, self.grid_col = grid_cell(self.latitude, self.longitude)
+
+    @classmethod
+    def find(cls, name):
+        # The venue called `name`, ignoring case and extra whitespace
+        if not name or not name.strip():
+            return None
+        return cls.query.filter(db.func.lower(cls.name) == normalize_place_name(name)).first()
+
+    @classmethod
+    def within(cls, latitude, longitude, radius_km):
+        # (venue, distance in km) pairs within radius_km of a point, nearest first. The grid index
+        # narrows the search to the cells around the point; exact distances are only computed for those
+        (min_row, max_row), (min_col, max_col) = grid_ranges(latitude, longitude, radius_km)
+        candidates = cls.query.filter(cls.grid_row.between(min_row, max_row), cls.grid_col.between(min_col, max_col)).all()
+        distances = [(venue, haversine_km(latitude, longitude, venue.latitude, venue.longitude)) for venue in candidates]
+        return sorted([(venue, distance) for venue, distance in distances if distance <= radius_km], key=lambda pair: pair[1])
+
+    def __repr__(self):
+        return f"<Venue(venue_id={self.venue_id}, name='{self.name}', latitude={self.latitude}, longitude={self.longitude})>"
+
+db.Index('ix_venues_name_lower', db.func.lower(Venue.name), unique=True)
+
+# New databases start with the local gazetteer
+@db.event.listens_for(Venue.__table__, 'after_create')
+def insert_gazetteer(target, connection, **kw):
+    connection.execute(target.insert(), gazetteer_rows())
+
+# Event Model Definition
+class Events(db.Model):
+    __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_username', 'username'),
+        db.Index('ix_events_event_date_sport_type', 'event_date', 'sport_type'),
+        db.Index('ix_events_event_date_start_time', 'event_date', 'start_time'),
+        # Serves location lookups and venue double-booking checks, which never need to read the table
+        db.Index('ix_events_venue_schedule', 'location', 'event_date', 'start_time', 'end_time'),
+        db.Index('ix_events_venue_id_event_date', 'venue_id', 'event_date'),
+    )
+
+    event_id = db.Column(db.Integer, primary_key=True)
+    event_title = db.Column(db.String, nullable=False, unique=True)
+    sport_type = db.Column(db.String, nullable=False)
+    num_players = db.Column(db.Integer, nullable=False)
+    playing_level = db.Column(db.String, nullable=False)
+    event_date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Integer, nullable=False)  # minutes after midnight
+    end_time = db.Column(db.Integer, nullable=False)
+    location = db.Column(db.String, nullable=False)
+    description = db.Column(db.String, nullable=False)
+    gender_preference = db.Column(db.String, nullable=False)
+    contact_information = db.Column(db.String, nullable=False)
+    username = db.Column(db.String, db.ForeignKey('users.username'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.venue_id'))  # set when the location matches a known venue
+    venue = db.relationship('Venue')
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # joined players, out of num_players
+
+    @classmethod
+    def venue_conflicts(cls, location, event_date, start_time, end_time, exclude_event_id=None, venue_id=None):
+        # Other events at the same venue (or, for places that are not venues, the same location) whose
+        # times overlap [start_time, end_time) on event_date. Events saved under the venue's name before
+        # being linked to it count as the venue's too
+        same_place = cls.location == location
+        if venue_id is not None:
+            same_place = db.or_(cls.venue_id == venue_id, db.and_(cls.venue_id.is_(None), same_place))
+        query = cls.query.filter(
+            same_place,
+            cls.event_date == event_date,
+            cls.start_time < end_time,
+            cls.end_time > start_time
+        )
+        if exclude_event_id is not None:
+            query = query.filter(cls.event_id != exclude_event_id)
+        return query.order_by(cls.start_time).all()
+
+    @classmethod
+    def lock_schedule(cls, bookings):
+        """Hold off other bookings of the same venue-days until this transaction ends.
+
+        `bookings` are (venue_id, location, event_date) tuples. On PostgreSQL each venue-day gets a
+        transaction-level advisory lock, taken in a fixed order so two bookings never wait on each
+        other. SQLite has one writer at a time, so there the booking's own insert or update is the
+        lock: callers write first, then look for clashes (see EventForm.hold_venue).
+        """
+        if db.engine.dialect.name != 'postgresql':
+            return
+        for key in sorted({f'{location if venue_id is None else venue_id}@{event_date}' for venue_id, location, event_date in bookings}):
+            db.session.execute(db.select(db.func.pg_advisory_xact_lock(db.func.hashtext(key))))
+
+    @classmethod
+    def clashing(cls, event_ids):
+        # Those of event_ids that overlap another event at the same place, in one query (see venue_conflicts)
+        other = db.aliased(cls)
+        same_place = db.or_(
+            db.and_(cls.venue_id.is_not(None), other.venue_id == cls.venue_id),
+            db.and_(db.or_(cls.venue_id.is_(None), other.venue_id.is_(None)), other.location == cls.location)
+        )
+        return set(db.session.scalars(
+            db.select(cls.event_id).distinct().join(other, db.and_(
+                other.event_id != cls.event_id,
+                other.event_date == cls.event_date,
+                other.start_time < cls.end_time,
+                other.end_time > cls.start_time,
+                same_place
+            )).where(cls.event_id.in_(event_ids))
+        ))
+
+    def __repr__(self):
+        return f"<Events(event_id='{self.event_id}', event_title='{self.event_title}', sport_type='{self.sport_type}', num_players={self.num_players}, event_date='{self.event_date.strftime('%d/%m/%Y')}', start_time='{self.start_time}', end_time='{self.end_time}', location='{self.location}', description='{self.description}', gender_preference='{self.gender_preference}', contact_information='{self.contact_information}', username='{self.username}')>"
+
+# Full-text index over events, kept in sync by triggers (SQLite only)
+for statement in EVENTS_FTS_DDL:
+    db.event.listen(Events.__table__, 'after_create', db.DDL(statement).execute_if(dialect='sqlite'))
+db.event.listen(Events.__table__, 'before_drop', db.DDL(EVENTS_FTS_DROP).execute_if(dialect='sqlite'))
+
+# RSVPs: players who joined an event, and those waiting for a seat once it is full
+class EventRsvp(db.Model):
+    __tablename__ = 'event_rsvps'
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'username', name='uq_event_rsvps_event_id_username'),
+        # Finds the longest-waiting player without reading the rest of the event's RSVPs
+        db.Index('ix_event_rsvps_event_id_status', 'event_id', 'status', 'rsvp_id'),
+        db.Index('ix_event_rsvps_username', 'username'),
+    )
+
+    JOINED = 'joined'
+    WAITLISTED = 'waitlisted'
+
+    rsvp_id = db.Column(db.Integer, primary_key=True)  # increasing, so it doubles as waitlist order
+    event_id = db.Column(db.Integer, db.ForeignKey('events.event_id', ondelete='CASCADE'), nullable=False)
+    username = db.Column(db.String, db.ForeignKey('users.username'), nullable=False)
+    status = db.Column(db.String, nullable=False)
+
+    # Seats are counted in events.seats_taken and only ever changed by conditional UPDATEs of that one
+    # row, so concurrent joins cannot oversell an event and never lock more than the event itself
+
+    @classmethod
+    def join(cls, event_id, username):
+        """Join an event, or its waitlist when every seat is taken; returns the new RSVP's status.
+
+        Raises IntegrityError if the user already has an RSVP for the event. Rolling back also
+        returns any seat taken.
+        """
+        status = cls.JOINED if cls._claim_seat(event_id) else cls.WAITLISTED
+        db.session.add(cls(event_id=event_id, username=username, status=status))
+        db.session.flush()
+        return status
+
+    @classmethod
+    def leave(cls, event_id, username):
+        """Give up a seat or waitlist place; returns the status the RSVP had, or None if there was none.
+
+        A freed seat goes to the longest-waiting player, if anyone is waiting.
+        """
+        while True:
+            rsvp = db.session.execute(db.select(cls.rsvp_id, cls.status).filter_by(event_id=event_id, username=username)).first()
+            if rsvp is None:
+                return None
+            # Only delete the RSVP in the state it was read in: a waitlisted player may be promoted meanwhile
+            if db.session.execute(db.delete(cls).where(cls.rsvp_id == rsvp.rsvp_id, cls.status == rsvp.status)).rowcount:
+                break
+        if rsvp.status == cls.JOINED and cls._promote_next(event_id) is None:
+            cls._release_seat(event_id)
+        return rsvp.status
+
+    @classmethod
+    def fill_from_waitlist(cls, event_id):
+        # Move waiting players onto seats that became free, e.g. after num_players was raised; returns their usernames
+        promoted = []
+        while cls._claim_seat(event_id):
+            username = cls._promote_next(event_id)
+            if username is None:
+                cls._release_seat(event_id)
+                break
+            promoted.append(username)
+        return promoted
+
+    @classmethod
+    def _claim_seat(cls, event_id):
+        return db.session.execute(
+            db.update(Events)
+            .where(Events.event_id == event_id, Events.seats_taken < Events.num_players)
+            .values(seats_taken=Events.seats_taken + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+
+    @classmethod
+    def _release_seat(cls, event_id):
+        db.session.execute(
+            db.update(Events)
+            .where(Events.event_id == event_id, Events.seats_taken > 0)
+            .values(seats_taken=Events.seats_taken - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def _promote_next(cls, event_id):
+        # Hand a seat the caller holds to the longest-waiting player; returns their username, or None if nobody is waiting
+        while True:
+            waiting = db.session.execute(
+                db.select(cls.rsvp_id, cls.username).filter_by(event_id=event_id, status=cls.WAITLISTED).order_by(cls.rsvp_id).limit(1)
+            ).first()
+            if waiting is None:
+                return None
+            if db.session.execute(db.update(cls).where(cls.rsvp_id == waiting.rsvp_id, cls.status == cls.WAITLISTED).values(status=cls.JOINED)).rowcount:
+                return waiting.username
+
+    def __repr__(self):
+        return f"<EventRsvp(event_id={self.event_id}, username='{self.username}', status='{self.status}')>"
+
+# Reference counts for content-addressed profile pictures; shared files are deleted only when unused
+class ProfilePictureBlob(db.Model):
+    __tablename__ = 'profile_picture_blobs'
+
+    digest = db.Column(db.String(64), primary_key=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ProfilePictureBlob(digest='{self.digest}', ref_count={self.ref_count})>"
+
+# Materialized "for you" feeds: each user's best-scoring upcoming events, maintained by feed.py as events change
+class FeedEntry(db.Model):
+    __tablename__ = 'feed_entries'
+    __table_args__ = (
+        # A user's feed is one range scan in score order; event_date is included so past events are skipped within the index
+        db.Index('ix_feed_entries_username_score', 'username', 'score', 'event_id', 'event_date'),
+        db.Index('ix_feed_entries_event_id', 'event_id'),
+    )
+
+    username = db.Column(db.String, db.ForeignKey('users.username'), primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.event_id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    event_date = db.Column(db.Date, nullable=False)  # copied from the event
+
+    def __repr__(self):
+        return f"<FeedEntry(username='{self.username}', event_id={self.event_id}, score={self.score})>"
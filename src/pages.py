@@ -0,0 +1,92 @@
+import hashlib
+import os
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, render_template, request, session, make_response, g, message_flashed
+from sqlalchemy.exc import SQLAlchemyError
+from cache import LRUCache
+from extensions import db
+
+##====================================================================================================================================================================================
+## Page Rendering and Caching
+##====================================================================================================================================================================================
+
+# Cached copies of pages served to anonymous visitors, keyed by (endpoint, view args, query string).
+# `versions` holds the shared cache versions the page was rendered at (see models.CacheVersion)
+CachedPage = namedtuple('CachedPage', ['body', 'mimetype', 'etag', 'last_modified', 'versions'])
+
+def init_app(app):
+    app.extensions['page_cache'] = LRUCache(maxsize=app.config['PAGE_CACHE_SIZE'], ttl=app.config['PAGE_CACHE_TTL'])
+    message_flashed.connect(record_flash, app)
+
+def page_cache():
+    return current_app.extensions['page_cache']
+
+def shared_versions(names):
+    # Bumped by any process that changes data pages show, so pages it rendered elsewhere are not served stale
+    versions = current_app.extensions['cache_versions']
+    return tuple(versions[name].get() for name in names)
+
+# Render a page once; optionally keep a copy on disk for HTML validation
+def render_page(template_name, **context):
+    rendered_html = render_template(template_name, **context)
+    if current_app.config['SAVE_HTML_SNAPSHOTS']:
+        save_snapshot(template_name, rendered_html)
+    return rendered_html
+
+def save_snapshot(template_name, rendered_html):
+    output_path = os.path.join(current_app.config['SNAPSHOT_FOLDER'], template_name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as file:
+        file.write(rendered_html)
+
+def record_flash(sender, message, category):
+    # Pages that flash a message are specific to this visit and never cached
+    g.page_flashed = True
+
+def cached_page(view=None, versions=()):
+    """Serve anonymous GETs from the page cache, with ETag/Last-Modified revalidation.
+
+    `versions` names the shared cache versions (see models.CacheVersion) whose data the page
+    shows; a cached copy is only re-rendered when one of those changes, or when its TTL ends.
+    Use as @cached_page, or @cached_page(versions=(...)) for pages built from changing data.
+    """
+    if view is None:
+        return lambda view: cached_page(view, versions)
+
+    @wraps(view)
+    def decorator(*args, **kwargs):
+        if not current_app.config['PAGE_CACHE_ENABLED'] or request.method != 'GET' or 'username' in session or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        try:
+            current_versions = shared_versions(versions)
+        except SQLAlchemyError:
+            # Without the versions a cached copy can't be trusted, but the page itself may still render
+            db.session.rollback()
+            current_app.logger.warning('Serving %s uncached: cache versions could not be read', request.endpoint, exc_info=True)
+            return view(*args, **kwargs)
+
+        key = (request.endpoint, tuple(sorted(request.view_args.items())), request.query_string)
+        cache = page_cache()
+        page = cache.get(key)
+        if page is None or page.versions != current_versions:
+            # A page rendered while a commit invalidated it is served once but not stored
+            generation = cache.generation
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or g.get('page_flashed'):
+                return response
+            body = response.get_data()
+            page = CachedPage(body, response.mimetype, hashlib.sha1(body).hexdigest(), datetime.now(timezone.utc).replace(microsecond=0), current_versions)
+            cache.set(key, page, generation)
+
+        response = make_response(page.body)
+        response.mimetype = page.mimetype
+        response.set_etag(page.etag)
+        response.last_modified = page.last_modified
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
+
+    return decorator
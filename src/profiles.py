@@ -0,0 +1,218 @@
+import os
+import uuid
+from flask import Blueprint, current_app, g, request, redirect, url_for, flash, send_from_directory, abort
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from extensions import db, image_processor
+from feed import queue_feed_update
+from forms import EditProfileForm, EditProfilePictureForm, RemoveProfilePictureForm
+from images import InvalidImageError, save_upload, write_profile_picture_variants, variant_filename, content_stem, picture_digest, profile_picture_variant, profile_picture_files
+from models import User, Events, EventRsvp, ProfilePictureBlob
+from pages import render_page
+from utils import login_required
+
+##====================================================================================================================================================================================
+## Routes and Logic
+##====================================================================================================================================================================================
+
+# The signed-in user's profile and profile picture
+bp = Blueprint('profiles', __name__)
+
+# INSERT ... ON CONFLICT DO UPDATE, for counting picture references in one statement
+UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Save an uploaded picture as-is and hand it to the image processor. Uploads are staged outside
+# the static folder, so an unprocessed file is never served
+def queue_profile_picture(username, file):
+    ext = os.path.splitext(file.filename)[1]
+    upload_path = os.path.join(current_app.config['INCOMING_FOLDER'], secure_filename(f"{uuid.uuid4().hex}{ext}"))
+    digest = save_upload(file.stream, upload_path)
+    return image_processor.submit(process_profile_picture, current_app._get_current_object(), username, upload_path, digest)
+
+# Runs on the image processor: writes the avatar variants, then points the user at them
+def process_profile_picture(app, username, upload_path, digest):
+    with app.app_context():
+        try:
+            set_profile_picture(username, upload_path, digest)
+        except InvalidImageError:
+            db.session.rollback()
+            app.logger.warning('Discarding unreadable profile picture upload for %s', username)
+        except Exception:
+            # Nothing waits on the image processor's result, so anything else would fail silently
+            db.session.rollback()
+            app.logger.exception('Failed to process profile picture upload for %s', username)
+        finally:
+            os.remove(upload_path)
+
+def set_profile_picture(username, upload_path, digest):
+    stem = content_stem(digest)
+    picture_path = f"profile-pictures/{variant_filename(stem, 'medium', 'jpg')}"
+    user = db.session.get(User, username)
+    if user is None or user.profile_picture == picture_path:
+        return
+
+    # Identical uploads share one set of files, so only the first copy is decoded. The reference is taken
+    # and committed first, so decoding never holds the database's write lock, and the files are checked
+    # once it is held: the last release deletes them before committing, so they cannot disappear from
+    # under a reference taken after it
+    first_reference = retain_profile_picture(picture_path)
+    db.session.commit()
+    try:
+        if first_reference or not os.path.exists(profile_picture_file_path(picture_path)):
+            write_profile_picture_variants(upload_path, current_app.config['UPLOAD_FOLDER'], stem)
+    except Exception:
+        release_profile_picture(picture_path)
+        db.session.commit()
+        raise
+
+    # If the same picture was set meanwhile, this drops the extra reference
+    user = db.session.get(User, username)
+    old_picture = user.profile_picture
+    user.profile_picture = picture_path
+    release_profile_picture(old_picture)
+    db.session.commit()
+
+def retain_profile_picture(picture_path):
+    # Add one reference to a picture; returns True if it is the only one, so its files may need writing
+    digest = picture_digest(picture_path)
+    if digest is None:
+        return False
+    insert = UPSERTS[db.engine.dialect.name](ProfilePictureBlob).values(digest=digest, ref_count=1)
+    ref_count = db.session.execute(
+        insert.on_conflict_do_update(index_elements=[ProfilePictureBlob.digest], set_={'ref_count': ProfilePictureBlob.ref_count + 1})
+        .returning(ProfilePictureBlob.ref_count)
+    ).scalar_one()
+    return ref_count == 1
+
+def release_profile_picture(picture_path):
+    # Drop one reference to a picture, deleting its files with the last one. They are deleted before
+    # the caller commits, while the row is still locked, so a concurrent retain waits and rewrites them
+    if not picture_path.startswith('profile-pictures/'):
+        return
+    digest = picture_digest(picture_path)
+    if digest is not None:
+        db.session.execute(
+            db.update(ProfilePictureBlob)
+            .where(ProfilePictureBlob.digest == digest)
+            .values(ref_count=ProfilePictureBlob.ref_count - 1)
+        )
+        deleted = db.session.execute(
+            db.delete(ProfilePictureBlob)
+            .where(ProfilePictureBlob.digest == digest, ProfilePictureBlob.ref_count <= 0)
+        ).rowcount
+        if not deleted:
+            return
+    # Pictures stored before content addressing belong to a single user
+    delete_profile_picture_files(picture_path)
+
+def profile_picture_file_path(picture_path):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], picture_path.removeprefix('profile-pictures/'))
+
+# Delete a picture and all of its variants from disk
+def delete_profile_picture_files(picture_path):
+    for path in profile_picture_files(picture_path):
+        file_path = profile_picture_file_path(path)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+# URL for one variant of a stored profile picture
+@bp.app_template_global()
+def profile_picture_url(picture_path, size='medium', extension='jpg'):
+    variant = profile_picture_variant(picture_path, size, extension)
+    if picture_digest(variant):
+        return url_for('profiles.profile_picture_file', filename=variant.removeprefix('profile-pictures/'))
+    return url_for('static', filename=variant)
+
+@bp.app_template_global()
+def has_profile_picture_variants(picture_path):
+    return profile_picture_variant(picture_path, 'thumb') != picture_path
+
+# Content-addressed profile pictures, served with a long-lived immutable cache policy
+@bp.route('/media/profile-pictures/<path:filename>')
+def profile_picture_file(filename):
+    if picture_digest(filename) is None:
+        abort(404)
+    response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, max_age=current_app.config['PROFILE_PICTURE_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# Display User Profile
+@bp.route('/profile')
+@login_required
+def profile():
+    user = g.current_user
+    user_events = Events.query.filter_by(username=user.username).all()
+    # Events the user has joined or is waiting for, soonest first
+    rsvps = db.session.query(Events, EventRsvp.status).join(EventRsvp, EventRsvp.event_id == Events.event_id) \
+        .filter(EventRsvp.username == user.username).order_by(Events.event_date, Events.start_time).all()
+
+    return render_page('profile.html', user=user, events=user_events, rsvps=rsvps)
+
+# Edit User Profile
+@bp.route('/edit_profile', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    form = EditProfileForm()
+    user = g.current_user
+    username = user.username
+
+    if request.method == 'GET':
+        form.email.data = user.email
+        form.fullname.data = user.fullname
+        form.age.data = user.age
+        form.preferred_location.data = user.preferred_location
+
+    if form.validate_on_submit():
+        user.email = form.email.data
+        user.fullname = form.fullname.data
+        user.age = form.age.data
+        user.preferred_location = form.preferred_location.data
+        try:
+            db.session.commit()
+            queue_feed_update(username=username)
+            flash('Your profile has been updated.', 'success')
+            return redirect(url_for('profiles.profile'))
+        except IntegrityError:
+            db.session.rollback()
+            flash('Email already in use, please choose a different email.', 'error')
+
+    return render_page('edit_profile.html', form=form)
+
+@bp.route('/edit_profile_picture', methods=['GET', 'POST'])
+@login_required
+def edit_profile_picture():
+    form = EditProfilePictureForm()
+    remove_form = RemoveProfilePictureForm()
+    username = g.current_user.username
+
+    if form.validate_on_submit():
+        file = form.profile_picture.data
+        if file and file.filename != '':
+            # The old picture is replaced (and deleted) once the new one has been processed
+            queue_profile_picture(username, file)
+            flash('Your profile picture has been updated.', 'success')
+            return redirect(url_for('profiles.profile'))
+
+    return render_page('edit_profile_picture.html', form=form, remove_form=remove_form)
+
+# Remove User Profile Picture
+@bp.route('/remove_profile_picture', methods=['POST'])
+@login_required
+def remove_profile_picture():
+    form = RemoveProfilePictureForm()
+    if form.validate_on_submit():
+        user = g.current_user
+
+        # Set the profile picture to the default picture and delete the old one if nobody else uses it
+        old_picture = user.profile_picture
+        user.profile_picture = 'images/default-profile-pic.png'
+        release_profile_picture(old_picture)
+        db.session.commit()
+        flash('Profile picture has been removed.', 'success')
+
+        return redirect(url_for('profiles.profile'))
+    else:
+        flash('Failed to remove profile picture.', 'error')
+        return redirect(url_for('profiles.profile'))
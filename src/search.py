@@ -0,0 +1,90 @@
+import re
+from contextlib import contextmanager
+
+# SQLite FTS5 index over the searchable text columns of the events table.
+# It is an external-content table, so the text itself lives only in `events`
+# and the triggers below keep the index in step with every insert, update and delete.
+EVENTS_FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+        event_title, description, location,
+        content='events', content_rowid='event_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+
+# Migrations re-create these after rebuilding the events table (see create_events_fts_triggers),
+# so changing them takes a new migration that drops and re-creates them
+EVENTS_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events BEGIN
+        INSERT INTO events_fts(rowid, event_title, description, location)
+        VALUES (new.event_id, new.event_title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, event_title, description, location)
+        VALUES ('delete', old.event_id, old.event_title, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_au AFTER UPDATE OF event_title, description, location ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, event_title, description, location)
+        VALUES ('delete', old.event_id, old.event_title, old.description, old.location);
+        INSERT INTO events_fts(rowid, event_title, description, location)
+        VALUES (new.event_id, new.event_title, new.description, new.location);
+    END
+    """,
+]
+
+EVENTS_FTS_DDL = [EVENTS_FTS_TABLE, *EVENTS_FTS_TRIGGERS]
+EVENTS_FTS_DROP = 'DROP TABLE IF EXISTS events_fts'
+
+EVENTS_FTS_INSERT_TRIGGER = EVENTS_FTS_TRIGGERS[0]
+EVENTS_FTS_REBUILD = "INSERT INTO events_fts(events_fts) VALUES ('rebuild')"
+
+# Column weights for bm25(): a hit in the title counts most, then the location
+EVENTS_FTS_RANK = 'bm25(events_fts, 10.0, 1.0, 5.0)'
+
+
+def create_events_fts_triggers(execute):
+    """Create the triggers that keep events_fts in step with the events table.
+
+    Migrations that rebuild the events table call this with op.execute, since
+    SQLite drops a table's triggers along with it.
+    """
+    for statement in EVENTS_FTS_TRIGGERS:
+        execute(statement)
+
+
+@contextmanager
+def events_fts_bulk_load(engine):
+    """Skip per-row index maintenance while bulk inserting events, then rebuild the index once.
+
+    The insert trigger costs several times more than the insert itself, and one rebuild
+    at the end is far cheaper than a million trigger calls. Does nothing outside SQLite.
+    """
+    if engine.dialect.name != 'sqlite':
+        yield
+        return
+    with engine.begin() as connection:
+        connection.exec_driver_sql('DROP TRIGGER IF EXISTS events_fts_ai')
+    try:
+        yield
+    finally:
+        with engine.begin() as connection:
+            connection.exec_driver_sql(EVENTS_FTS_INSERT_TRIGGER)
+            connection.exec_driver_sql(EVENTS_FTS_REBUILD)
+
+
+def build_fts_query(text):
+    """Turn free text from the search box into an FTS5 MATCH expression.
+
+    Each word becomes a quoted prefix term, so user input can never be parsed as
+    FTS5 query syntax and "bask" still finds "Basketball". Returns None if the
+    text has no searchable words.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
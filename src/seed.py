@@ -0,0 +1,193 @@
+import csv
+import json
+import random
+from contextlib import contextmanager
+from datetime import date, timedelta
+from sqlalchemy import text
+from utils import parse_time
+
+
+# Reference data for generated rows, shaped like what users actually post
+SPORT_TYPES = ['Basketball', 'Soccer', 'Tennis']
+PLAYING_LEVELS = ['Beginner', 'Intermediate', 'Advanced']
+GENDER_PREFERENCES = ['Male', 'Female', 'Mixed']
+LOCATIONS = [
+    'Crawley', 'Nedlands', 'Subiaco', 'Claremont', 'Perth', 'Northbridge', 'Leederville',
+    'Mount Lawley', 'Victoria Park', 'South Perth', 'Como', 'Fremantle', 'Cottesloe',
+    'Scarborough', 'Morley', 'Joondalup', 'Midland', 'Cannington', 'Rockingham', 'Bentley'
+]
+# SQLite page cache used while bulk loading, in KiB; the 2 MB default thrashes once indexes outgrow it
+BULK_LOAD_CACHE_KIB = 256 * 1024
+
+DESCRIPTIONS = [
+    'Friendly social game, all welcome',
+    'Need a sub for our weekly fixture',
+    'Bring your water bottle and a light and dark shirt',
+    'Competitive match, please be on time',
+    'Casual hit, equipment provided',
+    'Training session followed by a short game'
+]
+
+
+def generate_users(count, password_hashes, start=0, seed=0):
+    """Yield `count` user rows as dicts, cycling through pre-computed password hashes."""
+    rng = random.Random(seed)
+    for index in range(start, start + count):
+        yield {
+            'username': username_for(index),
+            'password': password_hashes[index % len(password_hashes)],
+            'email': f'user{index}@example.com',
+            'fullname': f'Sample User {index}',
+            'age': rng.randint(17, 60),
+            'preferred_location': rng.choice(LOCATIONS),
+            'profile_picture': 'images/default-profile-pic.png'
+        }
+
+
+def generate_events(count, usernames, start=0, seed=0, first_date=None):
+    """Yield `count` event rows as dicts, owned round-robin by `usernames`."""
+    rng = random.Random(seed)
+    first_date = first_date or date.today()
+    dates = [first_date + timedelta(days=offset) for offset in range(180)]
+    for index in range(start, start + count):
+        sport_type = rng.choice(SPORT_TYPES)
+        playing_level = rng.choice(PLAYING_LEVELS)
+        start_slot = rng.randrange(12, 44)  # half-hour slots between 06:00 and 21:30
+        end_slot = min(start_slot + rng.choice([2, 3, 4]), 47)
+        username = usernames[index % len(usernames)]
+        yield {
+            'event_title': f'{playing_level} {sport_type} #{index}',
+            'sport_type': sport_type,
+            'num_players': rng.randint(1, 11),
+            'playing_level': playing_level,
+            'event_date': rng.choice(dates),
+            'start_time': start_slot * 30,
+            'end_time': end_slot * 30,
+            'location': rng.choice(LOCATIONS),
+            'description': rng.choice(DESCRIPTIONS),
+            'gender_preference': rng.choice(GENDER_PREFERENCES),
+            'contact_information': f'{username}@example.com',
+            'username': username
+        }
+
+
+def username_for(index):
+    return f'user{index:07d}'
+
+
+def read_rows(path):
+    # Rows from a .csv file (with a header line) or a newline-delimited JSON file, as dicts
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        for line_number, row in parse_rows(file, row_format(path)):
+            if row is None:
+                raise ValueError(f'{path}, line {line_number}: not a JSON object')
+            yield row
+
+
+def row_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'ndjson'
+
+
+def parse_rows(file, file_format):
+    """Yield (line number, row dict) pairs from an open text file, one line at a time.
+
+    `file_format` is 'csv' (with a header line) or 'ndjson'. NDJSON lines that are not
+    JSON objects are yielded with None in place of the row, so callers can report them
+    and carry on.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def coerce_row(table, row, defaults=None):
+    """Convert an imported row to the column types of `table`, ignoring unknown keys.
+
+    Empty strings become None, so CSV files can leave optional columns blank, and
+    'HH:MM' times become minutes after midnight.
+    """
+    values = dict(defaults or {})
+    for column in table.columns:
+        value = row.get(column.name)
+        if value is None or value == '':
+            continue
+        python_type = column.type.python_type
+        if python_type is date and isinstance(value, str):
+            value = date.fromisoformat(value)
+        elif python_type is int:
+            value = parse_time(value) if isinstance(value, str) and ':' in value else int(value)
+        values[column.name] = value
+    return values
+
+
+# Point events whose location names a known venue at that venue (see geo.py)
+LINK_EVENTS_TO_VENUES = text('''
+    UPDATE events SET venue_id = (SELECT venue_id FROM venues WHERE lower(venues.name) = lower(trim(events.location)))
+    WHERE venue_id IS NULL AND lower(trim(location)) IN (SELECT lower(name) FROM venues)
+''')
+
+
+def link_events_to_venues(connection):
+    """Link bulk-loaded events to their venues; returns the number of events linked."""
+    linked = connection.execute(LINK_EVENTS_TO_VENUES).rowcount
+    connection.commit()
+    return linked
+
+
+@contextmanager
+def bulk_load(engine, defer_indexes_for=()):
+    """A connection set up for bulk inserts.
+
+    Non-unique indexes on the tables in `defer_indexes_for` are dropped for the duration and
+    built once at the end, which is much cheaper than updating them row by row.
+    """
+    sqlite = engine.dialect.name == 'sqlite'
+    with engine.connect() as connection:
+        if sqlite:
+            connection.exec_driver_sql(f'PRAGMA cache_size = -{BULK_LOAD_CACHE_KIB}')
+        indexes = [index for table in defer_indexes_for for index in table.indexes if not index.unique]
+        for index in indexes:
+            index.drop(connection)
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            for index in indexes:
+                index.create(connection)
+            if sqlite:
+                connection.exec_driver_sql('PRAGMA cache_size = -2000')
+            connection.commit()
+
+
+def insert_in_batches(connection, table, rows, batch_size=5000):
+    """Insert rows with one executemany per batch, committing after each batch.
+
+    Returns the number of rows inserted.
+    """
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            total += _insert_batch(connection, table, batch)
+            batch = []
+    if batch:
+        total += _insert_batch(connection, table, batch)
+    return total
+
+
+def _insert_batch(connection, table, batch):
+    connection.execute(table.insert(), batch)
+    connection.commit()
+    return len(batch)
@@ -1,75 +1,90 @@
-const search = document.querySelector('#search');
-const sportFilter = document.querySelector('#sport-filter');
-const numPlayersFilter = document.querySelector('#num-players-filter')
-const levelFilter = document.querySelector('#level-filter');
-const locationFilter = document.querySelector('#location-filter')
+const filterForm = document.querySelector('#event-filters');
 
-search.addEventListener('keyup', searchItems);
-sportFilter.addEventListener('change', filterEvents);
-numPlayersFilter.addEventListener('change', filterEvents)
-levelFilter.addEventListener('change', filterEvents);
-locationFilter.addEventListener('change', filterEvents)
+if (filterForm) {
+  const search = document.querySelector('#search');
+  const eventsBody = document.querySelector('#events-body');
+  const pagination = document.querySelector('#events-pagination');
 
-// Search bar function
-function searchItems(e) {
-  // convert text to lowercase
-  const text = e.target.value.toLowerCase();
-  console.log(text);
+  let debounceTimer = null;
+  let pendingRequest = null;
 
-  const events = document.querySelectorAll('table tbody tr');
-
-  // Loop through each row
-  events.forEach(function(event) {
-    let found = false;
+  // Wait for the user to stop typing before asking the server for results
+  search.addEventListener('input', function() {
+    clearTimeout(debounceTimer);
+    debounceTimer = setTimeout(filterEvents, 300);
+  });
 
-    // Loop through each cell in the row
-    event.querySelectorAll('td').forEach(function(cell) {
-      // Check if the cell contains the search text
-      if (cell.textContent.toLowerCase().includes(text)) {
-        found = true;
-      }
-    });
+  // Dropdown and date changes are applied straight away
+  filterForm.querySelectorAll('select, input[type="date"]').forEach(function(input) {
+    input.addEventListener('change', filterEvents);
+  });
 
-    // Display or hide the row based on search result
-    if (found) {
-      event.style.display = ""; // Display the row
-    } else {
-      event.style.display = "none"; // Hide the row
-    }
+  // Without this, pressing enter in the search bar would reload the page
+  filterForm.addEventListener('submit', function(e) {
+    e.preventDefault();
+    clearTimeout(debounceTimer);
+    filterEvents();
   });
-}
 
-// Events filter function
- function filterEvents() {
-  const searchText = search.value.toLowerCase();
-  const selectedSport = sportFilter.value.toLowerCase();
-  const selectedPlayers = numPlayersFilter.value.toLowerCase();
-  const selectedLevel = levelFilter.value.toLowerCase();
-  const selectedLocation = locationFilter.value.toLowerCase();
+  // Events filter function: the filtering happens in the database, the page only renders the results
+  function filterEvents() {
+    const params = new URLSearchParams(new FormData(filterForm));
+
+    // Cancel a request that is still in flight so stale results never overwrite newer ones
+    if (pendingRequest) {
+      pendingRequest.abort();
+    }
+    pendingRequest = new AbortController();
 
-  const events = document.querySelectorAll('table tbody tr');
+    fetch(`/browse-events/search?${params}`, { signal: pendingRequest.signal })
+      .then(function(response) { return response.json(); })
+      .then(function(data) {
+        renderEvents(data.events);
+        renderPagination(data.prev_url, data.next_url);
+        history.replaceState(null, '', `/browse-events?${params}`);
+      })
+      .catch(function(error) {
+        if (error.name !== 'AbortError') {
+          console.error(error);
+        }
+      });
+  }
 
-  // Loop through each row
-  events.forEach(function(event) {
-    let showEvent = true;
+  function renderEvents(events) {
+    const rows = events.map(function(event) {
+      const row = document.createElement('tr');
+      [event.event_title, event.sport_type, event.num_players, event.playing_level, event.location].forEach(function(value) {
+        const cell = document.createElement('td');
+        cell.textContent = value;
+        row.appendChild(cell);
+      });
 
-    // Check if the event matches any filter criteria
-    if (
-      (!event.querySelector('td:nth-child(1)').textContent.toLowerCase().includes(searchText)) ||
-      (selectedSport !== 'all' && !event.querySelector('td:nth-child(2)').textContent.toLowerCase().includes(selectedSport)) ||
-      (selectedPlayers !== 'all' && !event.querySelector('td:nth-child(3)').textContent.toLowerCase().includes(selectedPlayers)) ||
-      (selectedLevel !== 'all' && !event.querySelector('td:nth-child(4)').textContent.toLowerCase().includes(selectedLevel)) ||
-      (selectedLocation !== 'all' && !event.querySelector('td:nth-child(5)').textContent.toLowerCase().includes(selectedLocation))
-    ) {
-      showEvent = false;
-    }
+      const link = document.createElement('a');
+      link.href = event.url;
+      link.className = 'btn btn-secondary';
+      link.textContent = 'Details';
+      const linkCell = document.createElement('td');
+      linkCell.appendChild(link);
+      row.appendChild(linkCell);
+      return row;
+    });
+    eventsBody.replaceChildren(...rows);
+  }
 
-    // Display or hide the row based on filter criteria
-    if (showEvent) {
-      event.style.display = ""; // Display the row
-    } else {
-      event.style.display = "none"; // Hide the row
-    }
-  });
+  function renderPagination(prevUrl, nextUrl) {
+    const items = [];
+    [[prevUrl, 'Previous'], [nextUrl, 'Next']].forEach(function([url, label]) {
+      if (url) {
+        const link = document.createElement('a');
+        link.className = 'page-link';
+        link.href = url;
+        link.textContent = label;
+        const item = document.createElement('li');
+        item.className = 'page-item';
+        item.appendChild(link);
+        items.push(item);
+      }
+    });
+    pagination.replaceChildren(...items);
+  }
 }
-
@@ -1,18 +1,41 @@
+import csv
+import gzip
+import html
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
 import unittest
-from app import app, db, User, Events
+from unittest import mock
+from PIL import Image
+from flask import Flask
+from sqlalchemy import create_engine
+from cache import CachedValue
+from config import Config, TestingConfig
+from database import configure_engine, install_sqlite_pragmas
+from app import create_app
+import benchmark
+import event_io
+from extensions import db
+from forms import EventForm
+from images import content_stem, variant_filename
+from pages import cached_page
+from models import CacheVersion, User, Events, EventRsvp, FeedEntry, ProfilePictureBlob, Venue
+from profiles import retain_profile_picture
 from utils import set_session
 from flask import session
 from flask_testing import TestCase
 from werkzeug.security import generate_password_hash
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 class AppTest(TestCase):
     def create_app(self):
-        # Configure the app for testing
-        app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        # A fresh app per test, with its own in-memory database and caches
+        app = create_app(TestingConfig)
         app.config['UPLOAD_FOLDER'] = 'test_uploads'
-        app.config['WTF_CSRF_ENABLED'] = False
         return app
 
     def setUp(self):
@@ -101,6 +124,35 @@ class AppTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Welcome', response.data)
 
+    def test_login_upgrades_password_hash(self):
+        self.client.post('/login', data=dict(
+            username='testuser',
+            password='password'
+        ), follow_redirects=True)
+        user = db.session.get(User, 'testuser')
+        self.assertTrue(user.password.startswith('$argon2id$'))
+
+        # The upgraded hash still logs in
+        self.client.post('/logout')
+        response = self.client.post('/login', data=dict(
+            username='testuser',
+            password='password'
+        ), follow_redirects=True)
+        self.assertIn(b'Login successful!', response.data)
+
+    def test_password_hashing_survives_a_dead_worker(self):
+        self.app.config.update(PASSWORD_HASH_SCHEME='pbkdf2:sha256', PASSWORD_HASH_WORKERS=1)
+        hasher = self.app.extensions['password_hasher']
+        self.addCleanup(hasher.shutdown)
+        hasher.hash('password')
+
+        # Killing a worker breaks the whole pool; the next call starts a new one
+        for process in list(hasher._executor._processes.values()):
+            process.kill()
+            process.join()
+        valid, _ = hasher.check(hasher.hash('password'), 'password')
+        self.assertTrue(valid)
+
     # This one passed
     def test_login_wrong_password(self):
         response = self.client.post('/login', data=dict(
@@ -143,6 +195,355 @@ class AppTest(TestCase):
         self.assertIn(b'Event successfully created', response.data)
         self.assertIn(b'Event Posted Successfully!', response.data)
 
+    def test_event_times_are_stored_as_minutes(self):
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        event_data = dict(
+            event_title='Midnight Run',
+            sport_type='Soccer',
+            num_players=10,
+            playing_level='Intermediate',
+            event_date='2024-05-29',
+            start_time='00:00',
+            end_time='18:30',
+            location='Morley',
+            description='Bring a torch',
+            gender_preference='Mixed',
+            contact_information='Email: email@example.com'
+        )
+        response = self.client.post('/post-an-event', data=event_data)
+        self.assertIn(b'<strong>End Time:</strong> 18:30', response.data)
+
+        event = Events.query.filter_by(event_title='Midnight Run').one()
+        self.assertEqual((event.start_time, event.end_time), (0, 18 * 60 + 30))
+        response = self.client.get(f'/edit_event/{event.event_id}')
+        self.assertIn(b'<option selected value="18:30">', response.data)
+
+        # Only the half-hour slots offered in the dropdown are accepted
+        response = self.client.post('/post-an-event', data=dict(event_data, event_title='Late Run', start_time='25:00'))
+        self.assertIn(b'Invalid Choice', response.data)
+        self.assertIsNone(Events.query.filter_by(event_title='Late Run').first())
+
+    def test_events_in_time_window(self):
+        for day, start_time in [(1, 9 * 60), (2, 18 * 60), (3, 19 * 60 + 30), (3, 21 * 60), (9, 18 * 60)]:
+            db.session.add(Events(
+                event_title=f'Game on day {day} at {start_time}',
+                sport_type='Soccer',
+                num_players=5,
+                playing_level='Beginner',
+                event_date=date(2024, 6, day),
+                start_time=start_time,
+                end_time=start_time + 60,
+                location='Crawley',
+                description='Weeknight game',
+                gender_preference='Mixed',
+                contact_information='test@example.com',
+                username='testuser'
+            ))
+        db.session.commit()
+
+        # Evening games this week
+        response = self.client.get('/browse-events/search?from=2024-06-01&to=2024-06-07&starts_after=18:00&starts_before=20:00')
+        self.assertEqual([event['event_title'] for event in response.json['events']], ['Game on day 2 at 1080', 'Game on day 3 at 1170'])
+        response = self.client.get('/browse-events?from=2024-06-01&starts_after=18:00')
+        self.assertIn(b'value="2024-06-01"', response.data)
+        self.assertIn(b'<option value="18:00" selected>', response.data)
+
+        # Malformed bounds are ignored
+        response = self.client.get('/browse-events/search?from=June&starts_after=evening')
+        self.assertEqual(len(response.json['events']), 5)
+
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text(
+            'EXPLAIN QUERY PLAN SELECT event_id FROM events WHERE event_date BETWEEN :first AND :last AND start_time BETWEEN :earliest AND :latest'
+        ), dict(first='2024-06-01', last='2024-06-07', earliest=18 * 60, latest=20 * 60)).all())
+        self.assertIn('ix_events_event_date_start_time', plan)
+
+    def test_venue_double_booking(self):
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        event_data = dict(
+            event_title='Morning Doubles',
+            sport_type='Tennis',
+            num_players=4,
+            playing_level='Advanced',
+            event_date='2024-06-01',
+            start_time='09:00',
+            end_time='11:00',
+            location='UWA Tennis Club',
+            description='Doubles practice',
+            gender_preference='Mixed',
+            contact_information='test@example.com'
+        )
+        self.client.post('/post-an-event', data=event_data)
+        booked = Events.query.filter_by(event_title='Morning Doubles').one()
+
+        # An overlapping booking is refused, and the clashing event is shown with a link
+        response = self.client.post('/post-an-event', data=dict(event_data, event_title='Social Hit', start_time='10:30', end_time='12:00'))
+        self.assertIn(b'This location is already booked at that time.', response.data)
+        self.assertIn(f'/browse-single-event/{booked.event_id}'.encode(), response.data)
+        self.assertIn(b'09:00 to 11:00', response.data)
+        self.assertIsNone(Events.query.filter_by(event_title='Social Hit').first())
+
+        # Back-to-back bookings and other venues are fine
+        self.client.post('/post-an-event', data=dict(event_data, event_title='Social Hit', start_time='11:00', end_time='12:00'))
+        self.client.post('/post-an-event', data=dict(event_data, event_title='Crawley Hit', location='Crawley Courts'))
+        self.assertEqual(Events.query.count(), 3)
+
+        # An event never clashes with itself when edited, but can be moved onto another booking
+        response = self.client.post(f'/edit_event/{booked.event_id}', data=dict(event_data, description='Bring balls'), follow_redirects=True)
+        self.assertIn(b'Event updated successfully!', response.data)
+        response = self.client.post(f'/edit_event/{booked.event_id}', data=dict(event_data, end_time='11:30'))
+        self.assertIn(b'This location is already booked at that time.', response.data)
+
+        # Events linked to a venue clash by venue, whatever their location text says
+        db.session.add(Events(event_title='Old Listing', sport_type='Tennis', num_players=4, playing_level='Advanced', event_date=date(2024, 6, 2),
+                              start_time=9 * 60, end_time=11 * 60, location='crawley (old listing)', description='Doubles practice',
+                              gender_preference='Mixed', contact_information='test@example.com', username='testuser', venue=Venue.find('Crawley')))
+        db.session.commit()
+        response = self.client.post('/post-an-event', data=dict(event_data, event_title='Crawley Doubles', location=' crawley ', event_date='2024-06-02'))
+        self.assertIn(b'This location is already booked at that time.', response.data)
+
+        # Events must end after they start
+        response = self.client.post('/post-an-event', data=dict(event_data, event_title='Backwards', start_time='14:00', end_time='13:00'))
+        self.assertIn(b'The event must end after it starts.', response.data)
+
+        # The check is answered from the index alone
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text(
+            'EXPLAIN QUERY PLAN SELECT event_id FROM events WHERE location = :location AND event_date = :event_date AND start_time < :end_time AND end_time > :start_time'
+        ), dict(location='UWA Tennis Club', event_date='2024-06-01', start_time=9 * 60, end_time=11 * 60)).all())
+        self.assertIn('COVERING INDEX ix_events_venue_schedule', plan)
+
+    def test_events_near_me(self):
+        user = db.session.get(User, 'testuser')
+        user.preferred_location = 'nedlands'
+        db.session.commit()
+        for title, location in [('Oval Kickabout', 'UWA Oval'), ('Crawley Hit', ' crawley'), ('Freo Run', 'Fremantle'), ('Backyard Cricket', 'My Backyard')]:
+            self.client.post('/login', data=dict(username='testuser', password='password'))
+            self.client.post('/post-an-event', data=dict(
+                event_title=title,
+                sport_type='Soccer',
+                num_players=5,
+                playing_level='Beginner',
+                event_date='2024-06-01',
+                start_time='09:00',
+                end_time='10:00',
+                location=location,
+                description='All welcome',
+                gender_preference='Mixed',
+                contact_information='test@example.com'
+            ))
+
+        # Locations matching the gazetteer are stored under the venue's name and linked to it
+        crawley = Events.query.filter_by(event_title='Crawley Hit').one()
+        self.assertEqual((crawley.location, crawley.venue.name), ('Crawley', 'Crawley'))
+        self.assertIsNone(Events.query.filter_by(event_title='Backyard Cricket').one().venue_id)
+
+        def titles(query):
+            return sorted(event['event_title'] for event in self.client.get(f'/browse-events/search?{query}').json['events'])
+
+        self.assertEqual(titles('near=me&within=2'), ['Crawley Hit', 'Oval Kickabout'])
+        self.assertEqual(titles('near=me&within=25'), ['Crawley Hit', 'Freo Run', 'Oval Kickabout'])
+        self.assertEqual(titles('near=Fremantle&within=1'), ['Freo Run'])
+        self.assertEqual(len(titles('near=Nowhere&within=2')), 4)
+
+        # The venue lookup is a range scan of the grid index
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text(
+            'EXPLAIN QUERY PLAN SELECT venue_id FROM venues WHERE grid_row BETWEEN :min_row AND :max_row AND grid_col BETWEEN :min_col AND :max_col'
+        ), dict(min_row=-3200, max_row=-3196, min_col=11578, max_col=11584)).all())
+        self.assertIn('ix_venues_grid_cell', plan)
+
+    def test_for_you_feed(self):
+        user = db.session.get(User, 'testuser')
+        db.session.add(User(username='neighbour', email='neighbour@example.com', password=user.password, fullname='Neighbour', age=29, preferred_location='Crawley'))
+        db.session.commit()
+        # Places are saved under the venue's own name, which is what feeds match on
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        self.client.post('/edit_profile', data=dict(email='test@example.com', fullname='Test User', age=31, preferred_location='  nedlands '))
+        self.assertEqual(db.session.get(User, 'testuser').preferred_location, 'Nedlands')
+        next_week = (date.today() + timedelta(days=7)).isoformat()
+
+        def post_event(username, title, sport_type, location):
+            self.client.post('/login', data=dict(username=username, password='password'))
+            self.client.post('/post-an-event', data=dict(
+                event_title=title,
+                sport_type=sport_type,
+                num_players=4,
+                playing_level='Beginner',
+                event_date=next_week,
+                start_time='18:00',
+                end_time='19:00',
+                location=location,
+                description='All welcome',
+                gender_preference='Mixed',
+                contact_information='neighbour@example.com'
+            ))
+
+        def feed_titles():
+            self.client.post('/login', data=dict(username='testuser', password='password'))
+            html = self.client.get('/dashboard').get_data(as_text=True)
+            return re.findall(r'<strong>(.*?)</strong>', html)
+
+        # Events are added to the feeds of users who play nearby, and the feed is shown on the dashboard
+        post_event('neighbour', 'Oval Soccer', 'Soccer', 'UWA Oval')
+        post_event('neighbour', 'Matilda Bay Tennis', 'Tennis', 'Matilda Bay Reserve')
+        post_event('neighbour', 'Joondalup Soccer', 'Soccer', 'Joondalup')
+        self.assertEqual(feed_titles(), ['Oval Soccer', 'Matilda Bay Tennis'])
+
+        # Posting changes the poster's own affinities; their own events never appear in their feed
+        post_event('testuser', 'My Tennis', 'Tennis', 'Crawley')
+        self.assertEqual(feed_titles(), ['Matilda Bay Tennis', 'Oval Soccer'])
+        self.assertEqual([entry.event_id for entry in FeedEntry.query.filter_by(username='neighbour')],
+                         [Events.query.filter_by(event_title='My Tennis').one().event_id])
+
+        # Edits rescore the event, and deletes remove it
+        tennis = Events.query.filter_by(event_title='Matilda Bay Tennis').one()
+        self.client.post('/login', data=dict(username='neighbour', password='password'))
+        self.client.post(f'/edit_event/{tennis.event_id}', data=dict(
+            event_title='Matilda Bay Tennis', sport_type='Tennis', num_players=4, playing_level='Beginner', event_date=next_week,
+            start_time='18:00', end_time='19:00', location='Midland', description='All welcome', gender_preference='Mixed',
+            contact_information='neighbour@example.com'
+        ))
+        self.assertEqual(feed_titles(), ['Oval Soccer'])
+        self.client.post('/login', data=dict(username='neighbour', password='password'))
+        self.client.post(f"/delete_event/{Events.query.filter_by(event_title='Oval Soccer').one().event_id}")
+        self.assertEqual(feed_titles(), [])
+
+        # Incremental updates leave the feeds exactly as a full rebuild would
+        post_event('neighbour', 'Subiaco Soccer', 'Soccer', 'Subiaco')
+        incremental = sorted((entry.username, entry.event_id, entry.score) for entry in FeedEntry.query)
+        result = self.app.test_cli_runner().invoke(args=['rebuild-feeds'])
+        self.assertIn('Rebuilt 2 feeds with 2 entries', result.output)
+        self.assertEqual(sorted((entry.username, entry.event_id, entry.score) for entry in FeedEntry.query), incremental)
+
+        # Reading a feed is a range scan of its index, already in score order
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text(
+            'EXPLAIN QUERY PLAN SELECT event_id FROM feed_entries WHERE username = :username AND event_date >= :today '
+            'ORDER BY score DESC, event_id DESC LIMIT 10'
+        ), dict(username='testuser', today=date.today())).all())
+        self.assertIn('ix_feed_entries_username_score', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def add_event(self, **fields):
+        event = Events(**dict(dict(
+            event_title='Sunday Futsal', sport_type='Soccer', num_players=2, playing_level='Beginner', event_date=date(2024, 6, 2),
+            start_time=9 * 60, end_time=10 * 60, location='UWA Oval', description='All welcome', gender_preference='Mixed',
+            contact_information='test@example.com', username='testuser'
+        ), **fields))
+        db.session.add(event)
+        db.session.commit()
+        return event.event_id
+
+    def test_event_rsvp(self):
+        event_id = self.add_event()
+        password = db.session.get(User, 'testuser').password
+        for username in ('player1', 'player2', 'player3'):
+            db.session.add(User(username=username, email=f'{username}@example.com', password=password, fullname=username))
+        db.session.commit()
+
+        def rsvp(username, action):
+            self.client.post('/login', data=dict(username=username, password='password'))
+            response = self.client.post(f'/{action}_event/{event_id}', follow_redirects=True)
+            self.assertEqual(response.status_code, 200)
+            return response.get_data(as_text=True)
+
+        def statuses():
+            return {rsvp.username: rsvp.status for rsvp in EventRsvp.query.filter_by(event_id=event_id)}
+
+        def seats_taken():
+            return db.session.execute(db.select(Events.seats_taken).filter_by(event_id=event_id)).scalar()
+
+        # Players take the seats, then queue on the waitlist; the organiser and repeat joins are turned away
+        self.assertIn('You have joined the event.', rsvp('player1', 'join'))
+        self.assertIn('You have already joined this event.', rsvp('player1', 'join'))
+        self.assertIn('You are organising this event.', rsvp('testuser', 'join'))
+        rsvp('player2', 'join')
+        html = rsvp('player3', 'join')
+        self.assertIn('added to the waitlist', html)
+        self.assertIn('2 of 2 (1 on the waitlist)', html)
+        self.assertEqual(statuses(), {'player1': 'joined', 'player2': 'joined', 'player3': 'waitlisted'})
+        self.assertEqual(seats_taken(), 2)
+
+        # A freed seat goes to the first player waiting
+        self.assertIn('You have left the event.', rsvp('player1', 'leave'))
+        self.assertEqual(statuses(), {'player2': 'joined', 'player3': 'joined'})
+        self.assertEqual(seats_taken(), 2)
+        rsvp('player2', 'leave')
+        self.assertEqual(seats_taken(), 1)
+
+        # Raising the number of players moves waiting players onto the new seats
+        rsvp('player1', 'join')
+        rsvp('player2', 'join')
+        self.assertEqual(statuses(), {'player1': 'joined', 'player2': 'waitlisted', 'player3': 'joined'})
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        self.client.post(f'/edit_event/{event_id}', data=dict(
+            event_title='Sunday Futsal', sport_type='Soccer', num_players=4, playing_level='Beginner', event_date='2024-06-02',
+            start_time='09:00', end_time='10:00', location='UWA Oval', description='All welcome', gender_preference='Mixed',
+            contact_information='test@example.com'
+        ))
+        self.assertEqual(statuses(), {'player1': 'joined', 'player2': 'joined', 'player3': 'joined'})
+        self.assertEqual(seats_taken(), 3)
+
+        # Joined events are listed on the profile page
+        self.client.post('/login', data=dict(username='player2', password='password'))
+        self.assertIn('Sunday Futsal', self.client.get('/profile').get_data(as_text=True))
+
+        # Deleting the event removes its RSVPs
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        self.client.post(f'/delete_event/{event_id}')
+        self.assertEqual(EventRsvp.query.count(), 0)
+
+    def test_concurrent_joins_never_oversell(self):
+        with tempfile.TemporaryDirectory() as directory:
+            class FileDatabaseConfig(TestingConfig):
+                SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'rsvp.db')}"
+                UPLOAD_FOLDER = 'test_uploads'
+
+            app = create_app(FileDatabaseConfig)
+            players = [f'player{index:02d}' for index in range(40)]
+            with app.app_context():
+                db.create_all()
+                db.session.add_all(User(username=username, email=f'{username}@example.com', password='x', fullname=username)
+                                   for username in ['testuser'] + players)
+                db.session.commit()
+                event_id = self.add_event(num_players=5)
+                db.session.remove()
+
+            def hammer(action, usernames):
+                # Every player's request is released at once, each from its own thread and connection
+                barrier = threading.Barrier(len(usernames))
+                statuses = []
+
+                def rsvp(username):
+                    client = app.test_client()
+                    with client.session_transaction() as client_session:
+                        client_session.update(logged_in=True, username=username)
+                    barrier.wait()
+                    statuses.append(client.post(f'/{action}_event/{event_id}').status_code)
+
+                threads = [threading.Thread(target=rsvp, args=(username,)) for username in usernames]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(statuses, [302] * len(usernames))
+
+            def counts():
+                with app.app_context():
+                    rsvps = db.session.execute(db.select(EventRsvp.status, db.func.count()).filter_by(event_id=event_id).group_by(EventRsvp.status)).all()
+                    seats_taken = db.session.execute(db.select(Events.seats_taken).filter_by(event_id=event_id)).scalar()
+                    db.session.remove()
+                    return dict(rsvps), seats_taken
+
+            hammer('join', players)
+            self.assertEqual(counts(), ({'joined': 5, 'waitlisted': 35}, 5))
+
+            # Joined players leaving together hand their seats to the waitlist, without losing or doubling any
+            with app.app_context():
+                joined = db.session.scalars(db.select(EventRsvp.username).filter_by(event_id=event_id, status=EventRsvp.JOINED)).all()
+                db.session.remove()
+            hammer('leave', joined)
+            self.assertEqual(counts(), ({'joined': 5, 'waitlisted': 30}, 5))
+
+            with app.app_context():
+                db.engine.dispose()
 
     # This one passed
     def test_post_event_duplicate_title(self):
@@ -219,8 +620,8 @@ class AppTest(TestCase):
             num_players=5, 
             playing_level='Beginner',
             event_date=date(2024, 5, 30),
-            start_time='15:00',
-            end_time='17:00',
+            start_time=15 * 60,
+            end_time=17 * 60,
             location='Downtown Gym',
             description='Just for fun', 
             gender_preference='Male', 
@@ -234,6 +635,183 @@ class AppTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Basketball Game', response.data)
 
+    def test_browse_events_pagination(self):
+        for day in range(1, 4):
+            db.session.add(Events(
+                event_title=f'Game {day}',
+                sport_type='Soccer',
+                num_players=10,
+                playing_level='Beginner',
+                event_date=date(2024, 6, day),
+                start_time=8 * 60,
+                end_time=10 * 60,
+                location='Crawley',
+                description='Weekly game',
+                gender_preference='Mixed',
+                contact_information='contact@example.com',
+                username='testuser'
+            ))
+        db.session.commit()
+
+        response = self.client.get('/browse-events?per_page=2')
+        self.assertIn(b'Game 1', response.data)
+        self.assertIn(b'Game 2', response.data)
+        self.assertNotIn(b'Game 3', response.data)
+        next_cursor = self.get_context_variable('next_cursor')
+        self.assertIsNone(self.get_context_variable('prev_cursor'))
+
+        response = self.client.get(f'/browse-events?per_page=2&after={next_cursor}')
+        self.assertIn(b'Game 3', response.data)
+        self.assertNotIn(b'Game 2', response.data)
+        self.assertIsNone(self.get_context_variable('next_cursor'))
+        prev_cursor = self.get_context_variable('prev_cursor')
+
+        response = self.client.get(f'/browse-events?per_page=2&before={prev_cursor}')
+        self.assertIn(b'Game 1', response.data)
+        self.assertIn(b'Game 2', response.data)
+        self.assertIsNone(self.get_context_variable('prev_cursor'))
+
+    def test_browse_events_links_keep_page_size(self):
+        for day in range(1, 13):
+            db.session.add(Events(
+                event_title=f'Match {day:02d}',
+                sport_type='Soccer',
+                num_players=10,
+                playing_level='Beginner',
+                event_date=date(2024, 6, day),
+                start_time=8 * 60,
+                end_time=10 * 60,
+                location='Crawley',
+                description='Weekly game',
+                gender_preference='Mixed',
+                contact_information='contact@example.com',
+                username='testuser'
+            ))
+        db.session.commit()
+
+        # Following the Next link shows the next five events, not the default page size
+        response = self.client.get('/browse-events?per_page=5&sport_type=Soccer')
+        next_url = html.unescape(re.search(rb'href="([^"]+)">Next</a>', response.data).group(1).decode())
+        self.assertIn('per_page=5', next_url)
+        response = self.client.get(next_url)
+        self.assertEqual([event.event_title for event in self.get_context_variable('events')], [f'Match {day:02d}' for day in range(6, 11)])
+
+        # So do the links returned by the JSON search
+        response = self.client.get('/browse-events/search?per_page=5')
+        self.assertIn('per_page=5', response.json['next_url'])
+        response = self.client.get(response.json['next_url'])
+        self.assertEqual(len(self.get_context_variable('events')), 5)
+
+    def test_browse_events_filters(self):
+        for title, sport, location in [('Morning Soccer', 'Soccer', 'Crawley'), ('Evening Tennis', 'Tennis', 'Nedlands')]:
+            db.session.add(Events(
+                event_title=title,
+                sport_type=sport,
+                num_players=4,
+                playing_level='Intermediate',
+                event_date=date(2024, 6, 1),
+                start_time=8 * 60,
+                end_time=10 * 60,
+                location=location,
+                description='Friendly match',
+                gender_preference='Mixed',
+                contact_information='contact@example.com',
+                username='testuser'
+            ))
+        db.session.commit()
+
+        response = self.client.get('/browse-events?sport=Tennis')
+        self.assertIn(b'Evening Tennis', response.data)
+        self.assertNotIn(b'Morning Soccer', response.data)
+
+        response = self.client.get('/browse-events/search?q=soccer&location=all')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['event_title'] for event in response.json['events']], ['Morning Soccer'])
+
+        response = self.client.get('/browse-events/search?q=soccer&location=Nedlands')
+        self.assertEqual(response.json['events'], [])
+
+    def test_browse_events_facets(self):
+        for title, sport, level in [('Hoops', 'Basketball', 'Advanced'), ('Rally', 'Tennis', 'Beginner'), ('Doubles', 'Tennis', 'Advanced')]:
+            db.session.add(Events(
+                event_title=title,
+                sport_type=sport,
+                num_players=2,
+                playing_level=level,
+                event_date=date(2024, 6, 1),
+                start_time=8 * 60,
+                end_time=10 * 60,
+                location='Crawley',
+                description='Friendly match',
+                gender_preference='Mixed',
+                contact_information='contact@example.com',
+                username='testuser'
+            ))
+        db.session.commit()
+
+        self.client.get('/browse-events')
+        self.assertEqual(self.get_context_variable('sport_types'), [('Basketball', 1), ('Tennis', 2)])
+        self.assertEqual(self.get_context_variable('playing_levels'), [('Beginner', 1), ('Advanced', 2)])
+
+        # Committing a change to an event invalidates the cached facets
+        db.session.delete(Events.query.filter_by(event_title='Hoops').first())
+        db.session.commit()
+        self.client.get('/browse-events')
+        self.assertEqual(self.get_context_variable('sport_types'), [('Tennis', 2)])
+        self.assertEqual(self.get_context_variable('locations'), [('Crawley', 2)])
+
+    def test_browse_events_facets_follow_other_processes(self):
+        self.test_browse_events_facets()
+
+        # Another worker process renames a sport: nothing in this process is told, but the shared version moves
+        with db.engine.begin() as connection:
+            connection.execute(db.update(Events).where(Events.sport_type == 'Tennis').values(sport_type='Squash'))
+            CacheVersion.bump(connection, CacheVersion.EVENTS)
+        self.client.get('/browse-events')
+        self.assertEqual(self.get_context_variable('sport_types'), [('Tennis', 2)])  # until the version is next checked
+
+        self.app.extensions['cache_versions'][CacheVersion.EVENTS].expire()
+        self.client.get('/browse-events')
+        self.assertEqual(self.get_context_variable('sport_types'), [('Squash', 2)])
+
+    def test_cached_value_expires(self):
+        computed = []
+        value = CachedValue(lambda: computed.append(None) or len(computed), ttl=0.05)
+        self.assertEqual((value.get(), value.get()), (1, 1))
+        time.sleep(0.06)
+        self.assertEqual(value.get(), 2)
+
+    def test_full_text_search(self):
+        event = Events(
+            event_title='Sunday Futsal',
+            sport_type='Soccer',
+            num_players=6,
+            playing_level='Advanced',
+            event_date=date(2024, 6, 2),
+            start_time=18 * 60,
+            end_time=19 * 60,
+            location='Fremantle Leisure Centre',
+            description='Fast paced indoor game',
+            gender_preference='Mixed',
+            contact_information='contact@example.com',
+            username='testuser'
+        )
+        db.session.add(event)
+        db.session.commit()
+
+        response = self.client.get('/search-events?q=indoor frem')
+        self.assertEqual([hit['event_title'] for hit in response.json['events']], ['Sunday Futsal'])
+
+        # The index follows edits and deletes made through the ORM
+        event.description = 'Outdoor game on the oval'
+        db.session.commit()
+        self.assertEqual(self.client.get('/search-events?q=indoor').json['events'], [])
+        self.assertEqual(len(self.client.get('/search-events?q=oval').json['events']), 1)
+
+        db.session.delete(event)
+        db.session.commit()
+        self.assertEqual(self.client.get('/search-events?q=oval').json['events'], [])
+
     # This one passed
     def test_browse_single_event(self):
         # Create a sample event
@@ -244,8 +822,8 @@ class AppTest(TestCase):
                 num_players=10,
                 playing_level='Intermediate',
                 event_date=date(2024, 5, 29),
-                start_time='08:00',
-                end_time='10:00',
+                start_time=8 * 60,
+                end_time=10 * 60,
                 location='Test Location',
                 description='This is a test event.',
                 gender_preference='Mixed',
@@ -261,6 +839,119 @@ class AppTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Test Event', response.data)
 
+    def test_anonymous_page_cache(self):
+        event = Events(
+            event_title='Cached Game',
+            sport_type='Tennis',
+            num_players=2,
+            playing_level='Beginner',
+            event_date=date(2024, 6, 3),
+            start_time=9 * 60,
+            end_time=10 * 60,
+            location='Nedlands',
+            description='Casual hit',
+            gender_preference='Mixed',
+            contact_information='contact@example.com',
+            username='testuser'
+        )
+        db.session.add(event)
+        db.session.commit()
+        url = f'/browse-single-event/{event.event_id}'
+
+        response = self.client.get(url)
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Editing the event drops its cached page
+        event.event_title = 'Renamed Game'
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Renamed Game', response.data)
+
+        # Logged in users always get a freshly rendered page
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        response = self.client.get('/')
+        self.assertNotIn('ETag', response.headers)
+
+    def test_cached_pages_follow_other_processes(self):
+        event = Events(event_title='Shared Game', sport_type='Tennis', num_players=2, playing_level='Beginner', event_date=date(2024, 6, 3),
+                       start_time=9 * 60, end_time=10 * 60, location='Nedlands', description='Casual hit', gender_preference='Mixed',
+                       contact_information='contact@example.com', username='testuser')
+        db.session.add(event)
+        db.session.commit()
+        url = f'/browse-single-event/{event.event_id}'
+        self.assertIn(b'Players Joined:</strong> 0 of 2', self.client.get(url).data)
+
+        # A player joins through another worker process
+        with db.engine.begin() as connection:
+            connection.execute(db.update(Events).where(Events.event_id == event.event_id).values(seats_taken=1))
+            CacheVersion.bump(connection, CacheVersion.SEATS)
+        db.session.expire_all()  # the test's session outlives requests; a server's does not
+        self.app.extensions['cache_versions'][CacheVersion.SEATS].expire()
+        self.assertIn(b'Players Joined:</strong> 1 of 2', self.client.get(url).data)
+
+    def test_rsvps_bump_shared_versions_after_commit(self):
+        event_id = self.add_event(num_players=2)
+        db.session.add(User(username='player1', email='player1@example.com', password=db.session.get(User, 'testuser').password, fullname='player1'))
+        db.session.commit()
+        self.client.post('/login', data=dict(username='player1', password='password'))
+        versions = db.select(CacheVersion.version).filter_by(name=CacheVersion.SEATS)
+        before = db.session.execute(versions).scalar()
+
+        # The shared row is written in a transaction of its own, so RSVPs for different events never queue on it
+        bump = CacheVersion.bump
+        bumped_during = []
+        def recording_bump(connection, name):
+            bumped_during.append(db.session().in_transaction())
+            bump(connection, name)
+        with mock.patch.object(CacheVersion, 'bump', side_effect=recording_bump):
+            self.client.post(f'/join_event/{event_id}')
+        self.assertEqual(bumped_during, [False])
+        self.assertEqual(db.session.execute(versions).scalar(), before + 1)
+
+    def test_cached_pages_only_check_their_own_versions(self):
+        event = Events(event_title='Static Game', sport_type='Tennis', num_players=2, playing_level='Beginner', event_date=date(2024, 6, 3),
+                       start_time=9 * 60, end_time=10 * 60, location='Nedlands', description='Casual hit', gender_preference='Mixed',
+                       contact_information='contact@example.com', username='testuser')
+        db.session.add(event)
+        db.session.commit()
+        etag = self.client.get('/how-it-works').headers['ETag']
+
+        # Event writes leave pages that don't show events alone
+        with mock.patch('main.render_page', side_effect=AssertionError('re-rendered')):
+            with db.engine.begin() as connection:
+                CacheVersion.bump(connection, CacheVersion.EVENTS)
+            self.app.extensions['cache_versions'][CacheVersion.EVENTS].expire()
+            self.assertEqual(self.client.get('/how-it-works').headers['ETag'], etag)
+
+        # Pages that do show events are still served, uncached, if their versions can't be read
+        db.session.execute(db.text('DROP TABLE cache_versions'))
+        for version in self.app.extensions['cache_versions'].values():
+            version.expire()
+        with self.assertLogs(self.app.logger, 'WARNING'):
+            response = self.client.get(f'/browse-single-event/{event.event_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Static Game', response.data)
+        self.assertNotIn('ETag', response.headers)
+        self.assertEqual(self.client.get('/how-it-works').status_code, 200)
+
+    def test_page_rendered_during_invalidation_is_not_cached(self):
+        renders = []
+        def racing_page():
+            # A commit elsewhere invalidates pages while this one is being rendered
+            renders.append(None)
+            self.app.extensions['page_cache'].pop_matching(lambda key: True)
+            return f'render {len(renders)}'
+        self.app.add_url_rule('/racing-page', 'racing_page', cached_page(racing_page))
+
+        self.assertEqual(self.client.get('/racing-page').data, b'render 1')
+        self.assertEqual(self.client.get('/racing-page').data, b'render 2')
+        self.assertEqual(len(self.app.extensions['page_cache']), 0)
+
     # This one passed
     def test_profile_page(self):
         self.client.post('/login', data=dict(
@@ -301,6 +992,99 @@ class AppTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Profile picture has been removed.', response.data)
 
+    def upload_profile_picture(self, username, photo_bytes):
+        self.client.post('/login', data=dict(username=username, password='password'))
+        response = self.client.post('/edit_profile_picture', data=dict(
+            profile_picture=(io.BytesIO(photo_bytes), 'photo.jpg')
+        ), content_type='multipart/form-data', follow_redirects=True)
+        self.client.post('/logout')
+        return response
+
+    def test_edit_profile_picture_writes_variants(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.app.config.update(UPLOAD_FOLDER=output_dir.name, IMAGE_PROCESSING_WORKERS=0)
+
+        photo = io.BytesIO()
+        Image.new('RGB', (2000, 1500), 'green').save(photo, 'JPEG')
+
+        response = self.upload_profile_picture('testuser', photo.getvalue())
+        self.assertIn(b'Your profile picture has been updated.', response.data)
+        self.assertIn(b'image/webp', response.data)
+
+        user = db.session.get(User, 'testuser')
+        self.assertTrue(user.profile_picture.endswith('-medium.jpg'))
+        picture_file = os.path.join(output_dir.name, user.profile_picture.removeprefix('profile-pictures/'))
+        self.assertEqual(len(os.listdir(os.path.dirname(picture_file))), 4)
+        with Image.open(picture_file) as medium:
+            self.assertEqual(medium.size, (400, 400))
+
+        # Anything that is not an image is rejected before it is queued
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        response = self.client.post('/edit_profile_picture', data=dict(
+            profile_picture=(io.BytesIO(b'not an image'), 'fake.png')
+        ), content_type='multipart/form-data')
+        self.assertIn(b'The uploaded file is not a valid image.', response.data)
+
+    def test_profile_pictures_are_deduplicated(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.app.config.update(UPLOAD_FOLDER=output_dir.name, IMAGE_PROCESSING_WORKERS=0)
+
+        db.session.add(User(username='otheruser', email='other@example.com', password=db.session.get(User, 'testuser').password, fullname='Other User'))
+        db.session.commit()
+
+        photo = io.BytesIO()
+        Image.new('RGB', (800, 600), 'blue').save(photo, 'PNG')
+        self.upload_profile_picture('testuser', photo.getvalue())
+        self.upload_profile_picture('otheruser', photo.getvalue())
+
+        # Both users point at the same stored file
+        picture = db.session.get(User, 'testuser').profile_picture
+        self.assertEqual(db.session.get(User, 'otheruser').profile_picture, picture)
+        picture_file = os.path.join(output_dir.name, picture.removeprefix('profile-pictures/'))
+
+        response = self.client.get('/media/' + picture)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        response.close()
+
+        # The files are only deleted once the last user stops using them
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        self.client.post('/remove_profile_picture')
+        self.assertTrue(os.path.exists(picture_file))
+        self.client.post('/logout')
+
+        self.client.post('/login', data=dict(username='otheruser', password='password'))
+        self.client.post('/remove_profile_picture')
+        self.assertFalse(os.path.exists(picture_file))
+
+    def test_profile_picture_references_are_counted_in_one_statement(self):
+        picture_path = f"profile-pictures/{variant_filename(content_stem('ab' * 32), 'medium', 'jpg')}"
+        self.assertTrue(retain_profile_picture(picture_path))
+        self.assertFalse(retain_profile_picture(picture_path))
+        db.session.commit()
+        self.assertEqual(db.session.get(ProfilePictureBlob, 'ab' * 32).ref_count, 2)
+
+    def test_failed_profile_picture_processing_is_logged(self):
+        output_dir = tempfile.TemporaryDirectory()
+        incoming_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.addCleanup(incoming_dir.cleanup)
+        self.app.config.update(UPLOAD_FOLDER=output_dir.name, INCOMING_FOLDER=incoming_dir.name, IMAGE_PROCESSING_WORKERS=0)
+
+        photo = io.BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(photo, 'PNG')
+        with mock.patch('profiles.write_profile_picture_variants', side_effect=OSError('disk full')), \
+                self.assertLogs(self.app.logger, 'ERROR') as logs:
+            self.upload_profile_picture('testuser', photo.getvalue())
+        self.assertIn('Failed to process profile picture upload for testuser', logs.output[0])
+
+        # The staged upload is removed either way, and never lands in the public folder
+        self.assertEqual(os.listdir(incoming_dir.name), [])
+        self.assertEqual(os.listdir(output_dir.name), [])
+        self.assertEqual(db.session.get(User, 'testuser').profile_picture, 'images/default-profile-pic.png')
+
     # This one passed
     def test_edit_event(self):
         with self.client:
@@ -310,15 +1094,15 @@ class AppTest(TestCase):
             ), follow_redirects=True)
 
             # Create an event to edit
-            with app.app_context():
+            with self.app.app_context():
                 event = Events(
                     event_title='Basketball Game',
                     sport_type='Basketball',
                     num_players=5,
                     playing_level='Beginner',
                     event_date=date(2024, 5, 30),
-                    start_time='10:00',
-                    end_time='12:00',
+                    start_time=10 * 60,
+                    end_time=12 * 60,
                     location='Downtown Gym',
                     description='Exciting game!',
                     gender_preference='Male',
@@ -359,8 +1143,8 @@ class AppTest(TestCase):
             num_players=5, 
             playing_level='Beginner',
             event_date=date(2024, 5, 30),
-            start_time='15:00',
-            end_time='17:00',
+            start_time=15 * 60,
+            end_time=17 * 60,
             location='Downtown Gym',
             description='Just for fun', 
             gender_preference='Male', 
@@ -375,5 +1159,502 @@ class AppTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Event deleted successfully!', response.data)
 
+    def test_bookings_made_during_validation_are_caught(self):
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        event_data = dict(event_title='Late Booking', sport_type='Tennis', num_players=4, playing_level='Advanced', event_date='2024-06-01',
+                          start_time='09:00', end_time='11:00', location='Crawley', description='Doubles practice', gender_preference='Mixed',
+                          contact_information='test@example.com')
+
+        def book_meanwhile(title, start_hour, validated):
+            # Another request takes a slot after this one's first unlocked check
+            def validate(*args):
+                result = validated(*args)
+                if Events.query.filter_by(event_title=title).first() is None:
+                    with db.engine.begin() as connection:
+                        connection.execute(db.insert(Events).values(
+                            event_title=title, sport_type='Tennis', num_players=4, playing_level='Advanced', event_date=date(2024, 6, 1),
+                            start_time=start_hour * 60, end_time=(start_hour + 2) * 60, location='Crawley', venue_id=Venue.find('Crawley').venue_id,
+                            description='Got there first', gender_preference='Mixed', contact_information='test@example.com', username='testuser'
+                        ))
+                return result
+            return validate
+
+        with mock.patch.object(EventForm, 'validate_event', book_meanwhile('First In', 10, EventForm.validate_event)):
+            response = self.client.post('/post-an-event', data=event_data)
+        self.assertIn(b'This location is already booked at that time.', response.data)
+        self.assertIsNone(Events.query.filter_by(event_title='Late Booking').first())
+
+        # Imports check their batch again before committing, and reject only the clashing rows
+        csv_file = (
+            'event_title,sport_type,num_players,playing_level,event_date,start_time,end_time,location,description,gender_preference,contact_information\n'
+            'Late Import,Tennis,4,Advanced,2024-06-01,13:00,15:00,crawley,Doubles,Mixed,test@example.com\n'
+            'Clear Import,Tennis,4,Advanced,2024-06-02,13:00,15:00,crawley,Doubles,Mixed,test@example.com\n'
+        )
+        with mock.patch('event_io.validate_event_row', book_meanwhile('Second In', 14, event_io.validate_event_row)):
+            report = event_io.import_events(enumerate(csv.DictReader(io.StringIO(csv_file)), start=2), 'testuser', batch_size=2)
+        self.assertEqual((report.imported, report.errors), (1, [(2, ['Event Location: This location is already booked at that time.'])]))
+        self.assertIsNone(Events.query.filter_by(event_title='Late Import').first())
+
+    def test_import_events(self):
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        existing = Events(event_title='Taken Title', sport_type='Soccer', num_players=10, playing_level='Beginner', event_date=date(2024, 6, 1),
+                          start_time=8 * 60, end_time=10 * 60, location='Midland', description='Existing', gender_preference='Mixed',
+                          contact_information='contact@example.com', username='testuser')
+        db.session.add(existing)
+        db.session.commit()
+
+        csv_file = (
+            'event_title,sport_type,num_players,playing_level,event_date,start_time,end_time,location,description,gender_preference,contact_information\n'
+            'Morning Kickabout,Soccer,10,Intermediate,2024-06-01,08:00,10:00,morley,Bring water,Mixed,Email: a@example.com\n'
+            'Bad Date,Soccer,10,Intermediate,2024-13-01,08:00,10:00,Morley,Oops,Mixed,Email: a@example.com\n'
+            'Late Start,Tennis,2,Advanced,2024-06-01,12:00,11:00,Crawley,Oops,Mixed,Email: a@example.com\n'
+            'Taken Title,Tennis,2,Advanced,2024-06-02,12:00,13:00,Crawley,Oops,Mixed,Email: a@example.com\n'
+            'Same Court,Soccer,10,Intermediate,2024-06-01,09:00,11:00,Morley,Clashes with the first row,Mixed,Email: a@example.com\n'
+        )
+        response = self.client.post('/import-events', data={'events_file': (io.BytesIO(csv_file.encode()), 'season.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Imported 1 events. 4 rows were rejected.', response.data)
+        self.assertIn(b'Event Date: Not a valid date', response.data)
+        self.assertIn(b'End Time', response.data)
+        self.assertIn(b'Event title is already in use.', response.data)
+        self.assertIn(b'already booked at that time by an earlier row', response.data)
+        # Rejections are reported by line number in the file
+        self.assertIn(b'<td>3</td>', response.data)
+        self.assertIn(b'<td>6</td>', response.data)
+
+        # Valid rows are saved like posted events: canonical venue, owner and full-text index
+        event = Events.query.filter_by(event_title='Morning Kickabout').one()
+        self.assertEqual((event.location, event.username, event.start_time), ('Morley', 'testuser', 8 * 60))
+        self.assertIsNotNone(event.venue_id)
+        self.assertEqual([e['event_title'] for e in self.client.get('/search-events?q=Kickabout').json['events']], ['Morning Kickabout'])
+
+        # NDJSON works too, and malformed lines only reject themselves
+        ndjson_file = (
+            '{"event_title": "Evening Hit", "sport_type": "Tennis", "num_players": 2, "playing_level": "Beginner", "event_date": "2024-06-03", '
+            '"start_time": "18:00", "end_time": "19:00", "location": "Crawley", "description": "Doubles", "gender_preference": "Mixed", '
+            '"contact_information": "Email: b@example.com"}\n'
+            'not json\n'
+        )
+        response = self.client.post('/import-events', data={'events_file': (io.BytesIO(ndjson_file.encode()), 'season.ndjson')},
+                                    content_type='multipart/form-data')
+        self.assertIn(b'Imported 1 events. 1 rows were rejected.', response.data)
+        self.assertIn(b'Not a JSON object.', response.data)
+        self.assertEqual(Events.query.count(), 3)
+
+        # Other file types are refused before anything is read
+        response = self.client.post('/import-events', data={'events_file': (io.BytesIO(b'x'), 'season.xlsx')},
+                                    content_type='multipart/form-data')
+        self.assertIn(b'CSV or NDJSON files only!', response.data)
+
+    def test_import_fans_out_to_feeds_per_batch(self):
+        db.session.add(User(username='neighbour', email='neighbour@example.com', password='x', fullname='Neighbour', preferred_location='Morley'))
+        db.session.commit()
+        event_date = (date.today() + timedelta(days=7)).isoformat()
+        rows = [(line, {'event_title': f'Season Game {line}', 'sport_type': 'Soccer', 'num_players': '10', 'playing_level': 'Beginner',
+                        'event_date': event_date, 'start_time': f'{8 + 2 * line:02d}:00', 'end_time': f'{9 + 2 * line:02d}:00',
+                        'location': 'Morley', 'description': 'Season fixture', 'gender_preference': 'Mixed',
+                        'contact_information': 'contact@example.com'}) for line in range(1, 6)]
+
+        with self.app.test_request_context():
+            # One background job per committed batch, not one per event
+            with mock.patch('event_io.queue_feed_fan_out') as queue_feed_fan_out:
+                report = event_io.import_events(iter(rows[:3]), 'testuser', batch_size=2)
+            self.assertEqual(report.imported, 3)
+            self.assertEqual([len(call.args[0]) for call in queue_feed_fan_out.call_args_list], [2, 1])
+
+            event_io.import_events(iter(rows[3:]), 'testuser', batch_size=2)
+        titles = db.session.scalars(db.select(Events.event_title).join(FeedEntry, FeedEntry.event_id == Events.event_id)
+                                    .where(FeedEntry.username == 'neighbour').order_by(Events.event_title)).all()
+        self.assertEqual(titles, ['Season Game 4', 'Season Game 5'])
+
+    def test_import_requires_login(self):
+        response = self.client.get('/import-events')
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_events(self):
+        for index, sport_type in enumerate(['Soccer', 'Tennis', 'Soccer']):
+            db.session.add(Events(event_title=f'Event {index}, "quoted"', sport_type=sport_type, num_players=4, playing_level='Beginner',
+                                  event_date=date(2024, 6, 1 + index), start_time=8 * 60 + 30, end_time=10 * 60, location='Morley',
+                                  description='Line one\nline two', gender_preference='Mixed', contact_information='contact@example.com',
+                                  username='testuser'))
+        db.session.commit()
+
+        response = self.client.get('/export-events')
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['event_title'] for row in rows], ['Event 0, "quoted"', 'Event 1, "quoted"', 'Event 2, "quoted"'])
+        self.assertEqual((rows[0]['event_date'], rows[0]['start_time'], rows[0]['description']), ('2024-06-01', '08:30', 'Line one\nline two'))
+
+        # The browse filters apply, and NDJSON has one object per line
+        response = self.client.get('/export-events?format=ndjson&sport=Soccer')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row['event_title'] for row in rows], ['Event 0, "quoted"', 'Event 2, "quoted"'])
+        self.assertEqual(rows[0]['num_players'], 4)
+
+    def test_import_and_export_commands(self):
+        runner = self.app.test_cli_runner()
+        db.session.add(Events(event_title='Round Trip', sport_type='Soccer', num_players=10, playing_level='Beginner', event_date=date(2024, 6, 1),
+                              start_time=8 * 60, end_time=10 * 60, location='Morley', description='Exported', gender_preference='Mixed',
+                              contact_information='contact@example.com', username='testuser'))
+        db.session.commit()
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = os.path.join(output_dir, 'events.ndjson')
+            result = runner.invoke(args=['export-events', '--format', 'ndjson', '--output', path])
+            self.assertEqual(result.exit_code, 0, result.output)
+
+            # Re-importing the export rejects the row, since its venue slot is taken
+            result = runner.invoke(args=['import-events', path, '--user', 'testuser'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn('Line 1: Event Location: This location is already booked at that time.', result.output)
+            self.assertIn('Imported 0 events, rejected 1', result.output)
+
+            with open(path) as file:
+                row = json.loads(file.read())
+            row.update(event_title='Round Trip Again', event_date='2024-06-08')
+            with open(path, 'w') as file:
+                file.write(json.dumps(row) + '\n')
+            result = runner.invoke(args=['import-events', path, '--user', 'testuser'])
+            self.assertIn('Imported 1 events, rejected 0', result.output)
+            self.assertEqual(Events.query.filter_by(event_title='Round Trip Again').one().event_date, date(2024, 6, 8))
+
+            result = runner.invoke(args=['import-events', path, '--user', 'nobody'])
+            self.assertNotEqual(result.exit_code, 0)
+
+    def test_api_events(self):
+        for index, sport_type in enumerate(['Soccer', 'Tennis', 'Soccer', 'Soccer']):
+            db.session.add(Events(event_title=f'Api Event {index}', sport_type=sport_type, num_players=4, playing_level='Beginner',
+                                  event_date=date(2024, 6, 1 + index), start_time=18 * 60, end_time=19 * 60 + 30, location='Morley',
+                                  description='Social game', gender_preference='Mixed', contact_information='contact@example.com',
+                                  username='testuser'))
+        db.session.commit()
+
+        response = self.client.get('/api/v1/events?sport=Soccer&per_page=2&fields=event_id,event_title,end_time')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual([set(event) for event in response.json['events']], [{'event_id', 'event_title', 'end_time'}] * 2)
+        self.assertEqual([event['event_title'] for event in response.json['events']], ['Api Event 0', 'Api Event 2'])
+        self.assertEqual(response.json['events'][0]['end_time'], '19:30')
+
+        # The next page keeps the filters and field selection
+        response = self.client.get(response.json['next_url'])
+        self.assertEqual([event['event_title'] for event in response.json['events']], ['Api Event 3'])
+        self.assertIsNone(response.json['next_cursor'])
+
+        event_id = Events.query.filter_by(event_title='Api Event 1').one().event_id
+        response = self.client.get(f'/api/v1/events/{event_id}')
+        self.assertEqual((response.json['event_date'], response.json['start_time'], response.json['seats_taken']), ('2024-06-02', '18:00', 0))
+        self.assertEqual(self.client.get('/api/v1/events/999').status_code, 404)
+
+        response = self.client.get('/api/v1/events?fields=event_title,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown field: password', response.json['error'])
+
+        # Without orjson installed, the json module produces the same document
+        with mock.patch('api.orjson', None):
+            self.assertEqual(self.client.get(f'/api/v1/events/{event_id}').json['event_date'], '2024-06-02')
+
+    def test_api_profile(self):
+        db.session.add(Events(event_title='Organised', sport_type='Soccer', num_players=4, playing_level='Beginner', event_date=date(2024, 6, 1),
+                              start_time=18 * 60, end_time=19 * 60, location='Morley', description='Social game', gender_preference='Mixed',
+                              contact_information='contact@example.com', username='testuser'))
+        db.session.commit()
+
+        response = self.client.get('/api/v1/profiles/testuser')
+        self.assertEqual(response.json['fullname'], 'Test User')
+        # Private details are never part of a public profile
+        self.assertNotIn('email', response.json)
+        self.assertNotIn('password', response.json)
+        self.assertEqual([event['event_title'] for event in self.client.get(response.json['events_url']).json['events']], ['Organised'])
+
+        self.assertEqual(self.client.get('/api/v1/profiles/testuser?fields=email').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/profiles/nobody').status_code, 404)
+
+    def test_snapshot_html_command(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            # Serving a page never writes a snapshot unless SAVE_HTML_SNAPSHOTS is on
+            self.app.config['SNAPSHOT_FOLDER'] = output_dir
+            self.client.get('/')
+            self.assertEqual(os.listdir(output_dir), [])
+
+            result = self.app.test_cli_runner().invoke(args=['snapshot-html', '--output-dir', output_dir])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn('browse_events.html', os.listdir(output_dir))
+            with open(os.path.join(output_dir, 'profile.html')) as file:
+                self.assertIn('Sample User', file.read())
+
+    def test_seed_command(self):
+        self.app.config.update(PASSWORD_HASH_SCHEME='pbkdf2:sha256', PASSWORD_HASH_WORKERS=0)
+        event_facets = self.app.extensions['event_facets']
+        # Prime the facet cache so the test can see the command invalidate it
+        self.assertEqual(event_facets.get()['sport_types'], [])
+
+        result = self.app.test_cli_runner().invoke(args=['seed', '--users', '5', '--events', '40', '--password-pool', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Generated events: 40 rows', result.output)
+        self.assertEqual(User.query.count(), 6)
+        self.assertEqual(Events.query.count(), 40)
+        self.assertIn('Linked 40 events to venues', result.output)
+
+        # Deferred indexes are rebuilt and the full-text index covers the bulk-loaded rows
+        self.assertEqual(len(db.inspect(db.engine).get_indexes('events')), 5)
+        response = self.client.get('/search-events?q=Soccer')
+        self.assertTrue(response.json['events'])
+        self.assertTrue(all('Soccer' in event['event_title'] for event in response.json['events']))
+        # Like any other process, this app sees the load once it next checks the shared version
+        self.assertEqual(event_facets.get()['sport_types'], [])
+        self.app.extensions['cache_versions'][CacheVersion.EVENTS].expire()
+        self.assertEqual(sum(count for _, count in event_facets.get()['sport_types']), 40)
+
+        # Seeded users can log in with the shared password
+        seeded_user = User.query.filter(User.username != 'testuser').first()
+        response = self.client.post('/login', data=dict(username=seeded_user.username, password='password'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/browse-events')
+        self.client.get('/browse-events')
+        self.client.get('/no-such-page')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        self.assertIn('http_requests_total{endpoint="events.browse_events",method="GET",status="200"} 2', text)
+        self.assertIn('http_requests_total{endpoint="unmatched",method="GET",status="404"}', text)
+        self.assertIn('http_request_duration_seconds_count{endpoint="events.browse_events",method="GET"} 2', text)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="events.browse_events",method="GET",le="+Inf"} 2', text)
+        self.assertRegex(text, r'db_queries_total\{endpoint="events.browse_events"\} [1-9]')
+        self.assertIn('template_render_duration_seconds_count{template="browse_events.html"} 2', text)
+        self.assertIn('http_response_size_bytes_count{endpoint="events.browse_events"} 2', text)
+
+    def test_slow_queries_are_logged(self):
+        self.app.config['SLOW_QUERY_THRESHOLD'] = 0
+        with self.assertLogs('sportsync.slow_query', level='WARNING') as logs:
+            self.client.get('/browse-events')
+        self.assertIn('in events.browse_events: SELECT', logs.output[0])
+
+    def test_current_user_is_loaded_once_per_request(self):
+        self.client.post('/login', data=dict(username='testuser', password='password'))
+        statements = []
+        def record(connection, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        db.event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.get('/profile')
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertIn(b'Test User', response.data)
+        self.assertEqual(len([statement for statement in statements if 'FROM users' in statement]), 1)
+
+        # A signed-out request, or one for an account that no longer exists, goes to the login page
+        with self.client.session_transaction() as client_session:
+            client_session['username'] = 'deleteduser'
+        self.assertEqual(self.client.get('/profile').status_code, 302)
+
+    def test_repeated_queries_are_logged(self):
+        self.app.config.update(DETECT_REPEATED_QUERIES=True, REPEATED_QUERY_THRESHOLD=3)
+        for index in range(3):
+            db.session.add(Events(event_title=f'Event {index}', sport_type='Soccer', num_players=4, playing_level='Beginner',
+                                  event_date=date(2024, 6, 1 + index), start_time=8 * 60, end_time=10 * 60, location='Morley',
+                                  description='Social game', gender_preference='Mixed', contact_information='contact@example.com',
+                                  username='testuser'))
+        db.session.commit()
+
+        def organisers():
+            # One query per event for its organiser, plus the same lookup twice
+            events = db.session.execute(db.select(Events.event_id, Events.username)).all()
+            names = [db.session.execute(db.select(User.fullname).where(User.username == f'{username}{event_id}')).scalar()
+                     for event_id, username in events]
+            db.session.execute(db.select(User.fullname).where(User.username == 'nobody')).all()
+            db.session.execute(db.select(User.fullname).where(User.username == 'nobody')).all()
+            return str(names)
+        self.app.add_url_rule('/organisers', 'organisers', organisers)
+
+        with self.assertLogs('sportsync.repeated_query', 'WARNING') as logs:
+            self.client.get('/organisers')
+        self.assertTrue(any('Possible N+1 query in organisers: ran 5 times, with 4 different parameters' in line for line in logs.output))
+        self.assertTrue(any('Duplicate query in organisers' in line for line in logs.output))
+
+        # Off by default outside debug mode
+        self.app.config['DETECT_REPEATED_QUERIES'] = None
+        with self.assertNoLogs('sportsync.repeated_query', 'WARNING'):
+            self.client.get('/organisers')
+
+    def test_sqlite_connection_pragmas(self):
+        self.assertEqual(db.session.execute(db.text('PRAGMA synchronous')).scalar(), 1)  # NORMAL
+        self.assertEqual(db.session.execute(db.text('PRAGMA busy_timeout')).scalar(), 5000)
+
+    def test_apps_are_independent(self):
+        other_app = create_app(TestingConfig)
+        with other_app.app_context():
+            db.create_all()
+            self.assertIsNone(db.session.get(User, 'testuser'))
+            db.session.add(User(username='otheruser', email='other@example.com', password='x', fullname='Other User'))
+            db.session.commit()
+            db.session.remove()
+
+        # Each app has its own database, caches and metrics
+        self.assertIsNone(db.session.get(User, 'otheruser'))
+        self.assertIsNot(other_app.extensions['page_cache'], self.app.extensions['page_cache'])
+        other_app.test_client().get('/how-it-works')
+        self.assertNotIn('endpoint="main.how_it_works"', self.client.get('/metrics').get_data(as_text=True))
+
+    def test_server_database_engine_options(self):
+        server_app = Flask(__name__)
+        server_app.config.from_object(Config)
+        server_app.config.update(SQLALCHEMY_DATABASE_URI='postgres://sportsync@db.example.com/sportsync', DATABASE_POOL_SIZE=3)
+        configure_engine(server_app)
+        self.assertEqual(server_app.config['SQLALCHEMY_DATABASE_URI'], 'postgresql://sportsync@db.example.com/sportsync')
+        options = server_app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        self.assertEqual(options['pool_size'], 3)
+        self.assertEqual(options['max_overflow'], Config.DATABASE_MAX_OVERFLOW)
+        self.assertTrue(options['pool_pre_ping'])
+
+    def test_readers_and_writers_do_not_block_each_other(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{os.path.join(directory, 'wal.db')}")
+            install_sqlite_pragmas(engine, dict(self.app.config, SQLITE_BUSY_TIMEOUT=100))
+            self.addCleanup(engine.dispose)
+            with engine.begin() as connection:
+                self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+                connection.exec_driver_sql('CREATE TABLE items (name TEXT)')
+                connection.exec_driver_sql("INSERT INTO items VALUES ('a'), ('b'), ('c')")
+
+            with engine.connect() as writer, engine.connect() as reader:
+                result = reader.exec_driver_sql('SELECT name FROM items')
+                self.assertEqual(result.fetchone().name, 'a')
+                # Without WAL this commit fails with "database is locked" while the read is in progress
+                writer.exec_driver_sql("INSERT INTO items VALUES ('d')")
+                writer.commit()
+                self.assertEqual(result.scalars().all(), ['b', 'c'])
+
+    def test_hot_queries_use_indexes(self):
+        def query_plan(sql, **params):
+            rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'), params).all()
+            return ' '.join(row[-1] for row in rows)
+
+        self.assertIn('ix_events_username', query_plan('SELECT * FROM events WHERE username = :username', username='testuser'))
+        self.assertIn('ix_events_venue_schedule', query_plan('SELECT * FROM events WHERE location = :location', location='Crawley'))
+        self.assertIn('ix_events_event_date_sport_type', query_plan(
+            'SELECT * FROM events WHERE event_date = :event_date AND sport_type = :sport_type',
+            event_date='2024-05-30', sport_type='Soccer'
+        ))
+        self.assertIn('ix_users_email', query_plan('SELECT * FROM users WHERE email = :email', email='test@example.com'))
+
+    def test_fingerprinted_assets(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.app.config['ASSETS_FOLDER'] = self.app.extensions['asset_manifest'].output_folder = output_dir.name
+
+        result = self.app.test_cli_runner().invoke(args=['build-assets'])
+        self.assertEqual(result.exit_code, 0)
+
+        response = self.client.get('/how-it-works')
+        style_url = re.search(rb'href="(/assets/style\.[0-9a-f]{12}\.css)"', response.data).group(1).decode()
+        with open(os.path.join(self.app.static_folder, 'style.css'), 'rb') as file:
+            style = file.read()
+
+        response = self.client.get(style_url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(gzip.decompress(response.data), style)
+        response.close()
+
+        response = self.client.get(style_url)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, style)
+        response.close()
+
+    def test_responsive_images(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.app.config['ASSETS_FOLDER'] = output_dir.name
+        self.app.extensions['responsive_images'].output_folder = os.path.join(output_dir.name, 'images')
+
+        # Before the build, the original file is used
+        self.assertIn(b'src="/static/images/UWA-1.jpg"', self.client.get('/dashboard').data)
+        self.app.extensions['page_cache'].clear()
+
+        result = self.app.test_cli_runner().invoke(args=['build-images'])
+        self.assertEqual(result.exit_code, 0)
+
+        response = self.client.get('/dashboard')
+        srcset = re.search(rb'type="image/webp" srcset="([^"]+)"', response.data).group(1).decode()
+        urls = dict(reversed(candidate.split(' ')) for candidate in srcset.split(', '))
+        self.assertEqual(sorted(urls), ['1024w', '480w', '768w'])
+
+        response = self.client.get(urls['480w'])
+        self.assertEqual(response.mimetype, 'image/webp')
+        with Image.open(io.BytesIO(response.data)) as image:
+            self.assertEqual(image.width, 480)
+        response.close()
+
+class MigrationTest(unittest.TestCase):
+    # Upgrades an on-disk database written by older revisions, as a deployment would
+
+    def setUp(self):
+        from flask_migrate import Migrate
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(scratch.name, 'migrated.db')}", 'TESTING': True})
+        Migrate(self.app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        self.addCleanup(db.engine.dispose)
+
+    def upgrade(self, revision='head'):
+        from flask_migrate import upgrade
+        # env.py configures logging from alembic.ini, which would silence the app's loggers for later tests
+        with mock.patch('logging.config.fileConfig'):
+            upgrade(revision=revision)
+
+    def test_duplicate_emails_stop_the_unique_index(self):
+        self.upgrade('3c1f8e2a7d40')
+        with db.engine.begin() as connection:
+            connection.execute(db.text("""
+                INSERT INTO users (username, password, email, fullname) VALUES
+                ('first', 'x', 'shared@example.com', 'First'), ('second', 'x', 'shared@example.com', 'Second'), ('third', 'x', 'own@example.com', 'Third')
+            """))
+
+        with self.assertRaises(SystemExit), self.assertLogs('flask_migrate', 'ERROR') as logs:
+            self.upgrade()
+        self.assertIn('shared@example.com: first, second', logs.output[0])
+        self.assertNotIn('third', logs.output[0])
+
+        # Once the accounts are told apart, the upgrade goes through
+        with db.engine.begin() as connection:
+            connection.execute(db.text("UPDATE users SET email = 'second@example.com' WHERE username = 'second'"))
+        self.upgrade()
+        indexes = {index['name']: index for index in db.inspect(db.engine).get_indexes('users')}
+        self.assertTrue(indexes['ix_users_email']['unique'])
+
+class BenchmarkTest(unittest.TestCase):
+    # benchmark.py is run by hand; these keep its modes working against a tiny database
+
+    def test_every_scenario(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        output = os.path.join(scratch.name, 'results.json')
+        benchmark.main(['--users', '10', '--events', '60', '--requests', '4', '--concurrency', '2', '--output', output,
+                        '--database', os.path.join(scratch.name, 'benchmark.db')])
+        with open(output) as file:
+            routes = json.load(file)['routes']
+        self.assertEqual(list(routes), [scenario.name for scenario in benchmark.SCENARIOS])
+        for name, result in routes.items():
+            self.assertEqual(sum(result['status_codes'].values()), 4, name)
+            self.assertLess(max(map(int, result['status_codes'])), 400, name)
+
+    def test_startup(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        startup = benchmark.measure_startup(1, os.path.join(scratch.name, 'startup.db'))
+        self.assertEqual(list(startup), benchmark.STARTUP_PHASES)
+        self.assertGreater(startup['first_request']['min'], 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
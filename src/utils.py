@@ -1,21 +1,75 @@
-from flask import redirect, url_for, session
+import base64
+from datetime import date
+from flask import g, redirect, url_for, session
 from functools import wraps
+from extensions import db
+from models import User
 
 
 def login_required(func):
     @wraps(func)
     def decorator(*args, **kwargs):
-        # Check if user is logged in
-        if 'username' not in session:
-            return redirect(url_for('login')) # User is not logged in; redirect to login page
+        # Check if user is logged in; their account is then on g.current_user for the view
+        if load_current_user() is None:
+            return redirect(url_for('auth.login')) # User is not logged in; redirect to login page
             
         return func(*args, **kwargs)
     
     return decorator
 
 
+def load_current_user():
+    # The signed-in User, or None. Queried at most once per request and kept on g.current_user
+    if 'current_user' not in g:
+        username = session.get('username')
+        g.current_user = db.session.get(User, username) if username else None
+    return g.current_user
+
+
+def forget_current_user():
+    # Runs before each request: an app context (and so g) can outlive a single request, e.g. in tests
+    g.pop('current_user', None)
+
+
 def set_session(username: str, email: str, remember_me: bool = False) -> None:
     session['logged_in'] = True
     session['username'] = username
     session['email'] = email
-    session.permanent = remember_me
\ No newline at end of file
+    session.permanent = remember_me
+    forget_current_user()
+
+def parse_time(value):
+    # Minutes after midnight for an 'HH:MM' string; ints pass through and blanks become None
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+    hours, minutes = (int(part) for part in value.split(':'))
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f'Not a time of day: {value!r}')
+    return hours * 60 + minutes
+
+
+def format_time(minutes):
+    # 'HH:MM' for a number of minutes after midnight
+    if minutes is None:
+        return ''
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def encode_cursor(event_date, event_id: int) -> str:
+    # Opaque, URL-safe pagination cursor for the (event_date, event_id) sort key
+    raw = f'{event_date.isoformat()}|{event_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Returns (event_date, event_id), or None if the cursor is missing or malformed
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        event_date, event_id = raw.split('|')
+        return date.fromisoformat(event_date), int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        return None